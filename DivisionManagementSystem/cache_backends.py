@@ -0,0 +1,102 @@
+import pickle
+
+import redis
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+
+class RedisCache(BaseCache):
+    """A small cache backend for the redis service in docker-compose since Django only ships one from 4.0 on.
+    Integers are stored as plain redis integers so incr() is atomic, everything else is pickled."""
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        self._client = redis.Redis.from_url(server)
+
+    def _key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return None if timeout is None else max(int(timeout), 0)
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        try:
+            return int(value)
+        except ValueError:
+            return pickle.loads(value)
+
+    def _set(self, key, value, timeout, nx=False):
+        timeout = self._timeout(timeout)
+        if timeout == 0:
+            if not nx:
+                self._client.delete(key)
+            return False
+        return bool(self._client.set(key, self._dump(value), ex=timeout, nx=nx))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._set(self._key(key, version), value, timeout, nx=True)
+
+    def get(self, key, default=None, version=None):
+        value = self._client.get(self._key(key, version))
+        return default if value is None else self._load(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self._key(key, version), value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        timeout = self._timeout(timeout)
+        if timeout is None:
+            return self._client.persist(key) or bool(self._client.exists(key))
+        return bool(self._client.expire(key, timeout))
+
+    def delete(self, key, version=None):
+        return bool(self._client.delete(self._key(key, version)))
+
+    def has_key(self, key, version=None):
+        return bool(self._client.exists(self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self._client.exists(key):
+            raise ValueError(f"Key '{key}' not found")
+        return self._client.incrby(key, delta)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._client.mget([self._key(key, version) for key in keys])
+        return {key: self._load(value) for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._client.pipeline() as pipe:
+            for key, value in data.items():
+                timeout_seconds = self._timeout(timeout)
+                if timeout_seconds == 0:
+                    pipe.delete(self._key(key, version))
+                else:
+                    pipe.set(self._key(key, version), self._dump(value), ex=timeout_seconds)
+            pipe.execute()
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._client.delete(*keys)
+
+    def clear(self):
+        self._client.flushdb()
+
+    def close(self, **kwargs):
+        pass
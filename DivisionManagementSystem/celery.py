@@ -13,7 +13,7 @@ from celery import Celery
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DivisionManagementSystem.settings')
 
 # you change change the name here
-app = Celery('DivisionManagementSystem')
+app = Celery('DivisionManagementSystem', task_cls='DivisionManagementSystem.instrumentation:InstrumentedTask')
 
 # read config from Django settings, the CELERY namespace would make celery
 # config keys has `CELERY` prefix
@@ -0,0 +1,141 @@
+"""
+SQL instrumentation for requests and celery tasks
+
+Every statement that runs while track_queries() is open is counted and timed, the middleware wraps each request in it
+and reports the totals in a Server-Timing header and a JSON log line, InstrumentedTask does the same for every
+celery task. Budgets in settings.SQL_QUERY_BUDGETS cap the number of queries per URL name or task name, going over one
+raises QueryBudgetExceeded when settings.SQL_QUERY_BUDGETS_RAISE is set (the test runner) and logs a warning otherwise.
+"""
+import heapq
+import json
+import logging
+import time
+
+from contextlib import ExitStack, contextmanager
+
+from celery import Task
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Longest a logged statement gets, the rest of a long IN (...) or SELECT list says nothing new
+STATEMENT_LENGTH = 300
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    """The queries of one request or task. Only the slowest few statements are kept, without their parameters so no
+    personal data ends up in the logs"""
+
+    def __init__(self, slowest=3):
+        self.count = 0
+        self.duration = 0.0
+        self.keep = slowest
+        self._slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+
+            if self.keep:
+                statement = (duration, self.count, sql[:STATEMENT_LENGTH])
+                if len(self._slowest) < self.keep:
+                    heapq.heappush(self._slowest, statement)
+                else:
+                    heapq.heappushpop(self._slowest, statement)
+
+    @property
+    def duration_ms(self):
+        return round(self.duration * 1000, 2)
+
+    @property
+    def slowest(self):
+        return [{'ms': round(duration * 1000, 2), 'sql': sql}
+                for duration, _, sql in sorted(self._slowest, reverse=True)]
+
+    def as_dict(self):
+        return {'queries': self.count, 'db_ms': self.duration_ms, 'slowest': self.slowest}
+
+
+@contextmanager
+def track_queries(slowest=None):
+    """
+    Counts and times every statement run on any database connection of this thread while the block is open
+
+    :param slowest: How many of the slowest statements to keep, settings.SQL_SLOWEST_STATEMENTS by default
+    :return: QueryStats that fill up as the block runs
+    """
+    stats = QueryStats(settings.SQL_SLOWEST_STATEMENTS if slowest is None else slowest)
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+
+        yield stats
+
+
+def check_budget(name, stats):
+    """Raises or warns, depending on settings.SQL_QUERY_BUDGETS_RAISE, when the queries ran under the URL or task name
+    went over its budget"""
+    budget = settings.SQL_QUERY_BUDGETS.get(name, settings.SQL_QUERY_BUDGET_DEFAULT)
+
+    if budget is not None and stats.count > budget:
+        message = f'{name} ran {stats.count} queries, its budget is {budget}'
+
+        if settings.SQL_QUERY_BUDGETS_RAISE:
+            raise QueryBudgetExceeded(message)
+
+        logger.warning(message)
+
+
+def log_stats(kind, name, stats, **fields):
+    logger.info(json.dumps({'event': 'sql', 'kind': kind, 'name': name, **fields, **stats.as_dict()}))
+
+
+class QueryInstrumentationMiddleware:
+    """Adds the query count and database time of a request to its Server-Timing header and the log and holds the
+    view to its query budget"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with track_queries() as stats:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        name = match.url_name if match else None
+
+        timing = f'db;dur={stats.duration_ms};desc="{stats.count} queries"'
+        response['Server-Timing'] = f'{response["Server-Timing"]}, {timing}' if response.has_header('Server-Timing') \
+            else timing
+
+        log_stats('request', name, stats, method=request.method, path=request.path, status=response.status_code)
+
+        if name:
+            check_budget(name, stats)
+
+        return response
+
+
+class InstrumentedTask(Task):
+    """The task class of the celery app, it logs the queries of every task run and holds it to the budget of its
+    name. Calling a task directly, like the tests do, goes through here as well"""
+
+    def __call__(self, *args, **kwargs):
+        with track_queries() as stats:
+            result = super().__call__(*args, **kwargs)
+
+        log_stats('task', self.name, stats)
+        check_budget(self.name, stats)
+
+        return result
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import sys
 
 from celery.schedules import crontab
 from django.contrib.messages import constants as messages
@@ -57,6 +58,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'DivisionManagementSystem.instrumentation.QueryInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,6 +81,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'employees.context_processors.notifications',
             ],
         },
     },
@@ -193,6 +196,15 @@ MESSAGE_TAGS = {
 # Django Notifications
 DJANGO_NOTIFICATIONS_CONFIG = {'USE_JSONFIELD': True}
 
+# Open tabs ask for the unread notification count every NOTIFICATION_POLL_PERIOD seconds. With NOTIFICATION_STREAM on
+# they keep a server-sent event stream open instead, which holds a worker while open so it needs async or threaded
+# workers. A stream checks the cached count every NOTIFICATION_STREAM_INTERVAL seconds and is reopened by the browser
+# after NOTIFICATION_STREAM_DURATION seconds
+NOTIFICATION_POLL_PERIOD = int(os.getenv('NOTIFICATION_POLL_PERIOD', 30))
+NOTIFICATION_STREAM = bool(int(os.getenv('NOTIFICATION_STREAM', 0)))
+NOTIFICATION_STREAM_INTERVAL = int(os.getenv('NOTIFICATION_STREAM_INTERVAL', 5))
+NOTIFICATION_STREAM_DURATION = int(os.getenv('NOTIFICATION_STREAM_DURATION', 300))
+
 # Django Emailing
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ['EMAIL_HOST']
@@ -202,10 +214,71 @@ EMAIL_HOST_PASSWORD = os.environ['EMAIL_HOST_PASSWORD']
 EMAIL_USE_TLS = bool(int(os.environ['EMAIL_USE_TLS']))
 DEFAULT_FROM_EMAIL = os.environ['DEFAULT_FROM_EMAIL']
 
+# Tries per email before it is given up on, the wait before another try grows by the delay in seconds every time
+EMAIL_SEND_ATTEMPTS = int(os.getenv('EMAIL_SEND_ATTEMPTS', 3))
+EMAIL_RETRY_DELAY = float(os.getenv('EMAIL_RETRY_DELAY', 1))
+
 # Celery Settings
 CELERY_BROKER_URL = "redis://redis:6379"
 CELERY_RESULT_BACKEND = "redis://redis:6379"
 
+# Caching, the test runner gets its own in memory cache so tests never touch redis
+TESTING = sys.argv[1:2] == ['test']
+
+if TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'DivisionManagementSystem.cache_backends.RedisCache',
+            'LOCATION': 'redis://redis:6379/1',
+            'TIMEOUT': None,
+        }
+    }
+
+# Documents are rendered by the celery worker once their record is committed, the test runner renders them in place
+RENDER_DOCUMENTS_ASYNC = not TESTING
+
+# Largest size in bytes a merged or downloaded PDF is kept in memory before it is moved to a temporary file on disk
+DOCUMENT_SPOOL_MAX_SIZE = int(os.getenv('DOCUMENT_SPOOL_MAX_SIZE', 5 * 1024 * 1024))
+
+# SQL instrumentation, every request and celery task logs its query count and database time. The budgets are the most
+# queries a URL name or task name may run, the test runner fails when one goes over and production logs a warning
+SQL_QUERY_BUDGETS = {
+    'main-home': 15,
+    'main-employee-info': 15,
+    'main-export-phone-list': 10,
+    'main-export-seniority-list': 10,
+    'main-export-driver-list': 10,
+    'main-export-custom-list': 10,
+    'employee-account': 20,
+    'employee-view-settlement': 15,
+    'operations-home': 15,
+    'operations-search-employees': 8,
+    'operations-employee-roster': 5,
+    'operations-attendance-reports': 15,
+    'operations-counseling-reports': 15,
+    'operations-time-off-reports': 15,
+    'operations-hold-list': 15,
+    'operations-termination-reports': 15,
+    'main.tasks.create_document': 20,
+    # Imports run a few queries for every row of the file they are given
+    'main.tasks.import_drivers': None,
+    'main.tasks.import_attendance': None,
+    'main.tasks.import_safety_points': None,
+}
+SQL_QUERY_BUDGET_DEFAULT = int(os.getenv('SQL_QUERY_BUDGET_DEFAULT', 100))
+SQL_QUERY_BUDGETS_RAISE = TESTING
+SQL_SLOWEST_STATEMENTS = 3
+
+LOGGING['loggers']['DivisionManagementSystem.instrumentation'] = {
+    'level': os.getenv('SQL_LOG_LEVEL', 'WARNING' if TESTING else 'INFO'),
+}
+
 # Sites Framework
 SITE_ID = 1
 
@@ -0,0 +1,101 @@
+"""Compares the "Total Points" sort of the attendance report the way it used to be done, a Subquery matching every
+record's employee by name against a grouped Concat of names, with the annotation from the points ledger. It runs against
+a throwaway test database of the configured engine, the old sort only at the smaller sizes since it grows with the
+square of the records. On PostgreSQL the query plan of the ledger sort is printed as well.
+
+Run it from the project root with ``python -m benchmarks.attendance_total_points``"""
+import datetime
+import os
+import random
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DivisionManagementSystem.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.db.models import CharField, DecimalField, OuterRef, Q, Subquery, Sum, Value as V  # noqa: E402
+from django.db.models.functions import Coalesce, Concat  # noqa: E402
+
+from employees.models import Attendance, Employee, PointsLedger  # noqa: E402
+
+EMPLOYEES = 2000
+SIZES = [1000, 5000, 100000]
+NAME_MATCH_LIMIT = 5000
+PAGE_SIZE = 25
+REPEAT = 5
+
+
+def create_attendance(amount):
+    """Tops the attendance records up to the amount, bulk_create leaves the ledger to be recomputed here"""
+    random.seed(amount)
+    employees = list(Employee.objects.values_list('pk', flat=True))
+    Attendance.objects.bulk_create([
+        Attendance(employee_id=random.choice(employees), points=random.choice([0.5, 1, 1]), reason='0',
+                   incident_date=datetime.date.today() - datetime.timedelta(days=random.randint(0, 364)),
+                   assigned_by=0)
+        for _ in range(amount - Attendance.objects.count())
+    ], batch_size=5000)
+
+    PointsLedger.objects.update(attendance_points=PointsLedger.attendance_points_total(OuterRef('pk')))
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def name_match_sort():
+    records = Attendance.objects.filter(is_active=True, employee__is_active=True)
+    totals = records.annotate(full_name=Concat('employee__first_name', V(' '), 'employee__last_name',
+                                               output_field=CharField())).values('full_name')\
+        .annotate(total_points=Sum('points'))
+
+    return records.annotate(total_points=Subquery(totals.filter(
+        Q(full_name__icontains=OuterRef('employee__first_name')) &
+        Q(full_name__icontains=OuterRef('employee__last_name'))).values('total_points')[:1]))\
+        .order_by('-total_points', '-pk')
+
+
+def ledger_sort():
+    return Attendance.objects.filter(is_active=True, employee__is_active=True).annotate(total_points=Coalesce(
+        'employee__points_ledger__attendance_points', V(0), output_field=DecimalField(max_digits=5, decimal_places=1)))\
+        .order_by('-total_points', '-pk')
+
+
+def timed(function):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        list(function()[:PAGE_SIZE + 1])
+
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    test_database = connection.creation.create_test_db(verbosity=0)
+
+    try:
+        Employee.objects.bulk_create([
+            Employee(username=f'benchmark{number}', employee_id=number + 1, first_name=f'First{number % 50}',
+                     last_name=f'Last{number % 40}', is_active=True)
+            for number in range(EMPLOYEES)
+        ])
+        PointsLedger.objects.bulk_create([PointsLedger(employee_id=pk) for pk in
+                                          Employee.objects.values_list('pk', flat=True)])
+
+        print(f'{connection.vendor}, {EMPLOYEES} employees, first page, average of {REPEAT} runs')
+        print(f'{"records":>8} {"name match (ms)":>16} {"ledger (ms)":>12}')
+
+        for size in SIZES:
+            create_attendance(size)
+            name_match = f'{timed(name_match_sort):>16.1f}' if size <= NAME_MATCH_LIMIT else f'{"-":>16}'
+
+            print(f'{size:>8} {name_match} {timed(ledger_sort):>12.1f}')
+
+        if connection.vendor == 'postgresql':
+            print(ledger_sort()[:PAGE_SIZE + 1].explain(analyze=True))
+    finally:
+        connection.creation.destroy_test_db(test_database, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
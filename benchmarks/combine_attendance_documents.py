@@ -0,0 +1,52 @@
+"""Compares opening the documents of a bulk attendance assignment one after another with the concurrent
+open_documents used by combine_attendance_documents, against a local stub storage server that stands in for S3.
+
+Run it from the project root with ``python -m benchmarks.combine_attendance_documents``"""
+import os
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DivisionManagementSystem.settings')
+django.setup()
+
+from employees.documents import open_document, open_documents  # noqa: E402
+from employees.tests.stub_storage import StubStorageServer  # noqa: E402
+
+# Number of documents, a bulk assignment of 30 drivers that all got counseling downloads 60
+SIZES = [1, 5, 10, 30, 60]
+LATENCY = 0.05
+
+
+def time_serial(field_files):
+    start = time.perf_counter()
+    for field_file in field_files:
+        open_document(field_file).close()
+
+    return time.perf_counter() - start
+
+
+def time_concurrent(field_files):
+    start = time.perf_counter()
+    with open_documents(field_files):
+        pass
+
+    return time.perf_counter() - start
+
+
+def main():
+    print(f'Stub storage latency: {LATENCY * 1000:.0f}ms per document')
+    print(f'{"documents":>10} {"serial (s)":>12} {"concurrent (s)":>16} {"speedup":>9}')
+
+    with StubStorageServer(latency=LATENCY) as stub:
+        for size in SIZES:
+            field_files = stub.field_files(f'attendance_forms/{number}.pdf' for number in range(size))
+
+            serial = time_serial(field_files)
+            concurrent = time_concurrent(field_files)
+
+            print(f'{size:>10} {serial:>12.3f} {concurrent:>16.3f} {serial / concurrent:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Compares the employee search the way it used to be done, a Concat of first and last name filtered with icontains and
+every match returned, with the ranked and limited search over the stored search_name. It runs against a throwaway test
+database of the configured engine filled with 50,000 employees, on PostgreSQL the query plans are printed as well.
+
+Run it from the project root with ``python -m benchmarks.employee_search``"""
+import os
+import random
+import string
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DivisionManagementSystem.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.db.models import CharField, Value as V  # noqa: E402
+from django.db.models.functions import Concat  # noqa: E402
+
+from employees.models import Employee  # noqa: E402
+from employees.search import find_employees, normalize_search_name  # noqa: E402
+
+EMPLOYEES = 50000
+REPEAT = 20
+SEARCHES = ['jo', 'smi', 'maria lop', 'zzq']
+
+FIRST_NAMES = ['Maria', 'John', 'Joseph', 'Anna', 'Luis', 'Mohammed', 'Jennifer', 'David', 'Linh', 'Joanne']
+LAST_NAMES = ['Smith', 'Lopez', 'Johnson', 'Nguyen', 'Garcia', 'Smithers', 'Brown', 'Annex', 'Jones', 'Miller']
+
+
+def create_employees():
+    random.seed(0)
+    employees = []
+    for number in range(EMPLOYEES):
+        first_name = random.choice(FIRST_NAMES) + ''.join(random.choices(string.ascii_lowercase, k=2))
+        last_name = random.choice(LAST_NAMES) + ''.join(random.choices(string.ascii_lowercase, k=3))
+        employees.append(Employee(
+            username=f'benchmark{number}',
+            employee_id=number + 1,
+            first_name=first_name,
+            last_name=last_name,
+            search_name=normalize_search_name(f'{first_name} {last_name}'),
+            is_active=True,
+        ))
+
+    Employee.objects.bulk_create(employees, batch_size=5000)
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def concat_search(search):
+    return list(Employee.objects.annotate(
+        full_name=Concat('first_name', V(' '), 'last_name', output_field=CharField())).filter(
+        full_name__icontains=search, is_active=True))
+
+
+def indexed_search(search):
+    return list(find_employees(Employee.objects.filter(is_active=True), search))
+
+
+def timed(function, search):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        results = function(search)
+
+    return len(results), (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    test_database = connection.creation.create_test_db(verbosity=0)
+
+    try:
+        create_employees()
+        print(f'{connection.vendor}, {EMPLOYEES} employees, average of {REPEAT} runs')
+        print(f'{"search":>10} {"concat rows":>12} {"concat (ms)":>12} {"indexed rows":>13} {"indexed (ms)":>13}')
+
+        for search in SEARCHES:
+            concat_rows, concat_time = timed(concat_search, search)
+            indexed_rows, indexed_time = timed(indexed_search, search)
+
+            print(f'{search:>10} {concat_rows:>12} {concat_time:>12.1f} {indexed_rows:>13} {indexed_time:>13.1f}')
+
+        if connection.vendor == 'postgresql':
+            print(find_employees(Employee.objects.filter(is_active=True), 'smi').explain(analyze=True))
+    finally:
+        connection.creation.destroy_test_db(test_database, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Compares the peak memory of merging and sending a history export the way it used to be done, every document read
+into memory and the result built in a BytesIO, with merge_documents streaming into a spooled temporary file.
+
+Run it from the project root with ``python -m benchmarks.history_export_memory``"""
+import io
+import os
+import random
+import shutil
+import string
+import tempfile
+import tracemalloc
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DivisionManagementSystem.settings')
+django.setup()
+
+from PyPDF2 import PdfFileMerger, PdfFileReader  # noqa: E402
+from django.core.files.base import ContentFile  # noqa: E402
+from django.db.models.fields.files import FieldFile  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from reportlab.lib.pagesizes import letter  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+
+from employees.documents import merge_documents  # noqa: E402
+from employees.models import Attendance  # noqa: E402
+
+# Number of documents in the export, a long tenured driver can have a few hundred
+SIZES = [10, 50, 100, 200]
+SPOOL_MAX_SIZE = 1024 * 1024
+CHUNK_SIZE = 8192
+
+
+def create_stored_documents(amount):
+    """Saves the given amount of uncompressed two page PDFs of about 100KB each and returns their FieldFiles"""
+    field = Attendance._meta.get_field('document')
+    field_files = []
+
+    for number in range(amount):
+        buffer = io.BytesIO()
+        p = canvas.Canvas(buffer, pagesize=letter, pageCompression=0)
+        for _ in range(2):
+            for line in range(60):
+                p.drawString(36, 36 + line * 12, ''.join(random.choices(string.ascii_letters, k=400)))
+            p.showPage()
+        p.save()
+
+        name = field.storage.save(f'attendance_forms/benchmark_{number}.pdf', ContentFile(buffer.getvalue()))
+        field_files.append(FieldFile(None, field, name))
+
+    return field_files
+
+
+def export_in_memory(field_files):
+    merged_object = PdfFileMerger()
+    for field_file in field_files:
+        with field_file.storage.open(field_file.name, 'rb') as document:
+            merged_object.append(PdfFileReader(io.BytesIO(document.read())))
+
+    buffer = io.BytesIO()
+    merged_object.write(buffer)
+    content = ContentFile(buffer.getbuffer())
+
+    # HttpResponse keeps its own copy of the content
+    return len(bytes(content.read()))
+
+
+def export_streamed(field_files):
+    size = 0
+    with merge_documents(field_files) as merged:
+        for chunk in iter(lambda: merged.read(CHUNK_SIZE), b''):
+            size += len(chunk)
+
+    return size
+
+
+def peak_memory(function, field_files):
+    tracemalloc.start()
+    size = function(field_files)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return size, peak
+
+
+def main():
+    media_root = tempfile.mkdtemp()
+    megabyte = 1024 * 1024
+
+    with override_settings(MEDIA_ROOT=media_root, DOCUMENT_SPOOL_MAX_SIZE=SPOOL_MAX_SIZE):
+        print(f'Spool threshold: {SPOOL_MAX_SIZE / megabyte:.1f}MB')
+        print(f'{"documents":>10} {"export (MB)":>12} {"in memory peak (MB)":>20} {"streamed peak (MB)":>19}')
+
+        for amount in SIZES:
+            field_files = create_stored_documents(amount)
+
+            size, in_memory = peak_memory(export_in_memory, field_files)
+            _, streamed = peak_memory(export_streamed, field_files)
+
+            print(f'{amount:>10} {size / megabyte:>12.1f} {in_memory / megabyte:>20.1f} {streamed / megabyte:>19.1f}')
+
+            for field_file in field_files:
+                field_file.storage.delete(field_file.name)
+
+    shutil.rmtree(media_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Compares sending a notification email to a group the way it used to be done, one send_mail and so one SMTP
+connection per recipient, with the batched send_messages that reuses a single connection, against a local stub mail
+server that takes a while to greet every new connection like a TLS handshake would.
+
+Run it from the project root with ``python -m benchmarks.notification_emails``"""
+import os
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DivisionManagementSystem.settings')
+django.setup()
+
+from django.core.mail import send_mail  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from main.mail import build_messages, send_messages  # noqa: E402
+from main.tests.stub_smtp import StubSMTPServer  # noqa: E402
+
+# Number of recipients, a removal from service notifies about a dozen supervisors
+SIZES = [1, 5, 12, 30, 100]
+HANDSHAKE_LATENCY = 0.05
+HTML_MESSAGE = '<p>Test User has been Removed from Service</p>' * 200
+
+
+def time_per_recipient(recipients):
+    start = time.perf_counter()
+    for to in recipients:
+        send_mail(subject='New Notification', from_email=None, message='Plain', recipient_list=[to],
+                  html_message=HTML_MESSAGE)
+
+    return time.perf_counter() - start
+
+
+def time_batched(recipients):
+    start = time.perf_counter()
+    send_messages(build_messages('New Notification', 'Plain', recipients, HTML_MESSAGE))
+
+    return time.perf_counter() - start
+
+
+def main():
+    print(f'Stub handshake latency: {HANDSHAKE_LATENCY * 1000:.0f}ms per connection')
+    print(f'{"recipients":>10} {"per recipient (s)":>18} {"batched (s)":>12} {"speedup":>9} {"connections":>13}')
+
+    with StubSMTPServer(handshake_latency=HANDSHAKE_LATENCY) as stub:
+        with override_settings(**stub.settings()):
+            for size in SIZES:
+                recipients = [f'supervisor.{number}@example.com' for number in range(size)]
+
+                stub.connection_count = 0
+                per_recipient = time_per_recipient(recipients)
+                old_connections = stub.connection_count
+
+                stub.connection_count = 0
+                batched = time_batched(recipients)
+
+                print(f'{size:>10} {per_recipient:>18.3f} {batched:>12.3f} {per_recipient / batched:>8.1f}x '
+                      f'{old_connections:>6} -> {stub.connection_count:<4}')
+
+
+if __name__ == '__main__':
+    main()
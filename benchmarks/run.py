@@ -0,0 +1,205 @@
+"""Seeds a throwaway test database of the configured engine with seed_benchmark_data and times the key views, the
+attendance importer, the document renderers and the cleanup commands against it. Every timing is written with its
+query count to a JSON report, two reports from different commits can then be compared side by side.
+
+The cache is an in memory one and celery tasks run in place so nothing but the database is needed.
+
+Run it from the project root with ``python -m benchmarks.run --employees 1000 --output report.json`` and compare with
+``python -m benchmarks.run --compare old.json new.json``"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+from io import StringIO
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DivisionManagementSystem.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from DivisionManagementSystem.celery import app  # noqa: E402
+from DivisionManagementSystem.instrumentation import track_queries  # noqa: E402
+from employees.management.commands.seed_benchmark_data import DOCUMENT_MODELS  # noqa: E402
+from employees.models import Attendance, Employee, render_document  # noqa: E402
+from main.importers import import_attendance_rows  # noqa: E402
+
+CLEANUP_COMMANDS = ['attendance_cleanup', 'counseling_cleanup', 'safety_point_cleanup', 'time_off_cleanup']
+RENDERS_PER_MODEL = 5
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(function, repeat=1):
+    """Runs the function the given number of times and returns the median and first run time and the queries of the
+    last run"""
+    times = []
+    for _ in range(repeat):
+        with track_queries(slowest=0) as stats:
+            start = time.perf_counter()
+            function()
+            times.append((time.perf_counter() - start) * 1000)
+
+    return {'ms': round(statistics.median(times), 2), 'first_ms': round(times[0], 2), 'queries': stats.count}
+
+
+def view_requests():
+    """The pages every benchmark requests, as name, URL and query parameters"""
+    employee = Attendance.objects.filter(is_active=True, employee__is_active=True).values('employee__employee_id')\
+        .order_by('employee__employee_id').first()['employee__employee_id']
+
+    return [
+        ('main-home', reverse('main-home'), {}),
+        ('main-employee-info search', reverse('main-employee-info'), {'search': 'mari'}),
+        ('operations-home', reverse('operations-home'), {}),
+        ('operations-attendance-reports', reverse('operations-attendance-reports'), {}),
+        ('operations-attendance-reports total points', reverse('operations-attendance-reports'),
+         {'sort_by': '-total_points'}),
+        ('operations-attendance-reports with total', reverse('operations-attendance-reports'), {'total': 1}),
+        ('operations-counseling-reports', reverse('operations-counseling-reports'), {}),
+        ('operations-time-off-reports', reverse('operations-time-off-reports'), {}),
+        ('operations-hold-list', reverse('operations-hold-list'), {}),
+        ('operations-termination-reports', reverse('operations-termination-reports'), {}),
+        ('operations-search-employees', reverse('operations-search-employees'), {'q': 'jo'}),
+        ('operations-employee-roster', reverse('operations-employee-roster'), {}),
+        ('employee-account', reverse('employee-account', args=[employee]), {}),
+    ]
+
+
+def benchmark_views(results, repeat):
+    client = Client()
+    client.force_login(Employee.objects.filter(is_active=True).first())
+    Employee.objects.update(is_superuser=True)
+
+    for name, url, params in view_requests():
+        def request():
+            response = client.get(url, params)
+            assert response.status_code == 200, f'{name} answered {response.status_code}'
+
+        results[f'views/{name}'] = measure(request, repeat)
+
+
+def benchmark_documents(results):
+    for model in DOCUMENT_MODELS:
+        pks = list(model.objects.values_list('pk', flat=True)[:RENDERS_PER_MODEL])
+        pks.reverse()
+
+        results[f'documents/{model.__name__}'] = measure(lambda: render_document(model, pks.pop()), len(pks))
+
+
+def benchmark_importer(results):
+    """Imports one attendance record for every active Employee the way the spreadsheet import hands them over, the
+    documents of the imported records are rendered in place"""
+    assigned_by = Employee.objects.filter(position='dispatch_supervisor').values_list('employee_id', flat=True)[0]
+    incident_date = datetime.date.today().strftime('%Y%m%d')
+    rows = [(employee_id, incident_date, '6', '', assigned_by)
+            for employee_id in Employee.objects.filter(is_active=True).values_list('employee_id', flat=True)]
+
+    results['importers/import_attendance_rows'] = {**measure(lambda: import_attendance_rows(rows)), 'rows': len(rows)}
+
+
+def benchmark_cleanups(results):
+    for command in CLEANUP_COMMANDS:
+        results[f'commands/{command}'] = measure(lambda: call_command(command, stdout=StringIO()))
+
+
+def run(options):
+    media_root = tempfile.mkdtemp()
+    test_database = connection.creation.create_test_db(verbosity=0)
+    setup_test_environment()
+    app.conf.task_always_eager = True
+    logging.getLogger('DivisionManagementSystem.instrumentation').setLevel(logging.WARNING)
+    results = {}
+
+    try:
+        # The documents read the logo through STATIC_URL, the app's static files let them render offline
+        with override_settings(MEDIA_ROOT=media_root,
+                               STATIC_URL=os.path.join(settings.BASE_DIR, 'main', 'static', ''),
+                               DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+                               CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                               EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                               RENDER_DOCUMENTS_ASYNC=False, SQL_QUERY_BUDGET_DEFAULT=None, SQL_QUERY_BUDGETS={}):
+            results['seed/seed_benchmark_data'] = measure(lambda: call_command(
+                'seed_benchmark_data', employees=options.employees, seed=options.seed, stdout=StringIO()))
+
+            benchmark_views(results, options.repeat)
+            benchmark_documents(results)
+            benchmark_importer(results)
+            benchmark_cleanups(results)
+    finally:
+        teardown_test_environment()
+        connection.creation.destroy_test_db(test_database, verbosity=0)
+        shutil.rmtree(media_root, ignore_errors=True)
+
+    return {
+        'commit': git_commit(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'vendor': connection.vendor,
+        'employees': options.employees,
+        'repeat': options.repeat,
+        'results': results,
+    }
+
+
+def compare(old_path, new_path):
+    with open(old_path) as old_file, open(new_path) as new_file:
+        old, new = json.load(old_file), json.load(new_file)
+
+    print(f'{old["commit"]} ({old["employees"]} employees, {old["vendor"]}) -> '
+          f'{new["commit"]} ({new["employees"]} employees, {new["vendor"]})')
+    print(f'{"benchmark":<55} {"old (ms)":>10} {"new (ms)":>10} {"change":>8} {"queries":>12}')
+
+    for name in sorted(set(old['results']) | set(new['results'])):
+        before, after = old['results'].get(name), new['results'].get(name)
+        if not before or not after:
+            print(f'{name:<55} {"only in " + ("new" if after else "old"):>41}')
+            continue
+
+        change = (after['ms'] - before['ms']) / before['ms'] * 100 if before['ms'] else 0
+        print(f'{name:<55} {before["ms"]:>10.1f} {after["ms"]:>10.1f} {change:>+7.0f}% '
+              f'{before["queries"]:>5} -> {after["queries"]:<4}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--employees', type=int, default=1000, help='Number of employees to seed')
+    parser.add_argument('--repeat', type=int, default=5, help='Times each view is requested')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generated data')
+    parser.add_argument('--output', default='benchmark-report.json', help='Where to write the JSON report')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two reports instead of running')
+    options = parser.parse_args()
+
+    if options.compare:
+        compare(*options.compare)
+        return
+
+    report = run(options)
+    with open(options.output, 'w') as output:
+        json.dump(report, output, indent=2)
+
+    for name, result in report['results'].items():
+        print(f'{name:<55} {result["ms"]:>10.1f} ms {result["queries"]:>6} queries')
+    print(f'Report written to {options.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+from django.conf import settings
+
+from employees.notifications import get_unread_count
+
+
+def notifications(request):
+    """The unread notification count of the navigation bar, only counted when a template shows it, and how the page
+    keeps it up to date"""
+    return {
+        'unread_notification_count': lambda: get_unread_count(request.user),
+        'notification_poll_period': settings.NOTIFICATION_POLL_PERIOD,
+        'notification_stream': settings.NOTIFICATION_STREAM,
+    }
@@ -0,0 +1,192 @@
+import hashlib
+import logging
+import requests
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from PyPDF2 import PdfFileMerger
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from main.cache_versions import invalidate_version
+
+# Enough to open a bulk assignment in a few round trips without flooding the storage backend
+DOCUMENT_FETCH_WORKERS = 8
+
+_document_session = None
+
+
+def get_document_session():
+    """Returns the requests session shared by every document download so connections are pooled and reused between
+    requests"""
+    global _document_session
+
+    if _document_session is None:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=DOCUMENT_FETCH_WORKERS)
+        _document_session = requests.Session()
+        _document_session.mount('http://', adapter)
+        _document_session.mount('https://', adapter)
+
+    return _document_session
+
+
+def download_document(url):
+    """
+    This function downloads the document at the given url in chunks into a temporary file that only moves to disk once
+    it is larger than DOCUMENT_SPOOL_MAX_SIZE
+
+    :param url: The document url
+    :return: File object positioned at the start
+    """
+    document = tempfile.SpooledTemporaryFile(max_size=settings.DOCUMENT_SPOOL_MAX_SIZE)
+
+    with get_document_session().get(url, stream=True) as response:
+        response.raise_for_status()
+
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            document.write(chunk)
+
+    document.seek(0)
+
+    return document
+
+
+def open_document(field_file):
+    """
+    This function opens a stored document for reading through the storage backend it was saved with, local files are
+    read straight from disk and S3 files straight from the bucket. Only when the backend can't open it the document is
+    downloaded from its url instead
+
+    :param field_file: The FieldFile of a document
+    :return: File object positioned at the start
+    """
+    try:
+        document = field_file.storage.open(field_file.name, 'rb')
+        # Backends like S3 only fetch the file on first access so this makes sure it can actually be read
+        document.seek(0)
+
+        return document
+    except Exception:
+        logging.warning(f'Could not open {field_file.name} through the storage backend, downloading it instead')
+
+        return download_document(field_file.url)
+
+
+@contextmanager
+def open_documents(field_files, max_workers=DOCUMENT_FETCH_WORKERS):
+    """
+    This context manager opens the given documents concurrently and gives them back in the same order as they were
+    given no matter which one finishes first. PdfFileReader reads pages from the files as they are needed so they are
+    kept open until the block is left
+
+    :param field_files: Iterable of document FieldFiles
+    :param max_workers: Most documents that can be opened at the same time
+    :return: List of file objects
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(open_document, field_file) for field_file in field_files]
+
+    documents = [future.result() for future in futures if not future.exception()]
+    try:
+        for future in futures:
+            if future.exception():
+                raise future.exception()
+
+        yield documents
+    finally:
+        for document in documents:
+            document.close()
+
+
+def merge_documents(sources):
+    """
+    This function merges PDFs into one temporary file that only moves to disk once it is larger than
+    DOCUMENT_SPOOL_MAX_SIZE. Stored documents are read through their storage backend while merging instead of being
+    copied into memory first
+
+    :param sources: List of in memory PDF files and document FieldFiles in the order they should be merged
+    :return: File object positioned at the start or None if there was nothing to merge
+    """
+    if not sources:
+        return None
+
+    output = tempfile.SpooledTemporaryFile(max_size=settings.DOCUMENT_SPOOL_MAX_SIZE)
+    merged_object = PdfFileMerger()
+
+    with open_documents(source for source in sources if isinstance(source, FieldFile)) as documents:
+        documents = iter(documents)
+
+        for source in sources:
+            merged_object.append(next(documents) if isinstance(source, FieldFile) else source)
+
+        merged_object.write(output)
+
+    merged_object.close()
+    output.seek(0)
+
+    return output
+
+
+# Where merged history bundles are stored, one folder per Employee
+HISTORY_BUNDLE_LOCATION = 'history_bundles'
+
+
+def history_bundle_generation_key(employee_pk):
+    return f'employees:history_bundles:{employee_pk}:generation'
+
+
+def history_bundle_folder(employee_pk):
+    return f'{HISTORY_BUNDLE_LOCATION}/{employee_pk}'
+
+
+def delete_history_bundles(employee_pk, kind=None):
+    """Deletes the stored history bundles of an Employee, only the ones of the given kind if there is one"""
+    folder = history_bundle_folder(employee_pk)
+
+    try:
+        files = default_storage.listdir(folder)[1]
+    except OSError:
+        return
+
+    for file_name in files:
+        if kind is None or file_name.startswith(f'{kind}-'):
+            default_storage.delete(f'{folder}/{file_name}')
+
+
+def invalidate_history_bundles(*employee_pks):
+    """Moves the history bundles of the Employees to a new generation, see main.cache_versions"""
+    invalidate_version(*[history_bundle_generation_key(employee_pk) for employee_pk in employee_pks])
+
+
+def get_history_bundle(employee_pk, kind, version, build):
+    """
+    This function returns a merged history bundle from storage, only building it when nothing is stored for the
+    version yet. Bundles are addressed by a hash of the version, the generation the signals bump whenever a record
+    changes and today's date since the summary pages print it. A bundle built while a record is being changed ends up
+    under a generation that is never asked for again
+
+    :param employee_pk: Primary key of the Employee the bundle belongs to
+    :param kind: Which history it is, attendance, counseling, safety_point or profile
+    :param version: Anything that changes when the contributing records change
+    :param build: Function that merges the bundle and returns it as a file object or None if there is nothing to merge
+    :return: File object positioned at the start or None
+    """
+    generation = cache.get(history_bundle_generation_key(employee_pk), 0)
+    digest = hashlib.sha256(repr((version, generation, timezone.localdate())).encode()).hexdigest()
+    name = f'{history_bundle_folder(employee_pk)}/{kind}-{digest}.pdf'
+
+    if default_storage.exists(name):
+        return default_storage.open(name, 'rb')
+
+    bundle = build()
+
+    if bundle is not None:
+        delete_history_bundles(employee_pk, kind)
+        default_storage.save(name, File(bundle))
+        bundle.seek(0)
+
+    return bundle
@@ -147,8 +147,10 @@ class EditAttendance(AssignAttendance):
         try:
             self.attendance.document = self.request.FILES['document']
             self.attendance.uploaded = True
+            self.attendance.document_status = 'ready'
             update_fields.append('document')
             update_fields.append('uploaded')
+            update_fields.append('document_status')
         except KeyError:
             pass
 
@@ -265,8 +267,10 @@ class EditCounseling(AssignCounseling):
         try:
             self.counseling.document = self.request.FILES['document']
             self.counseling.uploaded = True
+            self.counseling.document_status = 'ready'
             update_fields.append('document')
             update_fields.append('uploaded')
+            update_fields.append('document_status')
         except KeyError:
             pass
 
@@ -346,8 +350,10 @@ class EditSafetyPoint(AssignSafetyPoint):
         try:
             safety_point.document = self.files['document']
             safety_point.uploaded = True
+            safety_point.document_status = 'ready'
             update_fields.append('document')
             update_fields.append('uploaded')
+            update_fields.append('document_status')
         except KeyError:
             pass
         safety_point.incident_date = self.cleaned_data['incident_date']
@@ -1,45 +1,39 @@
 import datetime
 import io
-import requests
 
-from PyPDF2 import PdfFileMerger, PdfFileReader
 from django.core.files.base import ContentFile
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 
-from .models import Counseling, Attendance
+from .documents import merge_documents
+from .models import Counseling, Attendance, ensure_document
 
 
 def combine_attendance_documents(attendance_ids):
     """
     This function accepts a list of Attendance Ids and gets the PDFs associated with each of those and combines them
-    into one PDF and returns it. Also if there is any counseling it will also add those PDFs
+    into one PDF and returns it. Also if there is any counseling it will also add those PDFs right after the attendance
+    it belongs to. The PDFs are combined in the same order as the Ids
 
     :param attendance_ids: List of Attendance Ids
-    :return: bytes object
+    :return: File object positioned at the start
     """
-    buffer = io.BytesIO()
-
-    merged_object = PdfFileMerger()
-
-    attendance_list = Attendance.objects.filter(id__in=attendance_ids)
-
-    for attendance in attendance_list:
-        remote_file = requests.get(attendance.document.url).content
-        memory_file = io.BytesIO(remote_file)
-        merged_object.append(PdfFileReader(memory_file))
+    attendances = Attendance.objects.filter(id__in=attendance_ids).select_related('counseling')
+    attendances = {attendance.id: attendance for attendance in attendances}
 
-        try:
-            remote_file = requests.get(attendance.counseling.document.url).content
-            memory_file = io.BytesIO(remote_file)
-            merged_object.append(PdfFileReader(memory_file))
-        except Counseling.DoesNotExist:
-            pass
+    documents = []
+    for attendance_id in dict.fromkeys(attendance_ids):
+        attendance = attendances.get(attendance_id)
+        if attendance:
+            documents.append(ensure_document(attendance).document)
 
-    merged_object.write(buffer)
+            try:
+                documents.append(ensure_document(attendance.counseling).document)
+            except Counseling.DoesNotExist:
+                pass
 
-    return buffer
+    return merge_documents(documents)
 
 
 def create_safety_meeting_attendance(employees):
@@ -1,37 +1,119 @@
+from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
-from employees.models import Attendance, Employee
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Q, Subquery, Value as V
+from django.db.models.functions import Coalesce
+from employees.documents import delete_history_bundles, invalidate_history_bundles
+from employees.models import Attendance, Counseling, Employee, PointsLedger
+from operations.dashboard import PANELS, invalidate_panels
 import datetime
 import logging
+import time
 
 
 class Command(BaseCommand):
     help = 'This command goes through all the Attendance Records and deletes anything older than 1 year and also' \
            'deletes all Attendance Records for an Employee if they have gone 6 months with no Attendance Records'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
     def handle(self, *args, **options):
         logging.info('Running attendance cleanup...')
-        attendance_records = Attendance.objects.order_by('incident_date')
-        employees = Employee.objects.all()
         today = datetime.datetime.today().date()
-        deleted_records = 0
+        self.timings = []
+
+        # A record is a year old once more than 365 days have passed and an Employee has a clean slate once more than
+        # half a year (182.5 days) has passed since their latest record
+        year_old = Q(incident_date__lt=today - datetime.timedelta(days=365))
+        clean_slate_employees = Attendance.objects.order_by().values('employee')\
+            .annotate(latest=Max('incident_date')).filter(latest__lt=today - datetime.timedelta(days=182))\
+            .values('employee')
+        clean_slate = Q(employee__in=clean_slate_employees)
+
+        expired = Attendance.objects.filter(year_old | clean_slate)
+        employee_pks = self.timed('Found the affected employees', lambda: set(
+            expired.order_by().values_list('employee', flat=True).distinct()))
+
+        if options['dry_run']:
+            report = self.timed('Counted the records', lambda: expired.aggregate(
+                year_old=Count('pk', filter=year_old), total=Count('pk'),
+                paid_sick=Count('pk', filter=Q(exemption='1')), unpaid_sick=Count('pk', filter=Q(exemption='2')),
+                counseling=Count('counseling')))
 
-        for attendance_record in attendance_records:
-            days_passed = today - attendance_record.incident_date
+            self.stdout.write(f'Would delete {report["total"]} records of {len(employee_pks)} employees, '
+                              f'{report["year_old"]} older than a year and {report["total"] - report["year_old"]} '
+                              f'more of employees with a clean slate, along with {report["counseling"]} counseling '
+                              f'records.')
+            self.stdout.write(f'Would give back {report["paid_sick"]} paid and {report["unpaid_sick"]} unpaid sick '
+                              f'days.')
+            self.write_timings()
+            return
 
-            if days_passed.days > 365:
-                attendance_record.delete()
-                deleted_records += 1
-            else:
-                break
+        with transaction.atomic():
+            documents = self.timed('Collected the documents', lambda: set(
+                expired.exclude(document='').values_list('document', flat=True)))
+            self.timed('Gave back the sick days', lambda: self.credit_sick_days(expired))
 
-        for employee in employees:
-            employee_attendance = attendance_records.filter(employee=employee).order_by('-incident_date')
+            # The counseling of an attendance record goes with it, there are only ever a few so their own signals and
+            # document cleanup run as usual
+            self.timed('Deleted the counseling records', lambda: Counseling.objects.filter(
+                attendance__in=expired).delete())
 
-            if employee_attendance:
-                days_passed = today - employee_attendance.first().incident_date
-                if days_passed.days > 182.5:
-                    deleted_records += len(employee_attendance)
-                    employee_attendance.delete()
+            # _raw_delete runs a single DELETE without loading the records and sending their signals, everything the
+            # signals would do per record is done for all of them around it
+            deleted_records = self.timed('Deleted the records older than a year', lambda: Attendance.objects.filter(
+                year_old)._raw_delete(Attendance.objects.db))
+            deleted_records += self.timed('Deleted the records of employees with a clean slate', lambda: Attendance
+                                          .objects.filter(clean_slate)._raw_delete(Attendance.objects.db))
+
+            self.timed('Refreshed the points ledgers', lambda: PointsLedger.refresh_many_attendance_points(
+                employee_pks))
+
+            invalidate_history_bundles(*employee_pks)
+            invalidate_panels(PANELS)
+            transaction.on_commit(lambda: self.delete_documents(documents))
+            transaction.on_commit(lambda: self.delete_bundles(employee_pks))
 
         success_message = 'Deleted 1 record.' if deleted_records == 1 else f'Deleted {deleted_records} records.'
         logging.info(success_message)
+        self.stdout.write(self.style.SUCCESS(success_message))
+        self.write_timings()
+
+    def timed(self, step, function):
+        start = time.perf_counter()
+        result = function()
+        self.timings.append((step, (time.perf_counter() - start) * 1000))
+
+        return result
+
+    def write_timings(self):
+        for step, duration in self.timings:
+            self.stdout.write(f'{step} in {duration:.1f}ms')
+
+    @staticmethod
+    def credit_sick_days(expired):
+        """Gives every Employee back the sick days their deleted records used up, in a single UPDATE statement"""
+        def used(exemption):
+            records = expired.filter(employee=OuterRef('pk'), exemption=exemption).order_by().values('employee')
+
+            return Coalesce(Subquery(records.annotate(used=Count('pk')).values('used')), V(0),
+                            output_field=IntegerField())
+
+        Employee.objects.filter(pk__in=expired.filter(exemption__in=['1', '2']).values('employee')).update(
+            paid_sick=F('paid_sick') + used('1'), unpaid_sick=F('unpaid_sick') + used('2'))
+
+    @staticmethod
+    def delete_documents(documents):
+        """Deletes the document files of the deleted records that no remaining record still points at"""
+        documents -= set(Attendance.objects.filter(document__in=documents).values_list('document', flat=True))
+
+        for document in documents:
+            default_storage.delete(document)
+
+    @staticmethod
+    def delete_bundles(employee_pks):
+        """Deletes the stored history bundles of the affected employees, they still hold the deleted records until
+        someone asks for a bundle again which may never happen"""
+        for employee_pk in employee_pks:
+            delete_history_bundles(employee_pk)
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef
+from employees.models import Employee, PointsLedger
+from operations.dashboard import invalidate_panels
+import logging
+
+
+class Command(BaseCommand):
+    help = 'This command recomputes every Employee\'s Points Ledger from their active Attendance and Safety Point' \
+           ' records in one aggregate query, reports any ledger that had drifted from the records and fixes it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the drift without fixing it')
+
+    def handle(self, *args, **options):
+        logging.info('Running points ledger rebuild...')
+        totals = Employee.objects.values_list(
+            'pk', 'points_ledger__attendance_points', 'points_ledger__safety_points',
+            PointsLedger.attendance_points_total(OuterRef('pk')),
+            PointsLedger.safety_points_total(OuterRef('pk')),
+        )
+
+        missing = []
+        drifted = []
+
+        for employee_id, attendance_points, safety_points, expected_attendance, expected_safety in totals.iterator():
+            ledger = PointsLedger(employee_id=employee_id, attendance_points=expected_attendance,
+                                  safety_points=expected_safety)
+
+            if attendance_points is None:
+                missing.append(ledger)
+            elif attendance_points != expected_attendance or safety_points != expected_safety:
+                drifted.append(ledger)
+                self.stdout.write(f'Employee {employee_id}: attendance {attendance_points} -> {expected_attendance},'
+                                  f' safety {safety_points} -> {expected_safety}')
+
+        if not options['dry_run']:
+            with transaction.atomic():
+                PointsLedger.objects.bulk_create(missing, batch_size=500)
+                PointsLedger.objects.bulk_update(drifted, ['attendance_points', 'safety_points'], batch_size=500)
+
+                # bulk_create and bulk_update send no signals, the home page lists the employees at 10 attendance
+                # points straight from the ledgers
+                if missing or drifted:
+                    invalidate_panels(['at_10_attendance'])
+
+        success_message = f'{len(missing)} missing and {len(drifted)} drifted ledgers' \
+                          f'{" found" if options["dry_run"] else " rebuilt"}.'
+        self.stdout.write(self.style.SUCCESS(success_message))
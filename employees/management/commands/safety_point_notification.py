@@ -1,8 +1,8 @@
 from django.core.management.base import BaseCommand
-from employees.models import SafetyPoint, Employee
+from employees.models import SafetyPoint
+from employees.notifications import notify_group
 import datetime
 import logging
-from notifications.signals import notify
 
 
 class Command(BaseCommand):
@@ -43,6 +43,4 @@ class Command(BaseCommand):
     @staticmethod
     def send_notification(sender, notification_types, verb):
         for notification_type in notification_types:
-            group = Employee.objects.filter(groups__name=notification_type)
-            notify.send(sender=sender, recipient=group,
-                        verb=verb, type=notification_type, employee_id=sender.employee.employee_id)
+            notify_group(sender, verb, notification_type, employee_id=sender.employee.employee_id)
@@ -0,0 +1,233 @@
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, OuterRef
+from employees.models import Attendance, Company, Counseling, DayOff, Employee, Hold, PointsLedger, SafetyPoint, \
+    Settlement, TimeOffRequest, render_document
+from employees.search import normalize_search_name
+from main.importers import ATTENDANCE_POINTS
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+import datetime
+import io
+import logging
+import random
+
+FIRST_NAMES = ['Maria', 'John', 'Joseph', 'Anna', 'Luis', 'Mohammed', 'Jennifer', 'David', 'Linh', 'Joanne', 'Carlos',
+               'Keisha', 'Robert', 'Fatima', 'Thomas', 'Guadalupe', 'Michael', 'Aisha', 'James', 'Mei']
+LAST_NAMES = ['Smith', 'Lopez', 'Johnson', 'Nguyen', 'Garcia', 'Brown', 'Jones', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Wilson', 'Anderson', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Walker']
+
+DOCUMENT_MODELS = [Attendance, SafetyPoint, Counseling, Settlement]
+STUB_DOCUMENT = 'benchmark/stub.pdf'
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = 'This command fills the database with a synthetic division of the given size for benchmarking. Every ' \
+           'Employee gets a year of Attendance, Safety Point, Counseling and Time Off records, a few are on hold, ' \
+           'have a settlement or are terminated. Records are bulk created, so no signals or notifications run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=1000, help='Number of employees to create')
+        parser.add_argument('--companies', type=int, default=3, help='Number of companies to spread them over')
+        parser.add_argument('--attendance', type=int, default=10, help='Attendance records per employee')
+        parser.add_argument('--safety-points', type=int, default=2, help='Safety points per employee')
+        parser.add_argument('--counseling', type=int, default=2, help='Counseling records per employee')
+        parser.add_argument('--time-off', type=int, default=2, help='Time off requests per employee')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator')
+        parser.add_argument('--render-documents', action='store_true',
+                            help='Render every PDF instead of pointing all records at one stub PDF')
+
+    def handle(self, *args, **options):
+        logging.info('Seeding benchmark data...')
+        self.random = random.Random(options['seed'])
+        self.today = datetime.date.today()
+
+        with transaction.atomic():
+            companies = self.create_companies(options['companies'])
+            employees, supervisors = self.create_employees(options['employees'], companies)
+            document = None if options['render_documents'] else self.save_stub_document()
+
+            created = {
+                Attendance: self.create_attendance(employees, supervisors, options['attendance'], document),
+                SafetyPoint: self.create_safety_points(employees, supervisors, options['safety_points'], document),
+                Counseling: self.create_counseling(employees, supervisors, options['counseling'], document),
+                Hold: self.create_holds(employees, supervisors),
+                TimeOffRequest: self.create_time_off(employees, options['time_off']),
+                Settlement: self.create_settlements(employees, supervisors, document),
+            }
+            self.create_ledgers(employees + supervisors)
+
+        if options['render_documents']:
+            for model in DOCUMENT_MODELS:
+                for pk in model.objects.filter(document_status='pending').values_list('pk', flat=True).iterator():
+                    render_document(model, pk)
+
+        summary = ', '.join(f'{amount} {model._meta.verbose_name_plural}' for model, amount in created.items())
+        self.stdout.write(self.style.SUCCESS(f'Created {len(employees) + len(supervisors)} employees, {summary}.'))
+
+    def seeded(self, queryset, prefix=''):
+        """Narrows the queryset down to the rows of the employees created by this run"""
+        return queryset.filter(**{f'{prefix}employee_id__gte': self.first_id})
+
+    def date_within(self, days):
+        return self.today - datetime.timedelta(days=self.random.randint(0, days))
+
+    def create_companies(self, amount):
+        return [Company.objects.get_or_create(display_name=f'Company {number}',
+                                              defaults={'full_name': f'Benchmark Company {number}'})[0]
+                for number in range(1, amount + 1)]
+
+    def create_employees(self, amount, companies):
+        """Creates the employees with ids after the highest existing one so the command can be run more than once, one
+        in fifty is a supervisor that assigns the records and one in ten is terminated"""
+        self.first_id = (Employee.objects.aggregate(highest=Max('employee_id'))['highest'] or 0) + 1
+        employees = []
+
+        for employee_id in range(self.first_id, self.first_id + amount):
+            first_name = self.random.choice(FIRST_NAMES)
+            last_name = self.random.choice(LAST_NAMES)
+            terminated = employee_id % 10 == 0
+
+            employees.append(Employee(
+                username=f'benchmark.{employee_id}',
+                password='!',
+                employee_id=employee_id,
+                first_name=first_name,
+                last_name=last_name,
+                search_name=normalize_search_name(f'{first_name} {last_name}'),
+                position='dispatch_supervisor' if employee_id % 50 == 0 else 'driver',
+                company=self.random.choice(companies),
+                hire_date=self.date_within(365 * 15),
+                is_active=not terminated,
+                termination_date=self.date_within(365) if terminated else None,
+                termination_type=self.random.choice(['0', '1']) if terminated else None,
+                paid_sick=self.random.randint(0, 3),
+                unpaid_sick=self.random.randint(0, 3),
+            ))
+
+        Employee.objects.bulk_create(employees, batch_size=BATCH_SIZE)
+        employees = list(self.seeded(Employee.objects.all()))
+        supervisors = [employee for employee in employees if employee.position == 'dispatch_supervisor']
+
+        if not supervisors:
+            supervisors = [employees.pop()]
+            supervisors[0].position = 'dispatch_supervisor'
+            supervisors[0].save(update_fields=['position'])
+
+        return [employee for employee in employees if employee not in supervisors], supervisors
+
+    def save_stub_document(self):
+        """Saves the one page PDF every seeded record points at when documents aren't rendered"""
+        if not default_storage.exists(STUB_DOCUMENT):
+            buffer = io.BytesIO()
+            p = canvas.Canvas(buffer, pagesize=letter)
+            p.drawString(72, 720, 'Benchmark document')
+            p.showPage()
+            p.save()
+            default_storage.save(STUB_DOCUMENT, ContentFile(buffer.getvalue()))
+
+        return STUB_DOCUMENT
+
+    def document_fields(self, document):
+        return {'document': document, 'document_status': 'ready'} if document else {}
+
+    def create_attendance(self, employees, supervisors, per_employee, document):
+        records = []
+        for employee in employees:
+            for _ in range(per_employee):
+                reason = self.random.choice(list(ATTENDANCE_POINTS))
+                supervisor = self.random.choice(supervisors)
+                incident_date = self.date_within(365)
+
+                records.append(Attendance(
+                    employee=employee, incident_date=incident_date, issued_date=incident_date, reason=reason,
+                    points=ATTENDANCE_POINTS[reason], exemption='', assigned_by=str(supervisor.employee_id),
+                    assignee=supervisor, **self.document_fields(document)))
+
+        return len(Attendance.objects.bulk_create(records, batch_size=BATCH_SIZE))
+
+    def create_safety_points(self, employees, supervisors, per_employee, document):
+        reasons = [reason for reason, name in SafetyPoint.REASON_CHOICES]
+        records = []
+        for employee in employees:
+            for _ in range(per_employee):
+                supervisor = self.random.choice(supervisors)
+                incident_date = self.date_within(365)
+
+                records.append(SafetyPoint(
+                    employee=employee, incident_date=incident_date, issued_date=incident_date,
+                    reason=self.random.choice(reasons), points=self.random.choice([1, 1, 2, 3]),
+                    details='Seeded for benchmarking', assigned_by=supervisor.employee_id, assignee=supervisor,
+                    **self.document_fields(document)))
+
+        return len(SafetyPoint.objects.bulk_create(records, batch_size=BATCH_SIZE))
+
+    def create_counseling(self, employees, supervisors, per_employee, document):
+        actions = [action for action, name in Counseling.ACTION_CHOICES[:5]]
+        records = []
+        for employee in employees:
+            for _ in range(per_employee):
+                supervisor = self.random.choice(supervisors)
+
+                records.append(Counseling(
+                    employee=employee, issued_date=self.date_within(365), action_type=self.random.choice(actions),
+                    conduct='Seeded for benchmarking', conversation='Seeded for benchmarking',
+                    assigned_by=supervisor.employee_id, assignee=supervisor, **self.document_fields(document)))
+
+        return len(Counseling.objects.bulk_create(records, batch_size=BATCH_SIZE))
+
+    def create_holds(self, employees, supervisors):
+        records = []
+        for employee in self.random.sample(employees, len(employees) // 20):
+            supervisor = self.random.choice(supervisors)
+
+            records.append(Hold(employee=employee, hold_date=self.date_within(60), reason='Training',
+                                assigned_by=supervisor.employee_id, assignee=supervisor))
+
+        return len(Hold.objects.bulk_create(records, batch_size=BATCH_SIZE))
+
+    def create_time_off(self, employees, per_employee):
+        """Creates the requests with one to three consecutive days off each, spread from a year ago to two months
+        ahead"""
+        types = [time_off_type for time_off_type, name in TimeOffRequest.TIME_OFF_CHOICES[1:]]
+        requests = []
+        for employee in employees:
+            for _ in range(per_employee):
+                requests.append(TimeOffRequest(
+                    employee=employee, request_date=self.date_within(365), time_off_type=self.random.choice(types),
+                    status=self.random.choice(['0', '1', '1', '2']), reason='Seeded for benchmarking'))
+
+        TimeOffRequest.objects.bulk_create(requests, batch_size=BATCH_SIZE)
+        requests = self.seeded(TimeOffRequest.objects.all(), 'employee__').values_list('pk', 'request_date')
+
+        days_off = []
+        for pk, request_date in requests.iterator():
+            first_day = request_date + datetime.timedelta(days=self.random.randint(7, 60))
+            days_off += [DayOff(time_off_request_id=pk, requested_date=first_day + datetime.timedelta(days=day))
+                         for day in range(self.random.randint(1, 3))]
+
+        DayOff.objects.bulk_create(days_off, batch_size=BATCH_SIZE)
+
+        return len(requests)
+
+    def create_settlements(self, employees, supervisors, document):
+        records = []
+        for employee in self.random.sample(employees, len(employees) // 50):
+            supervisor = self.random.choice(supervisors)
+
+            records.append(Settlement(
+                employee=employee, details='Seeded for benchmarking', created_date=self.date_within(365),
+                assigned_by=supervisor.employee_id, assignee=supervisor, **self.document_fields(document)))
+
+        return len(Settlement.objects.bulk_create(records, batch_size=BATCH_SIZE))
+
+    def create_ledgers(self, employees):
+        PointsLedger.objects.bulk_create([PointsLedger(employee=employee) for employee in employees],
+                                         batch_size=BATCH_SIZE, ignore_conflicts=True)
+        self.seeded(PointsLedger.objects.all(), 'employee__').update(
+            attendance_points=PointsLedger.attendance_points_total(OuterRef('pk')),
+            safety_points=PointsLedger.safety_points_total(OuterRef('pk')),
+        )
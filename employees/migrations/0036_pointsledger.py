@@ -0,0 +1,49 @@
+# Generated by Django 3.1.14 on 2026-10-18 11:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value as V
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def build_points_ledgers(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    Attendance = apps.get_model('employees', 'Attendance')
+    SafetyPoint = apps.get_model('employees', 'SafetyPoint')
+    PointsLedger = apps.get_model('employees', 'PointsLedger')
+
+    attendance = Attendance.objects.filter(employee=OuterRef('pk'), is_active=True).order_by().values('employee')
+    safety_points = SafetyPoint.objects.filter(employee=OuterRef('pk'), is_active=True).order_by().values('employee')
+
+    totals = Employee.objects.values_list(
+        'pk',
+        Coalesce(Subquery(attendance.annotate(total=Sum('points')).values('total')), V(0),
+                 output_field=models.DecimalField(max_digits=5, decimal_places=1)),
+        Coalesce(Subquery(safety_points.annotate(total=Sum('points')).values('total')), V(0),
+                 output_field=models.IntegerField()),
+    )
+
+    PointsLedger.objects.bulk_create([
+        PointsLedger(employee_id=employee_id, attendance_points=attendance_points, safety_points=safety_points)
+        for employee_id, attendance_points, safety_points in totals.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0035_auto_20210921_1058'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsLedger',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='points_ledger', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('attendance_points', models.DecimalField(decimal_places=1, default=0, max_digits=5)),
+                ('safety_points', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(build_points_ledgers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.1.14 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+def mark_rendered_documents(apps, schema_editor):
+    for model_name in ['Attendance', 'Counseling', 'SafetyPoint', 'Settlement']:
+        model = apps.get_model('employees', model_name)
+        model.objects.exclude(document='').exclude(document=None).update(document_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0036_pointsledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='document_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='counseling',
+            name='document_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='safetypoint',
+            name='document_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='settlement',
+            name='document_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.RunPython(mark_rendered_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 3.1.14 on 2026-10-18 16:42
+
+import sys
+
+from django.db import migrations, transaction
+
+BACKFILL_CHUNK_SIZE = 2000
+
+ASSIGNEE_FIELDS = [
+    ('Attendance', 'assigned_by', 'assignee'),
+    ('Counseling', 'assigned_by', 'assignee'),
+    ('Counseling', 'override_by', 'override_employee'),
+    ('SafetyPoint', 'assigned_by', 'assignee'),
+    ('Hold', 'assigned_by', 'assignee'),
+    ('Settlement', 'assigned_by', 'assignee'),
+]
+
+
+def employee_pk(employee_pks, employee_id):
+    try:
+        return employee_pks.get(int(employee_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def backfill_assignees(apps, schema_editor):
+    """Points the new relations at the Employees whose employee IDs are stored in assigned_by and override_by. Rows are
+    updated in chunks of BACKFILL_CHUNK_SIZE that each commit on their own, so a large table is never locked for the
+    whole backfill"""
+    employee_model = apps.get_model('employees', 'Employee')
+    employee_pks = dict(employee_model.objects.exclude(employee_id=None).values_list('employee_id', 'pk'))
+
+    for model_name, id_field, relation in ASSIGNEE_FIELDS:
+        model = apps.get_model('employees', model_name)
+        pending = model.objects.filter(**{f'{relation}__isnull': True}).exclude(**{f'{id_field}__isnull': True})
+        total = pending.count()
+        done = 0
+        last_pk = 0
+
+        while True:
+            chunk = list(pending.filter(pk__gt=last_pk).order_by('pk').only('pk', id_field)[:BACKFILL_CHUNK_SIZE])
+            if not chunk:
+                break
+
+            for record in chunk:
+                setattr(record, f'{relation}_id', employee_pk(employee_pks, getattr(record, id_field)))
+
+            with transaction.atomic():
+                model.objects.bulk_update(chunk, [relation])
+
+            done += len(chunk)
+            last_pk = chunk[-1].pk
+            sys.stdout.write(f'\n  Backfilled {done}/{total} {model_name}.{relation}')
+            sys.stdout.flush()
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('employees', '0038_assignee_relations'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_assignees, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 3.1.14 on 2026-10-18 18:10
+
+import re
+import unicodedata
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def normalize_search_name(value):
+    # A copy of employees.search.normalize_search_name as it is now, the migration has to keep filling in the same
+    # names whatever happens to that function later
+    value = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode('ascii').lower()
+    value = re.sub(r"['.\-]", '', value)
+
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', value).split())
+
+
+def fill_search_names(apps, schema_editor):
+    employee_model = apps.get_model('employees', 'Employee')
+    employees = list(employee_model.objects.only('pk', 'first_name', 'last_name'))
+
+    for employee in employees:
+        employee.search_name = normalize_search_name(f'{employee.first_name} {employee.last_name}')
+
+    employee_model.objects.bulk_update(employees, ['search_name'], batch_size=1000)
+
+
+class AddPostgresIndex(migrations.AddIndex):
+    """Adds the index to the migration state everywhere but only creates it on PostgreSQL, other databases like the
+    SQLite the tests can run on don't have GIN indexes or the pg_trgm operator classes"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0039_backfill_assignees'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='employee',
+            name='search_name',
+            field=models.CharField(default='', editable=False, max_length=61),
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+        AddPostgresIndex(
+            model_name='employee',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_name'], name='employee_search_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0040_employee_search_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['employee', 'incident_date'], name='attendance_employee_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(is_active=True), fields=['incident_date'], name='attendance_active_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='counseling',
+            index=models.Index(condition=models.Q(is_active=True), fields=['employee', 'issued_date'], name='counseling_active_emp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='counseling',
+            index=models.Index(condition=models.Q(is_active=True), fields=['issued_date'], name='counseling_active_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dayoff',
+            index=models.Index(fields=['requested_date', 'time_off_request'], name='dayoff_date_request_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='safetypoint',
+            index=models.Index(condition=models.Q(is_active=True), fields=['employee', 'incident_date'], name='safetypoint_active_emp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='safetypoint',
+            index=models.Index(condition=models.Q(is_active=True), fields=['incident_date'], name='safetypoint_active_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeoffrequest',
+            index=models.Index(condition=models.Q(is_active=True), fields=['employee', 'request_date'], name='timeoff_active_emp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeoffrequest',
+            index=models.Index(condition=models.Q(is_active=True), fields=['request_date'], name='timeoff_active_date_idx'),
+        ),
+    ]
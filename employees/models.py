@@ -1,12 +1,13 @@
 import datetime
 import io
-import requests
 
-from PyPDF2 import PdfFileMerger, PdfFileReader
 from django.contrib.auth import settings
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
+from django.contrib.postgres.indexes import GinIndex
 from django.core.files.base import ContentFile
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum, Value as V
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from imagekit.models import ProcessedImageField
@@ -21,9 +22,20 @@ from reportlab.lib.utils import ImageReader
 from titlecase import titlecase
 from urllib.parse import urljoin
 
+from .documents import get_history_bundle, merge_documents
+from .search import normalize_search_name
 from .managers import EmployeeManager
 from .validators import pdf_extension
 
+DOCUMENT_STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('ready', 'Ready'),
+    ('failed', 'Failed'),
+]
+
+# The fields saved once a document has been rendered, receivers use it to tell a render apart from an actual change
+DOCUMENT_FIELDS = frozenset(['document', 'document_status'])
+
 
 class Company(models.Model):
     is_active = models.BooleanField(default=True)
@@ -169,6 +181,7 @@ class Employee(AbstractBaseUser, PermissionsMixin):
 
     first_name = models.CharField(max_length=30, verbose_name='First Name')
     last_name = models.CharField(max_length=30, verbose_name='Last Name')
+    search_name = models.CharField(max_length=61, default='', editable=False)
     username = models.CharField(max_length=30, unique=True, verbose_name='Username')
     position = models.CharField(max_length=30, choices=POSITION_CHOICES, verbose_name='Position')
     termination_type = models.CharField(max_length=30, choices=TERMINATION_CHOICES, null=True, blank=True,
@@ -261,6 +274,11 @@ class Employee(AbstractBaseUser, PermissionsMixin):
             ('can_view_termination_reports', 'Can view termination reports'),
         ]
 
+        # The pg_trgm operator class lets the index answer the substring lookups of the employee search
+        indexes = [
+            GinIndex(fields=['search_name'], opclasses=['gin_trgm_ops'], name='employee_search_name_trgm'),
+        ]
+
     def get_last_warnings(self):
         """Returns the dates for the last written warning and removal from service"""
         counseling_history = Counseling.objects.filter(employee=self, is_active=True).exclude(attendance=None)
@@ -314,6 +332,16 @@ class Employee(AbstractBaseUser, PermissionsMixin):
 
         return history
 
+    def save(self, *args, **kwargs):
+        """Keeps the normalized search_name the employee search looks through in step with the name"""
+        self.search_name = normalize_search_name(self.get_full_name())
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'first_name', 'last_name'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'search_name'}
+
+        super().save(*args, **kwargs)
+
     def get_full_name(self):
         """Returns Employees full name as 'first_name last_name'"""
         return f'{self.first_name} {self.last_name}'
@@ -356,25 +384,32 @@ class Employee(AbstractBaseUser, PermissionsMixin):
 
         return tenure_str
 
+    def get_points_ledger(self):
+        """Returns a fresh copy of the Employee's PointsLedger, building it from their records if it is missing"""
+        try:
+            return PointsLedger.objects.get(employee_id=self.pk)
+        except PointsLedger.DoesNotExist:
+            return PointsLedger.rebuild(self.pk)
+
     def get_total_safety_points(self, exclude=None):
-        """Gets all the Safety Point Objects for the employee and adds all the points then returns it. Optionally pass
-        a Safety Point object to be excluded"""
+        """Returns the total of the Employee's active Safety Points from their PointsLedger. Optionally pass a Safety
+        Point object to be excluded"""
+        total = self.get_points_ledger().safety_points
 
-        safety_points = SafetyPoint.objects.filter(employee=self, is_active=True)
-        if exclude:
-            safety_points = safety_points.exclude(pk=exclude.id)
+        if exclude and exclude.is_active:
+            total -= exclude.points
 
-        return sum([safety_point.points for safety_point in safety_points])
+        return total
 
     def get_total_attendance_points(self, exclude=None):
-        """Gets all the Attendance Objects for the employee and adds all the points then returns it. Optionally pass a
+        """Returns the total of the Employee's active Attendance points from their PointsLedger. Optionally pass a
         Attendance object to be excluded"""
-        attendance_records = Attendance.objects.filter(employee=self, is_active=True)
+        total = self.get_points_ledger().attendance_points
 
-        if exclude:
-            attendance_records.exclude(id=exclude.id)
+        if exclude and exclude.is_active:
+            total -= exclude.points
 
-        return sum([attendance_record.points for attendance_record in attendance_records])
+        return total
 
     def get_introductory_status(self):
         """Checks if the Employee is still within their 90 days"""
@@ -536,9 +571,8 @@ class Employee(AbstractBaseUser, PermissionsMixin):
                 previous_counseling[record.action_type] = record.issued_date
 
         point = points[reason] if exemption == '' else 0
-        total_points = float(sum([record.points for record in
-                                  Attendance.objects.filter(employee=self, is_active=True).exclude(
-                                      id=current_id)])) + point
+        current = Attendance.objects.filter(id=current_id, employee=self, is_active=True).first() if current_id else None
+        total_points = float(self.get_total_attendance_points(exclude=current)) + point
 
         # '2' Represents Written Warning
         if '2' in previous_counseling.keys() and total_points >= 10:
@@ -600,15 +634,12 @@ class Employee(AbstractBaseUser, PermissionsMixin):
         new_counseling.attendance = attendance
         new_counseling.save()
 
-    def create_attendance_history_document(self):
-        """Gets all the active Attendance Objects for the Employee and merges all documents into one and make a summary
-        page for the beginning
+    def get_attendance_history_pages(self):
+        """Gets all the active Attendance Objects for the Employee and returns the PDFs that make up their history, a
+        summary page for the beginning followed by every document. Returns an empty list if there are none
         """
-        attendance_history = Attendance.objects.filter(employee=self, is_active=True).order_by('-id')
+        attendance_history = Attendance.objects.filter(employee=self, is_active=True).select_related('assignee').order_by('-id')
         if attendance_history:
-            buffer = io.BytesIO()
-
-            merged_object = PdfFileMerger()
             cover_buffer = io.BytesIO()
 
             reasons = {
@@ -720,28 +751,28 @@ class Employee(AbstractBaseUser, PermissionsMixin):
 
             p.save()
 
-            merged_object.append(PdfFileReader(ContentFile(cover_buffer.getbuffer())))
-
-            for attendance in attendance_history:
-                remote_file = requests.get(attendance.document.url).content
-                memory_file = io.BytesIO(remote_file)
-                merged_object.append(PdfFileReader(memory_file))
+            cover_buffer.seek(0)
 
-            merged_object.write(buffer)
-
-            return ContentFile(buffer.getbuffer())
+            return [cover_buffer] + [ensure_document(attendance).document for attendance in attendance_history]
         else:
-            return None
+            return []
 
-    def create_counseling_history_document(self):
-        """Gets all the active Counseling Objects for the Employee and merges all documents into one and make a summary
-        page for the beginning
+    def merge_attendance_history_document(self):
+        """Merges the attendance history into a temporary file, returns None if there is nothing to merge"""
+        return merge_documents(self.get_attendance_history_pages())
+
+    def create_attendance_history_document(self):
+        """Returns the attendance history bundle, it is only merged again when the history changed since it was last
+        exported. Returns None if there is nothing to merge"""
+        return get_history_bundle(self.pk, 'attendance', self.get_history_version(Attendance),
+                                  self.merge_attendance_history_document)
+
+    def get_counseling_history_pages(self):
+        """Gets all the active Counseling Objects for the Employee and returns the PDFs that make up their history, a
+        summary page for the beginning followed by every document. Returns an empty list if there are none
         """
-        counseling_history = Counseling.objects.filter(employee=self, is_active=True).order_by('-id')
+        counseling_history = Counseling.objects.filter(employee=self, is_active=True).select_related('assignee').order_by('-id')
         if counseling_history:
-            buffer = io.BytesIO()
-
-            merged_object = PdfFileMerger()
             cover_buffer = io.BytesIO()
 
             action_types = {
@@ -809,29 +840,29 @@ class Employee(AbstractBaseUser, PermissionsMixin):
 
             p.save()
 
-            merged_object.append(PdfFileReader(ContentFile(cover_buffer.getbuffer())))
+            cover_buffer.seek(0)
 
-            for counseling in counseling_history:
-                remote_file = requests.get(counseling.document.url).content
-                memory_file = io.BytesIO(remote_file)
-                merged_object.append(PdfFileReader(memory_file))
-
-            merged_object.write(buffer)
-
-            return ContentFile(buffer.getbuffer())
+            return [cover_buffer] + [ensure_document(counseling).document for counseling in counseling_history]
         else:
-            return None
+            return []
 
-    def create_safety_point_history_document(self):
-        """Gets all the active Counseling Objects for the Employee and merges all documents into one and make a summary
-        page for the beginning
+    def merge_counseling_history_document(self):
+        """Merges the counseling history into a temporary file, returns None if there is nothing to merge"""
+        return merge_documents(self.get_counseling_history_pages())
+
+    def create_counseling_history_document(self):
+        """Returns the counseling history bundle, it is only merged again when the history changed since it was last
+        exported. Returns None if there is nothing to merge"""
+        return get_history_bundle(self.pk, 'counseling', self.get_history_version(Counseling),
+                                  self.merge_counseling_history_document)
+
+    def get_safety_point_history_pages(self):
+        """Gets all the active Safety Point Objects for the Employee and returns the PDFs that make up their history, a
+        summary page for the beginning followed by every document. Returns an empty list if there are none
         """
-        safety_point_history = SafetyPoint.objects.filter(employee=self, is_active=True).order_by('-id')
+        safety_point_history = SafetyPoint.objects.filter(employee=self, is_active=True).select_related('assignee').order_by('-id')
 
         if safety_point_history:
-            buffer = io.BytesIO()
-
-            merged_object = PdfFileMerger()
             cover_buffer = io.BytesIO()
 
             reason_choices = {
@@ -907,23 +938,46 @@ class Employee(AbstractBaseUser, PermissionsMixin):
 
             p.save()
 
-            merged_object.append(PdfFileReader(ContentFile(cover_buffer.getbuffer())))
+            cover_buffer.seek(0)
 
-            for safety_point in safety_point_history:
-                remote_file = requests.get(safety_point.document.url).content
-                memory_file = io.BytesIO(remote_file)
-                merged_object.append(PdfFileReader(memory_file))
+            return [cover_buffer] + [ensure_document(safety_point).document for safety_point in safety_point_history]
+        else:
+            return []
 
-            merged_object.write(buffer)
+    def merge_safety_point_history_document(self):
+        """Merges the safety point history into a temporary file, returns None if there is nothing to merge"""
+        return merge_documents(self.get_safety_point_history_pages())
 
-            return ContentFile(buffer.getbuffer())
-        else:
-            return None
+    def create_safety_point_history_document(self):
+        """Returns the safety point history bundle, it is only merged again when the history changed since it was last
+        exported. Returns None if there is nothing to merge"""
+        return get_history_bundle(self.pk, 'safety_point', self.get_history_version(SafetyPoint),
+                                  self.merge_safety_point_history_document)
+
+    def get_history_version(self, model):
+        """Returns the newest id, number and latest edit of the Employee's active records of the given model which
+        changes whenever one of them is added, removed or edited"""
+        fields = {'newest': Max('id'), 'count': Count('id')}
+        if model is Attendance:
+            fields['edited'] = Max('edited_date')
+
+        return sorted(model.objects.filter(employee=self, is_active=True).aggregate(**fields).items())
 
     def create_profile_history_document(self):
-        buffer = io.BytesIO()
+        """Returns the profile history bundle, it is only merged again when the profile or one of the histories changed
+        since it was last exported"""
+        version = [
+            self.get_full_name(), self.employee_id, str(self.primary_phone), str(self.secondary_phone), self.email,
+            self.hire_date, self.company_id, self.position, self.profile_picture.name,
+            self.get_history_version(Attendance), self.get_history_version(Counseling),
+            self.get_history_version(SafetyPoint),
+        ]
+
+        return get_history_bundle(self.pk, 'profile', version, self.merge_profile_history_document)
 
-        merged_object = PdfFileMerger()
+    def merge_profile_history_document(self):
+        """Merges a profile summary page and the attendance, counseling and safety point histories into one temporary
+        file"""
         cover_buffer = io.BytesIO()
 
         p = canvas.Canvas(cover_buffer, pagesize=letter)
@@ -971,21 +1025,10 @@ class Employee(AbstractBaseUser, PermissionsMixin):
         p.showPage()
         p.save()
 
-        merged_object.append(PdfFileReader(ContentFile(cover_buffer.getbuffer())))
-        attendance_history = self.create_attendance_history_document()
-        counseling_history = self.create_counseling_history_document()
-        safety_point_history = self.create_safety_point_history_document()
+        cover_buffer.seek(0)
 
-        if attendance_history:
-            merged_object.append(PdfFileReader(attendance_history))
-        if counseling_history:
-            merged_object.append(PdfFileReader(counseling_history))
-        if safety_point_history:
-            merged_object.append(PdfFileReader(safety_point_history))
-
-        merged_object.write(buffer)
-
-        return ContentFile(buffer.getbuffer())
+        return merge_documents([cover_buffer] + self.get_attendance_history_pages() +
+                               self.get_counseling_history_pages() + self.get_safety_point_history_pages())
 
     def __str__(self):
         return f'{self.last_name}, {self.first_name}'
@@ -1045,13 +1088,23 @@ class Attendance(models.Model):
     issued_date = models.DateField(null=True)
     points = models.DecimalField(max_digits=2, decimal_places=1)
     document = models.FileField(validators=[pdf_extension], upload_to='attendance_forms')
+    document_status = models.CharField(max_length=10, choices=DOCUMENT_STATUS_CHOICES, default='pending')
     reason = models.CharField(max_length=30, choices=REASON_CHOICES)
     assigned_by = models.CharField(max_length=50)
+    assignee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, editable=False, related_name='+')
     exemption = models.CharField(max_length=30, choices=EXEMPTION_CHOICES, blank=True, null=True)
     edited_date = models.DateField(null=True, blank=True)
     edited_by = models.CharField(max_length=30, blank=True, default='')
     uploaded = models.BooleanField(default=False)
 
+    class Meta:
+        # The dashboard looks for recent records of an Employee whether or not they are active, the reports filter
+        # active records on a date range
+        indexes = [
+            models.Index(fields=['employee', 'incident_date'], name='attendance_employee_date_idx'),
+            models.Index(fields=['incident_date'], condition=Q(is_active=True), name='attendance_active_date_idx'),
+        ]
+
     def create_document(self):
         """Will create a PDF for the Attendance and assign it to the Attendance Object"""
         buffer = io.BytesIO()
@@ -1290,12 +1343,13 @@ class Attendance(models.Model):
         p.save()
 
         self.document.save(f'{self.employee.get_full_name()} Attendance Point.pdf', ContentFile(buffer.getbuffer()), save=False)
-        self.save(update_fields=['document'])
+        self.document_status = 'ready'
+        self.save(update_fields=['document', 'document_status'])
 
     def get_assignee(self):
         """Will return the Employee Object of the assignee"""
 
-        return Employee.objects.get(employee_id=self.assigned_by)
+        return self.assignee if self.assignee_id else Employee.objects.get(employee_id=self.assigned_by)
 
     def __str__(self):
         return f"{self.employee.get_full_name()}'s Attendance Point"
@@ -1334,12 +1388,21 @@ class SafetyPoint(models.Model):
     issued_date = models.DateField(null=True)
     points = models.IntegerField()
     document = models.FileField(validators=[pdf_extension], upload_to='safety_point_forms')
+    document_status = models.CharField(max_length=10, choices=DOCUMENT_STATUS_CHOICES, default='pending')
     reason = models.CharField(max_length=30, choices=REASON_CHOICES)
     unsafe_act = models.CharField(max_length=100, blank=True)
     details = models.TextField(default='')
     assigned_by = models.IntegerField()
+    assignee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, editable=False, related_name='+')
     uploaded = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'incident_date'], condition=Q(is_active=True),
+                         name='safetypoint_active_emp_idx'),
+            models.Index(fields=['incident_date'], condition=Q(is_active=True), name='safetypoint_active_date_idx'),
+        ]
+
     def create_document(self):
         """Will create a PDF for the Counseling and assign it to the Counseling Object"""
         subject = {
@@ -1598,12 +1661,13 @@ class SafetyPoint(models.Model):
         self.document.save(f'{self.employee.get_full_name()} Safety Point.pdf', ContentFile(buffer.getbuffer()),
                            save=False)
 
-        self.save(update_fields=['document'])
+        self.document_status = 'ready'
+        self.save(update_fields=['document', 'document_status'])
 
     def get_assignee(self):
         """Will return the Employee object of the assignee"""
 
-        return Employee.objects.get(employee_id=self.assigned_by)
+        return self.assignee if self.assignee_id else Employee.objects.get(employee_id=self.assigned_by)
 
     def get_pretty_unsafe_act(self):
         return titlecase(self.unsafe_act)
@@ -1627,9 +1691,11 @@ class Counseling(models.Model):
 
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
     assigned_by = models.IntegerField()
+    assignee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, editable=False, related_name='+')
     issued_date = models.DateField()
     action_type = models.CharField(max_length=40, choices=ACTION_CHOICES)
     document = models.FileField(validators=[pdf_extension], upload_to='counseling_forms')
+    document_status = models.CharField(max_length=10, choices=DOCUMENT_STATUS_CHOICES, default='pending')
     hearing_datetime = models.DateTimeField(null=True)
     conduct = models.TextField()
     conversation = models.TextField()
@@ -1637,6 +1703,15 @@ class Counseling(models.Model):
     safety_point = models.OneToOneField(SafetyPoint, on_delete=models.CASCADE, null=True, blank=True)
     uploaded = models.BooleanField(default=False)
     override_by = models.IntegerField(null=True)
+    override_employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, editable=False,
+                                          related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'issued_date'], condition=Q(is_active=True),
+                         name='counseling_active_emp_idx'),
+            models.Index(fields=['issued_date'], condition=Q(is_active=True), name='counseling_active_date_idx'),
+        ]
 
     def get_hearing_datetime(self):
         """If there is a hearing datetime it will return the properly formatted string for it otherwise returns a
@@ -1647,10 +1722,13 @@ class Counseling(models.Model):
     def get_assignee(self):
         """Will return the Employee object of the assignee"""
 
-        return Employee.objects.get(employee_id=self.assigned_by)
+        return self.assignee if self.assignee_id else Employee.objects.get(employee_id=self.assigned_by)
 
     def get_override_by(self):
-        return Employee.objects.get(employee_id=self.override_by) if self.override_by else None
+        if not self.override_by:
+            return None
+
+        return self.override_employee if self.override_employee_id else Employee.objects.get(employee_id=self.override_by)
 
     def create_document(self):
         """Will create a PDF for the Counseling and assign it to the Counseling Object"""
@@ -1807,7 +1885,8 @@ class Counseling(models.Model):
         p.save()
 
         self.document.save(f'{self.employee.get_full_name()} Counseling.pdf', ContentFile(buffer.getbuffer()), save=False)
-        self.save(update_fields=['document'])
+        self.document_status = 'ready'
+        self.save(update_fields=['document', 'document_status'])
 
     def __str__(self):
         return f"{self.employee.get_full_name()}'s Counseling"
@@ -1820,13 +1899,14 @@ class Hold(models.Model):
     release_date = models.DateTimeField(null=True, blank=True)
     reason = models.CharField(max_length=30)
     assigned_by = models.IntegerField()
+    assignee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, editable=False, related_name='+')
     employee = models.OneToOneField(Employee, on_delete=models.CASCADE)
     removed_by = models.CharField(max_length=40, default='', blank=True)
 
     def get_assignee(self):
         """Will return the Employee object of the assignee"""
 
-        return Employee.objects.get(employee_id=self.assigned_by)
+        return self.assignee if self.assignee_id else Employee.objects.get(employee_id=self.assigned_by)
 
     def __str__(self):
         return f'{self.employee.get_full_name()}\'s Hold'
@@ -1864,6 +1944,13 @@ class TimeOffRequest(models.Model):
     is_active = models.BooleanField(default=True)
     date_removed = models.DateField(null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'request_date'], condition=Q(is_active=True),
+                         name='timeoff_active_emp_idx'),
+            models.Index(fields=['request_date'], condition=Q(is_active=True), name='timeoff_active_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.employee.get_full_name()}'s Time Off Request"
 
@@ -1873,6 +1960,12 @@ class DayOff(models.Model):
     time_off_request = models.ForeignKey(TimeOffRequest, on_delete=models.CASCADE)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        # The time off report joins the days of a range whether or not they are active, so the index can't be partial
+        indexes = [
+            models.Index(fields=['requested_date', 'time_off_request'], name='dayoff_date_request_idx'),
+        ]
+
     def __str__(self):
         return self.requested_date.strftime('%m-%d-%Y')
 
@@ -1882,7 +1975,9 @@ class Settlement(models.Model):
     details = models.TextField(default='', blank=False)
     created_date = models.DateField(null=True)
     assigned_by = models.IntegerField()
+    assignee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, editable=False, related_name='+')
     document = models.FileField(validators=[pdf_extension], upload_to='settlement_forms', null=True)
+    document_status = models.CharField(max_length=10, choices=DOCUMENT_STATUS_CHOICES, default='pending')
     is_active = models.BooleanField(default=True)
     uploaded = models.BooleanField(default=False)
 
@@ -1987,12 +2082,113 @@ class Settlement(models.Model):
 
         self.document.save(f'{self.employee.get_full_name()} Settlement.pdf', ContentFile(buffer.getbuffer()),
                            save=False)
-        self.save(update_fields=['document'])
+        self.document_status = 'ready'
+        self.save(update_fields=['document', 'document_status'])
 
     def get_assignee(self):
         """Will return the Employee object of the assignee"""
 
-        return Employee.objects.get(employee_id=self.assigned_by)
+        return self.assignee if self.assignee_id else Employee.objects.get(employee_id=self.assigned_by)
 
     def __str__(self):
         return f'{self.employee.get_full_name()}\'s Settlement'
+
+
+class PointsLedger(models.Model):
+    """A denormalized running total of an Employee's active Attendance and Safety Points. It is kept current by the
+    Attendance and SafetyPoint signals so reading an Employee's totals never has to go through their records.
+
+    :param attendance_points: The sum of the points of every active Attendance object for the Employee
+    :type attendance_points: decimal.Decimal
+    :param safety_points: The sum of the points of every active SafetyPoint object for the Employee
+    :type safety_points: int
+    """
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, primary_key=True, related_name='points_ledger')
+    attendance_points = models.DecimalField(max_digits=5, decimal_places=1, default=0)
+    safety_points = models.IntegerField(default=0)
+
+    @staticmethod
+    def attendance_points_total(employee):
+        """Returns an expression for the sum of the active Attendance points of the employee, which can be an id or an
+        OuterRef"""
+        records = Attendance.objects.filter(employee=employee, is_active=True).order_by().values('employee')
+
+        return Coalesce(Subquery(records.annotate(total=Sum('points')).values('total')), V(0),
+                        output_field=models.DecimalField(max_digits=5, decimal_places=1))
+
+    @staticmethod
+    def safety_points_total(employee):
+        """Returns an expression for the sum of the active Safety Points of the employee, which can be an id or an
+        OuterRef"""
+        records = SafetyPoint.objects.filter(employee=employee, is_active=True).order_by().values('employee')
+
+        return Coalesce(Subquery(records.annotate(total=Sum('points')).values('total')), V(0),
+                        output_field=models.IntegerField())
+
+    @classmethod
+    def refresh_attendance_points(cls, employee_id):
+        """Recomputes the attendance points of an existing ledger in a single UPDATE statement"""
+        cls.objects.filter(employee_id=employee_id).update(attendance_points=cls.attendance_points_total(employee_id))
+
+    @classmethod
+    def refresh_many_attendance_points(cls, employee_ids):
+        """Recomputes the attendance points of the ledgers of all the given Employees in a single UPDATE statement"""
+        cls.objects.filter(employee_id__in=employee_ids).update(
+            attendance_points=cls.attendance_points_total(OuterRef('pk')))
+
+    @classmethod
+    def refresh_safety_points(cls, employee_id):
+        """Recomputes the safety points of an existing ledger in a single UPDATE statement"""
+        cls.objects.filter(employee_id=employee_id).update(safety_points=cls.safety_points_total(employee_id))
+
+    @classmethod
+    def refresh_many_safety_points(cls, employee_ids):
+        """Recomputes the safety points of the ledgers of all the given Employees in a single UPDATE statement"""
+        cls.objects.filter(employee_id__in=employee_ids).update(safety_points=cls.safety_points_total(OuterRef('pk')))
+
+    @classmethod
+    def rebuild(cls, employee_id):
+        """Creates or fully recomputes the ledger of the Employee and returns it"""
+        totals = Employee.objects.filter(pk=employee_id).values(
+            attendance_points=cls.attendance_points_total(OuterRef('pk')),
+            safety_points=cls.safety_points_total(OuterRef('pk')),
+        ).get()
+        ledger, created = cls.objects.update_or_create(employee_id=employee_id, defaults=totals)
+
+        return ledger
+
+    def __str__(self):
+        return f"{self.employee.get_full_name()}'s Points Ledger"
+
+
+def render_document(model, pk):
+    """Renders the PDF of an Attendance, Counseling, SafetyPoint or Settlement from the row as it is saved right now.
+    The row stays locked while it renders so renders of the same record never interleave, which makes it safe to render
+    a record as many times as needed. Returns None if the record was deleted before it could be rendered"""
+    try:
+        with transaction.atomic():
+            record = model.objects.select_for_update().filter(pk=pk).first()
+
+            if record and model is Settlement:
+                record.create_settlement_document()
+            elif record:
+                record.create_document()
+    except Exception:
+        model.objects.filter(pk=pk).update(document_status='failed')
+        raise
+
+    return record
+
+
+def ensure_document(record):
+    """Renders the document of the record right away if the background render hasn't finished yet so it can be
+    downloaded"""
+    if record.document_status != 'ready':
+        rendered = render_document(type(record), record.pk)
+
+        if rendered:
+            record.document = rendered.document
+            record.document_status = rendered.document_status
+
+    return record
+
@@ -0,0 +1,231 @@
+"""
+Notification fan-out
+
+notify_group() creates the notifications of one event for everyone in the group of its notification type at once.
+The rows are bulk inserted with their links filled in, the email is rendered a single time and one celery task sends
+it to everyone that wants it, so a group of thirty costs a handful of queries and one task instead of two saves, a
+render and a task for every recipient.
+
+The members of every group are cached with their email address and whether they want the email, the cache moves to
+a new version when group memberships change or a member's email address or preferences no longer match it.
+
+The unread count in the navigation bar is cached per user as well, creating notifications and marking them as read
+drops it so the next read counts again. Open tabs ask for it through a cheap endpoint or keep a server-sent event
+stream open that only sends the count when it changes.
+"""
+import time
+
+from collections import namedtuple
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+from django.utils.html import strip_tags
+from notifications.models import Notification
+
+from employees.models import Employee
+from main.cache_versions import invalidate_version
+from main.tasks import send_emails
+
+BATCH_SIZE = 500
+
+# The email_* preferences of an Employee, each one is the name of the group notified about it as well
+NOTIFICATION_TYPES = [field.name for field in Employee._meta.fields if field.name.startswith('email_')]
+RECIPIENT_FIELDS = frozenset(['employee_id', 'email', *NOTIFICATION_TYPES])
+
+RECIPIENTS_VERSION_KEY = 'employees:notification-recipients:version'
+
+# Recipient sets are only rebuilt after a change, a day without changes still drops them from the cache
+RECIPIENTS_TIMEOUT = 60 * 60 * 24
+
+# Unread counts are dropped on every change, the timeout only keeps the counts of users that left from piling up
+UNREAD_COUNT_TIMEOUT = 60 * 60
+
+Recipient = namedtuple('Recipient', ['pk', 'employee_id', 'email', 'wants_email'])
+
+
+def recipients_key(notification_type, version):
+    return f'employees:notification-recipients:{notification_type}:{version}'
+
+
+def get_recipients(notification_type):
+    """Returns the members of the group of the notification type as Recipients, only querying them when they aren't
+    cached for the current version yet"""
+    version = cache.get(RECIPIENTS_VERSION_KEY, 0)
+    recipients = cache.get(recipients_key(notification_type, version))
+
+    if recipients is None:
+        recipients = list(Employee.objects.filter(groups__name=notification_type)
+                          .values_list('pk', 'employee_id', 'email', notification_type))
+        cache.set(recipients_key(notification_type, version), recipients, timeout=RECIPIENTS_TIMEOUT)
+
+    return [Recipient(*recipient) for recipient in recipients]
+
+
+def recipient_changed(employee):
+    """Whether the Employee's ID, email address or a preference differs from a cached recipient set they are in"""
+    version = cache.get(RECIPIENTS_VERSION_KEY, 0)
+    cached = cache.get_many([recipients_key(notification_type, version) for notification_type in NOTIFICATION_TYPES])
+
+    for notification_type in NOTIFICATION_TYPES:
+        current = (employee.pk, employee.employee_id, employee.email, getattr(employee, notification_type))
+
+        for recipient in cached.get(recipients_key(notification_type, version), []):
+            if recipient[0] == employee.pk and tuple(recipient) != current:
+                return True
+
+    return False
+
+
+def invalidate_recipients():
+    """Moves every recipient set to a new version, see main.cache_versions"""
+    invalidate_version(RECIPIENTS_VERSION_KEY)
+
+
+def unread_count_key(user_pk):
+    return f'employees:notifications:unread:{user_pk}'
+
+
+def get_unread_count(user):
+    """Returns the number of unread notifications of the user, only counting them when the count isn't cached"""
+    count = cache.get(unread_count_key(user.pk))
+
+    if count is None:
+        count = user.notifications.unread().count()
+        cache.set(unread_count_key(user.pk), count, timeout=UNREAD_COUNT_TIMEOUT)
+
+    return count
+
+
+def reset_unread_counts(user_pks):
+    cache.delete_many([unread_count_key(user_pk) for user_pk in user_pks])
+
+
+def invalidate_unread_counts(user_pks):
+    """Drops the cached unread counts of the users right away and again once the surrounding transaction commits, so
+    a count taken from the uncommitted state in the meantime isn't kept"""
+    user_pks = list(user_pks)
+    reset_unread_counts(user_pks)
+    transaction.on_commit(lambda: reset_unread_counts(user_pks))
+
+
+def unread_count_events(user):
+    """
+    Server-sent events with the unread count of the user, one right away and another one whenever the count changes.
+    The cached count is checked every NOTIFICATION_STREAM_INTERVAL seconds and the stream ends after
+    NOTIFICATION_STREAM_DURATION seconds so it doesn't hold a worker forever, the browser reconnects on its own
+
+    :param user: The Employee the count is of
+    :return: Generator of the events as text
+    """
+    yield f'retry: {settings.NOTIFICATION_POLL_PERIOD * 1000}\n\n'
+
+    deadline = time.monotonic() + settings.NOTIFICATION_STREAM_DURATION
+    last_count = None
+
+    while True:
+        count = get_unread_count(user)
+        if count != last_count:
+            yield f'event: unread_count\ndata: {count}\n\n'
+            last_count = count
+
+        if time.monotonic() >= deadline:
+            break
+
+        time.sleep(settings.NOTIFICATION_STREAM_INTERVAL)
+
+
+def notification_url(data, notification_id=None):
+    """
+    The page a notification links to. With the id of the notification in it the page marks it as read when opened,
+    without it the link is the same for every recipient of the event, which is what the email uses
+
+    :param data: The data of the notification, its type, employee_id and for time off requests sender_id
+    :param notification_id: The id of the notification
+    :return: The URL as a path
+    """
+    notification_args = [notification_id] if notification_id else []
+
+    if data['type'] == 'email_new_time_off':
+        return f"{reverse('operations-time-off-reports', args=notification_args)}?id={data['sender_id']}"
+
+    return reverse('employee-account', args=[data['employee_id'], *notification_args])
+
+
+def notify_group(sender, verb, notification_type, exclude=None, **data):
+    """
+    Sends one notification to everyone in the group of the notification type and emails the ones that want it
+
+    :param sender: The record the notification is about
+    :param verb: The message of the notification
+    :param notification_type: The email_* preference of the notification, it is stored as the type in its data
+    :param exclude: Employee ID left out of the recipients, usually the one that assigned the record
+    :param data: Extra data stored with every notification, employee_id and for time off requests sender_id
+    :return: The created notifications
+    """
+    recipients = [recipient for recipient in get_recipients(notification_type)
+                  if exclude is None or str(recipient.employee_id) != str(exclude)]
+    if not recipients:
+        return []
+
+    data = {'type': notification_type, **data}
+    actor_content_type = ContentType.objects.get_for_model(sender)
+    timestamp = timezone.now()
+
+    try:
+        event_url = notification_url(data)
+    except NoReverseMatch:
+        event_url = None
+
+    notifications = [
+        Notification(
+            recipient_id=recipient.pk,
+            actor_content_type=actor_content_type,
+            actor_object_id=sender.pk,
+            verb=str(verb),
+            timestamp=timestamp,
+            emailed=bool(event_url and recipient.email and recipient.wants_email),
+            data=dict(data),
+        )
+        for recipient in recipients
+    ]
+
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications, batch_size=BATCH_SIZE)
+        invalidate_unread_counts(recipient.pk for recipient in recipients)
+
+        if event_url:
+            # Only PostgreSQL hands back the ids of bulk inserted rows, other databases read them back in insert order
+            if notifications[0].pk is None:
+                pks = Notification.objects.filter(actor_content_type=actor_content_type, actor_object_id=sender.pk,
+                                                  timestamp=timestamp).order_by('pk').values_list('pk', flat=True)
+                for notification, pk in zip(notifications, pks):
+                    notification.pk = pk
+
+            for notification in notifications:
+                notification.data['url'] = notification_url(data, notification.pk)
+
+            Notification.objects.bulk_update(notifications, ['data'], batch_size=BATCH_SIZE)
+
+    to = [recipient.email for recipient, notification in zip(recipients, notifications) if notification.emailed]
+
+    if to:
+        domain = Site.objects.get_current().domain
+        email_data = {
+            'notification_message': verb,
+            'notification_href': domain + event_url,
+            'preferences_href': domain + reverse('employee-notification-settings'),
+            'logo_url': urljoin(settings.STATIC_URL, 'main/MV_Transportation_logo.png')
+        }
+        html_message = render_to_string('main/notification_email.html', email_data)
+        plain_message = strip_tags(html_message)
+
+        transaction.on_commit(lambda: send_emails.delay('New Notification', plain_message, to, html_message))
+
+    return notifications
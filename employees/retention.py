@@ -0,0 +1,168 @@
+"""
+Retention policies
+
+Old Counseling, SafetyPoint and Time Off records are deleted by the nightly cleanup commands. The policy of each model
+says which date field ages its records, how many days they are kept, which dependent records go along with them and
+what has to be refreshed afterwards. apply_policy() deletes the expired records in chunks of consecutive primary keys,
+each chunk in its own short transaction, and does what the delete signals would have done once per chunk instead of
+once per record. The document files and stored history bundles of a chunk are removed together once it commits.
+"""
+import datetime
+import logging
+from collections import Counter, namedtuple
+
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+
+from employees.documents import delete_history_bundles, invalidate_history_bundles
+from employees.models import Counseling, DayOff, PointsLedger, SafetyPoint, TimeOffRequest
+from operations.dashboard import PANEL_DEPENDENCIES, invalidate_panels
+
+CHUNK_SIZE = 1000
+
+# model: The model the policy deletes records of
+# age_field: The date field records are aged by
+# days: Records are deleted once more than this many days have passed since their date
+# cascade: (model, field) pairs of records deleted along with the ones they point at through the field
+# history: Whether the records are part of the Employees' history bundles
+# ledger: The PointsLedger classmethod that recomputes the totals of the Employees the records counted towards
+RetentionPolicy = namedtuple('RetentionPolicy', ['model', 'age_field', 'days', 'cascade', 'history', 'ledger'],
+                             defaults=[(), False, None])
+
+POLICIES = {
+    'counseling': RetentionPolicy(Counseling, 'issued_date', 182, history=True),
+    'safety_point': RetentionPolicy(SafetyPoint, 'incident_date', 547, cascade=[(Counseling, 'safety_point')],
+                                    history=True, ledger='refresh_many_safety_points'),
+    'time_off': RetentionPolicy(TimeOffRequest, 'request_date', 182, cascade=[(DayOff, 'time_off_request')]),
+}
+
+
+class RetentionReport:
+    """What applying a policy deleted, the rows of every model and the document files with their size"""
+
+    def __init__(self):
+        self.rows = Counter()
+        self.files = 0
+        self.bytes = 0
+        self.chunks = 0
+
+    def __str__(self):
+        rows = ', '.join(f'{count} {model._meta.verbose_name_plural}' for model, count in self.rows.items() if count)
+
+        return f'Deleted {rows or "nothing"} in {self.chunks} chunks, reclaimed {self.bytes} bytes from ' \
+               f'{self.files} files.'
+
+
+def collect_files(queryset):
+    """Returns the (model, field, name) of every document file the records of the queryset have"""
+    files = []
+
+    for field in queryset.model._meta.fields:
+        if isinstance(field, models.FileField):
+            names = queryset.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})\
+                .values_list(field.name, flat=True)
+            files.extend((queryset.model, field, name) for name in names)
+
+    return files
+
+
+def delete_files(files, report):
+    """Deletes the files no remaining record points at anymore, one query per field to find those that are still in
+    use, and adds them with their size to the report"""
+    fields = {}
+    for model, field, name in files:
+        fields.setdefault((model, field), set()).add(name)
+
+    for (model, field), names in fields.items():
+        names -= set(model.objects.filter(**{f'{field.name}__in': names}).values_list(field.name, flat=True))
+
+        for name in names:
+            try:
+                size = field.storage.size(name)
+                field.storage.delete(name)
+            except OSError:
+                logging.warning(f'Could not delete {name}')
+                continue
+
+            report.files += 1
+            report.bytes += size
+
+
+def delete_bundles(employee_pks):
+    """Deletes the stored history bundles of the Employees"""
+    for employee_pk in employee_pks:
+        delete_history_bundles(employee_pk)
+
+
+def delete_chunk(policy, records, report):
+    """Deletes the records and the ones depending on them in a single transaction"""
+    with transaction.atomic():
+        employee_pks = set(records.order_by().values_list('employee', flat=True).distinct())
+        files = []
+        changed_models = [policy.model]
+
+        # _raw_delete runs a single DELETE without loading the records and sending their signals, the dependent records
+        # go first so nothing is left pointing at a deleted record
+        for model, field in policy.cascade:
+            dependents = model.objects.filter(**{f'{field}__in': records})
+            files += collect_files(dependents)
+            report.rows[model] += dependents._raw_delete(dependents.db)
+            changed_models.append(model)
+
+        files += collect_files(records)
+        report.rows[policy.model] += records._raw_delete(records.db)
+        report.chunks += 1
+
+        if policy.ledger:
+            getattr(PointsLedger, policy.ledger)(employee_pks)
+
+        # The stored bundles still hold the deleted records until someone asks for them again, which may never happen
+        if policy.history:
+            invalidate_history_bundles(*employee_pks)
+            transaction.on_commit(lambda: delete_bundles(employee_pks))
+
+        invalidate_panels({panel for model in changed_models for panel in PANEL_DEPENDENCIES.get(model, [])})
+        transaction.on_commit(lambda: delete_files(files, report))
+
+
+def apply_policy(policy, chunk_size=CHUNK_SIZE, today=None):
+    """
+    Deletes every record the policy says has expired, chunk_size consecutive primary keys at a time
+
+    :param policy: The RetentionPolicy to apply
+    :param chunk_size: How many records are deleted per transaction at most
+    :param today: The date the age of the records is counted from, today if there is none
+    :return: RetentionReport of what was deleted
+    """
+    today = today or datetime.datetime.today().date()
+    expired = policy.model.objects.filter(**{f'{policy.age_field}__lt': today - datetime.timedelta(days=policy.days)})
+    report = RetentionReport()
+    last_pk = None
+
+    while True:
+        remaining = expired if last_pk is None else expired.filter(pk__gt=last_pk)
+        pks = list(remaining.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+
+        if not pks:
+            break
+
+        delete_chunk(policy, expired.filter(pk__range=(pks[0], pks[-1])), report)
+        last_pk = pks[-1]
+
+    return report
+
+
+class RetentionCommand(BaseCommand):
+    """Management command that applies the policy of POLICIES it names"""
+    policy = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='How many records are deleted per transaction at most')
+
+    def handle(self, *args, **options):
+        logging.info(f'Running {self.policy} cleanup...')
+        report = apply_policy(POLICIES[self.policy], chunk_size=options['chunk_size'])
+
+        logging.info(str(report))
+        self.stdout.write(self.style.SUCCESS(str(report)))
@@ -0,0 +1,66 @@
+import re
+import unicodedata
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value as V, When
+
+# Most employees a search hands back, the autocomplete only shows a handful anyway
+SEARCH_RESULT_LIMIT = 20
+
+
+def normalize_search_name(value):
+    """Lower cases the value, strips accents and punctuation and collapses whitespace so 'José  O'Neil' is stored and
+    searched as 'jose oneil'"""
+    value = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode('ascii').lower()
+    value = re.sub(r"['.\-]", '', value)
+
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', value).split())
+
+
+def filter_by_name(queryset, search, prefix=''):
+    """
+    This function narrows a queryset down to the employees whose name contains every word of the search. The words are
+    matched against the stored search_name, on PostgreSQL a pg_trgm GIN index answers these substring lookups instead
+    of every name being scanned
+
+    :param queryset: Queryset of Employees or of records with an employee relation
+    :param search: What was typed into the search box
+    :param prefix: The lookup path to the Employee, like 'employee__' for records
+    :return: The filtered queryset
+    """
+    condition = Q()
+    for word in normalize_search_name(search).split():
+        condition &= Q(**{f'{prefix}search_name__contains': word})
+
+    return queryset.filter(condition)
+
+
+def find_employees(queryset, search, limit=SEARCH_RESULT_LIMIT):
+    """
+    This function returns the best matches for a search out of a queryset of Employees. Names that start with the
+    search come first, then names with a word that starts with it, then every other match. On PostgreSQL the trigram
+    similarity breaks the ties
+
+    :param queryset: Queryset of Employees to search in
+    :param search: What was typed into the search box
+    :param limit: Most Employees to return
+    :return: Sliced queryset of the ranked Employees
+    """
+    search = normalize_search_name(search)
+    if not search:
+        return queryset.none()
+
+    employees = filter_by_name(queryset, search).annotate(search_rank=Case(
+        When(search_name__startswith=search, then=V(0)),
+        When(search_name__contains=f' {search}', then=V(1)),
+        default=V(2),
+        output_field=IntegerField(),
+    ))
+    ordering = ['search_rank', 'search_name']
+
+    if connection.vendor == 'postgresql':
+        employees = employees.annotate(search_similarity=TrigramSimilarity('search_name', search))
+        ordering.insert(1, '-search_similarity')
+
+    return employees.order_by(*ordering)[:limit]
@@ -2,18 +2,138 @@ import datetime
 
 from django.contrib.auth import settings
 from django.contrib.auth.models import Group
-from django.contrib.sites.models import Site
-from django.db.models.signals import post_delete, post_save, pre_delete
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from django.template.loader import render_to_string
-from django.urls import reverse, NoReverseMatch
-from django.utils.html import strip_tags
 from notifications.models import Notification
-from notifications.signals import notify
-from urllib.parse import urljoin
 
-from employees.models import Attendance, Counseling, SafetyPoint, Hold, Employee, Settlement, TimeOffRequest
-from main.tasks import send_email
+from employees.models import Attendance, Counseling, SafetyPoint, Hold, Employee, Settlement, TimeOffRequest, \
+    PointsLedger, DOCUMENT_FIELDS, render_document
+from employees.documents import delete_history_bundles, invalidate_history_bundles
+from employees.notifications import RECIPIENT_FIELDS, invalidate_recipients, invalidate_unread_counts, notify_group, \
+    recipient_changed
+from main.tasks import create_document
+
+
+def queue_document(instance):
+    """Marks the document of the record as pending and has the celery worker render it once the record is committed
+    so the request doesn't wait on it. With RENDER_DOCUMENTS_ASYNC turned off it is rendered right away instead"""
+    model = type(instance)
+
+    if not settings.RENDER_DOCUMENTS_ASYNC:
+        rendered = render_document(model, instance.pk)
+        instance.document = rendered.document
+        instance.document_status = rendered.document_status
+    else:
+        if instance.document_status != 'pending':
+            model.objects.filter(pk=instance.pk).update(document_status='pending')
+            instance.document_status = 'pending'
+
+        transaction.on_commit(lambda: create_document.delay(model.__name__, instance.pk))
+
+
+# assigned_by and override_by keep holding employee IDs since that is what every form and import writes, the relations
+# follow them so the Employees can be joined instead of looked up one record at a time
+@receiver(pre_save, sender=Attendance)
+@receiver(pre_save, sender=Counseling)
+@receiver(pre_save, sender=SafetyPoint)
+@receiver(pre_save, sender=Hold)
+@receiver(pre_save, sender=Settlement)
+def sync_assignee(sender, instance, update_fields=None, **kwargs):
+    for id_field, relation in [('assigned_by', 'assignee'), ('override_by', 'override_employee')]:
+        if not hasattr(instance, id_field) or (update_fields is not None and id_field not in update_fields):
+            continue
+
+        try:
+            employee_id = int(getattr(instance, id_field))
+        except (TypeError, ValueError):
+            setattr(instance, relation, None)
+            continue
+
+        field = sender._meta.get_field(relation)
+        if field.is_cached(instance) and getattr(getattr(instance, relation), 'employee_id', None) == employee_id:
+            continue
+
+        setattr(instance, f'{relation}_id',
+                Employee.objects.filter(employee_id=employee_id).values_list('pk', flat=True).first())
+
+
+# The points ledger receivers are connected first so the totals are already current when the document and counseling
+# receivers below read them
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def update_attendance_ledger(sender, instance, update_fields=None, **kwargs):
+    if update_fields != DOCUMENT_FIELDS:
+        PointsLedger.refresh_attendance_points(instance.employee_id)
+
+
+@receiver(post_save, sender=SafetyPoint)
+@receiver(post_delete, sender=SafetyPoint)
+def update_safety_point_ledger(sender, instance, update_fields=None, **kwargs):
+    if update_fields != DOCUMENT_FIELDS:
+        PointsLedger.refresh_safety_points(instance.employee_id)
+
+
+@receiver(post_save, sender=Employee)
+def create_points_ledger(sender, instance, created, **kwargs):
+    if created:
+        PointsLedger.objects.get_or_create(employee=instance)
+
+
+# Any change to a record, its document included, changes the history bundles it is part of. Bundles are stored under
+# a hash of the generation so bumping it is enough, the stale ones are deleted when the next bundle of their kind is
+# stored
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=Counseling)
+@receiver(post_delete, sender=Counseling)
+@receiver(post_save, sender=SafetyPoint)
+@receiver(post_delete, sender=SafetyPoint)
+def invalidate_record_bundles(sender, instance, **kwargs):
+    invalidate_history_bundles(instance.employee_id)
+
+
+@receiver(post_save, sender=Employee)
+def invalidate_profile_bundle(sender, instance, created, update_fields=None, **kwargs):
+    # The profile summary page shows the Employee's details, older bundles are cleaned up when the next one is stored
+    if not created and update_fields != frozenset(['last_login']):
+        invalidate_history_bundles(instance.pk)
+
+
+@receiver(post_delete, sender=Employee)
+def delete_employee_bundles(sender, instance, **kwargs):
+    # Nothing asks for the bundles of a deleted Employee again so no next bundle would ever clean them up
+    employee_pk = instance.pk
+    transaction.on_commit(lambda: delete_history_bundles(employee_pk))
+
+
+# The cached recipient sets of the notifications follow the groups and the email preferences of their members, an
+# Employee saved through NotificationSettings or anywhere else only moves them to a new version when it changed them
+@receiver(m2m_changed, sender=Employee.groups.through)
+def invalidate_recipients_on_groups(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_recipients()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Employee)
+def invalidate_recipient_sets(sender, **kwargs):
+    invalidate_recipients()
+
+
+@receiver(post_save, sender=Employee)
+def invalidate_changed_recipient(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or RECIPIENT_FIELDS & update_fields) and recipient_changed(instance):
+        invalidate_recipients()
+
+
+# Marking a notification as read or unread saves it, notifications created by notify_group are bulk inserted and drop
+# the counts themselves
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalidate_unread_count(sender, instance, **kwargs):
+    invalidate_unread_counts([instance.recipient_id])
 
 
 @receiver(post_delete, sender=Attendance)
@@ -31,10 +151,8 @@ def hold_delete(sender, instance, **kwargs):
     verb = f'{instance.employee.get_full_name()}\'s hold has been removed by {instance.removed_by}.'
     notification_type = 'email_rem_hold'
 
-    group = Employee.objects.filter(groups__name=notification_type).exclude(employee_id=instance.assigned_by)
-    notify.send(sender=instance, recipient=group,
-                verb=verb,
-                type=notification_type, employee_id=instance.employee.employee_id)
+    notify_group(instance, verb, notification_type, exclude=instance.assigned_by,
+                 employee_id=instance.employee.employee_id)
 
 
 @receiver(post_save, sender=Hold)
@@ -43,78 +161,36 @@ def hold_notification(sender, instance, created,**kwargs):
         verb = f'{instance.employee.get_full_name()} has been placed on hold by {instance.get_assignee().get_full_name()}. Reason: {instance.reason}'
         notification_type = 'email_add_hold'
 
-        group = Employee.objects.filter(groups__name=notification_type).exclude(employee_id=instance.assigned_by)
-        notify.send(sender=instance, recipient=group,
-                    verb=verb,
-                    type=notification_type, employee_id=instance.employee.employee_id)
-
-
-@receiver(post_save, sender=Notification)
-def new_notification(sender, instance, created, **kwargs):
-    try:
-        if created:
-            field_name = instance.data['type']
-            if field_name == 'email_new_time_off':
-                instance.data['url'] = f"{reverse('operations-time-off-reports', args=[instance.id])}?id={instance.data['sender_id']}"
-            else:
-                instance.data['url'] = reverse('employee-account', args=[instance.data['employee_id'], instance.id])
-
-            instance.save()
-
-            if getattr(instance.recipient, field_name):
-                domain = Site.objects.get_current().domain
-                data = {
-                    'notification_message': instance.verb,
-                    'notification_href': domain + instance.data['url'],
-                    'preferences_href': domain + reverse('employee-notification-settings'),
-                    'logo_url': urljoin(settings.STATIC_URL, 'main/MV_Transportation_logo.png')
-                }
-                subject = 'New Notification'
-                html_message = render_to_string('main/notification_email.html', data)
-                plain_message = strip_tags(html_message)
-                to = instance.recipient.email
-
-                send_email.delay(subject, plain_message, to, html_message)
-
-                instance.emailed = True
-
-                instance.save()
-    except NoReverseMatch:
-        pass
+        notify_group(instance, verb, notification_type, exclude=instance.assigned_by,
+                     employee_id=instance.employee.employee_id)
 
 
 @receiver(post_save, sender=Counseling)
 def add_counseling_document(sender, instance, created, update_fields, **kwargs):
     try:
         if created or 'document' not in update_fields:
-            instance.create_document()
+            queue_document(instance)
 
             if created:
                 if instance.action_type == '2':
                     verb = f'{instance.employee.get_full_name()} has received a written warning' if instance.attendance is None else f'{instance.employee.get_full_name()} has received a written warning for reaching 7 Attendance Points'
                     notification_type = 'email_written' if instance.attendance is None else 'email_7attendance'
 
-                    group = Employee.objects.filter(groups__name=notification_type).exclude(employee_id=instance.assigned_by)
-                    notify.send(sender=instance, recipient=group,
-                                verb=verb,
-                                type=notification_type, employee_id=instance.employee.employee_id)
+                    notify_group(instance, verb, notification_type, exclude=instance.assigned_by,
+                                 employee_id=instance.employee.employee_id)
                 elif instance.action_type == '4':
                     verb = f'{instance.employee.get_full_name()} has received a last and final'
                     notification_type = 'email_last_final'
 
-                    group = Employee.objects.filter(groups__name=notification_type).exclude(employee_id=instance.assigned_by)
-                    notify.send(sender=instance, recipient=group,
-                                verb=verb,
-                                type=notification_type, employee_id=instance.employee.employee_id)
+                    notify_group(instance, verb, notification_type, exclude=instance.assigned_by,
+                                 employee_id=instance.employee.employee_id)
 
                 elif instance.action_type == '6' or instance.action_type == '5':
                     verb = f'{instance.employee.get_full_name()} has been Removed from Service'if instance.attendance is None else f'{instance.employee.get_full_name()} has been Removed from Service for reaching 10 Attendance Points'
                     notification_type = 'email_removal' if instance.attendance is None else 'email_10attendance'
 
-                    group = Employee.objects.filter(groups__name=notification_type).exclude(employee_id=instance.assigned_by)
-                    notify.send(sender=instance, recipient=group,
-                                verb=verb,
-                                type=notification_type, employee_id=instance.employee.employee_id)
+                    notify_group(instance, verb, notification_type, exclude=instance.assigned_by,
+                                 employee_id=instance.employee.employee_id)
 
                     if not instance.attendance:
                         try:
@@ -139,7 +215,7 @@ def add_counseling_document(sender, instance, created, update_fields, **kwargs):
 def add_attendance_document(sender, instance, created, update_fields, **kwargs):
     try:
         if created or 'document' not in update_fields:
-            instance.create_document()
+            queue_document(instance)
             counseling = instance.employee.attendance_counseling_required(instance.reason, instance.exemption, instance.id)
 
             if counseling[0] == 2 and instance.points != 0:
@@ -179,16 +255,14 @@ def add_attendance_document(sender, instance, created, update_fields, **kwargs):
 def add_safety_document(sender, instance, created, update_fields, **kwargs):
     try:
         if created or 'document' not in update_fields:
-            instance.create_document()
+            queue_document(instance)
 
             removal = instance.employee.safety_point_removal_required(instance)
 
             if created:
                 verb = f'{instance.employee.get_full_name()} has received a Safety Point' if not removal else f'{instance.employee.get_full_name()} has received a Safety Point and been removed from service'
-                group = Employee.objects.filter(groups__name='email_safety_point').exclude(employee_id=instance.assigned_by)
-                notify.send(sender=instance, recipient=group,
-                            verb=verb,
-                            type='email_safety_point', employee_id=instance.employee.employee_id)
+                notify_group(instance, verb, 'email_safety_point', exclude=instance.assigned_by,
+                             employee_id=instance.employee.employee_id)
     except TypeError:
         pass
 
@@ -197,15 +271,13 @@ def add_safety_document(sender, instance, created, update_fields, **kwargs):
 def add_settlement_document(sender, instance, created, update_fields, **kwargs):
     try:
         if created or 'document' not in update_fields:
-            instance.create_settlement_document()
+            queue_document(instance)
 
             if created:
                 verb = f'New Settlement Created for {instance.employee.get_full_name()}'
 
-                group = Employee.objects.filter(groups__name='email_add_settlement').exclude(employee_id=instance.assigned_by)
-                notify.send(sender=instance, recipient=group,
-                            verb=verb,
-                            type='email_add_settlement', employee_id=instance.employee.employee_id)
+                notify_group(instance, verb, 'email_add_settlement', exclude=instance.assigned_by,
+                             employee_id=instance.employee.employee_id)
     except TypeError:
         pass
 
@@ -224,10 +296,8 @@ def check_floating_holiday(sender, instance, created, update_fields, **kwargs):
         verb = f'{instance.employee.get_full_name()} has requested time off'
         notification_type = 'email_new_time_off'
 
-        group = Employee.objects.filter(groups__name=notification_type)
-        notify.send(sender=instance, recipient=group,
-                    verb=verb, sender_id=instance.id,
-                    type=notification_type, employee_id=instance.employee.employee_id)
+        notify_group(instance, verb, notification_type, sender_id=instance.id,
+                     employee_id=instance.employee.employee_id)
 
     instance.employee.save()
 
@@ -238,9 +308,7 @@ def add_new_employee(sender, instance, created, update_fields, **kwargs):
         verb = f'New Employee added: {instance.get_full_name()}'
         notification_type = 'email_new_employee'
         
-        group = Employee.objects.filter(groups__name=notification_type)
-        notify.send(sender=instance, recipient=group,
-                    verb=verb, type=notification_type, employee_id=instance.employee_id)
+        notify_group(instance, verb, notification_type, employee_id=instance.employee_id)
 
         if instance.position == 'dispatcher':
             dispatcher_group = Group.objects.get(name='Dispatchers')
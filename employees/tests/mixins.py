@@ -0,0 +1,21 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+
+class TemporaryMediaMixin:
+    """Saves the files of the tests of the class to a temporary MEDIA_ROOT of their own that is removed after them"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
@@ -0,0 +1,106 @@
+import io
+import threading
+import time
+
+import requests
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.db.models import FileField
+from django.db.models.fields.files import FieldFile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+
+def create_stub_pdf(text):
+    """Creates a one page PDF with the given text on it"""
+    buffer = io.BytesIO()
+
+    p = canvas.Canvas(buffer, pagesize=letter)
+    p.drawString(72, 720, text)
+    p.showPage()
+    p.save()
+
+    return buffer.getvalue()
+
+
+class StubRemoteStorage(Storage):
+    """A storage backend whose files live on a StubStorageServer, opening one downloads it the way the S3 backend
+    fetches it from the bucket"""
+
+    def __init__(self, stub):
+        self.stub = stub
+
+    def _open(self, name, mode='rb'):
+        response = requests.get(self.url(name))
+        response.raise_for_status()
+
+        return ContentFile(response.content, name=name)
+
+    def url(self, name):
+        return self.stub.url(f'media/{name}')
+
+
+class StubStorageServer:
+    """A local stand in for the storage backend that answers every GET with a one page PDF naming the requested path
+    after waiting the given latency, meant to be used as a context manager. It keeps track of the most requests it was
+    answering at the same time"""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.request_count = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.create_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def create_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    stub.request_count += 1
+                    stub.in_flight += 1
+                    stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+
+                try:
+                    time.sleep(stub.latency)
+                    body = create_stub_pdf(self.path)
+
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/pdf')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def url(self, path):
+        host, port = self.server.server_address
+
+        return f'http://{host}:{port}/{path.lstrip("/")}'
+
+    def field_files(self, names):
+        """FieldFiles of documents with the given names stored on this server"""
+        field = FileField(storage=StubRemoteStorage(self))
+
+        return [FieldFile(None, field, name) for name in names]
+
+    def __enter__(self):
+        self.thread.start()
+
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
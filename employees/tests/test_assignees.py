@@ -0,0 +1,85 @@
+import datetime
+import importlib
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.test import TestCase
+
+from employees.models import Attendance, Employee
+from employees.signals import sync_assignee
+from employees.tests.mixins import TemporaryMediaMixin
+
+
+class TestAssigneeRelation(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        """Create two supervisors that assign records and an Employee that receives them"""
+        self.supervisor = Employee.objects.create_user(
+            username='test.supervisor',
+            password='test',
+            first_name='Test',
+            last_name='Supervisor',
+            employee_id=1,
+        )
+        self.other_supervisor = Employee.objects.create_user(
+            username='other.supervisor',
+            password='test',
+            first_name='Other',
+            last_name='Supervisor',
+            employee_id=3,
+        )
+        self.employee = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=2,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+
+    def assign_attendance(self, assigned_by):
+        return Attendance.objects.create(employee=self.employee, incident_date=datetime.date.today(),
+                                         issued_date=datetime.date.today(), points=0, reason='1',
+                                         assigned_by=assigned_by, exemption='')
+
+    def test_assignee_follows_assigned_by(self):
+        """Test that the assignee relation points at the Employee with the assigned_by employee ID, also after it is
+        changed"""
+        attendance = self.assign_attendance(str(self.supervisor.employee_id))
+        self.assertEqual(Attendance.objects.get(pk=attendance.pk).assignee, self.supervisor)
+
+        attendance.assigned_by = str(self.other_supervisor.employee_id)
+        attendance.save(update_fields=['assigned_by', 'assignee'])
+        self.assertEqual(Attendance.objects.get(pk=attendance.pk).assignee, self.other_supervisor)
+
+    def test_unknown_assignee(self):
+        """Test that a record assigned by an employee ID nobody has is left without an assignee"""
+        attendance = Attendance(employee=self.employee, assigned_by='99', assignee=self.supervisor)
+        sync_assignee(Attendance, attendance)
+
+        self.assertIsNone(attendance.assignee)
+
+    def test_get_assignee_joined(self):
+        """Test that the assignee of a record fetched with select_related doesn't need another query"""
+        self.assign_attendance(str(self.supervisor.employee_id))
+        attendance = Attendance.objects.select_related('assignee').get(employee=self.employee)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(attendance.get_assignee().get_full_name(), 'Test Supervisor')
+
+    def test_backfill(self):
+        """Test that the migration backfill points the relations of existing records at their assignees a chunk at a
+        time, leaving the ones assigned by an unknown employee ID without one"""
+        records = [self.assign_attendance(str(self.supervisor.employee_id)) for _ in range(4)]
+        unknown = records[-1]
+        Attendance.objects.filter(pk=unknown.pk).update(assigned_by='99')
+        Attendance.objects.update(assignee=None)
+
+        migration = importlib.import_module('employees.migrations.0039_backfill_assignees')
+        with mock.patch.object(migration, 'BACKFILL_CHUNK_SIZE', 2), mock.patch('sys.stdout', new=StringIO()) as out:
+            migration.backfill_assignees(apps, None)
+
+        self.assertIn('Backfilled 2/4 Attendance.assignee', out.getvalue())
+        self.assertIn('Backfilled 4/4 Attendance.assignee', out.getvalue())
+        self.assertEqual(Attendance.objects.filter(assignee=self.supervisor).count(), 3)
+        self.assertIsNone(Attendance.objects.get(pk=unknown.pk).assignee)
@@ -0,0 +1,143 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase
+
+from employees.documents import get_history_bundle, merge_documents
+from employees.models import Attendance, Counseling, Employee, PointsLedger
+from employees.tests.mixins import TemporaryMediaMixin
+
+
+class TestAttendanceCleanup(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        """Create a supervisor and two Employees, one with recent Attendance and one with a clean slate"""
+        self.supervisor = Employee.objects.create_user(
+            username='test.supervisor',
+            password='test',
+            first_name='Test',
+            last_name='Supervisor',
+            employee_id=1,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+        self.employee = self.create_employee(2)
+        self.clean_slate = self.create_employee(3)
+        self.today = datetime.date.today()
+
+    @staticmethod
+    def create_employee(employee_id):
+        return Employee.objects.create_user(
+            username=f'test.user{employee_id}',
+            password='test',
+            first_name='Test',
+            last_name=f'User{employee_id}',
+            employee_id=employee_id,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+
+    def assign_attendance(self, employee, days_ago, exemption=''):
+        attendance = Attendance(
+            employee=employee,
+            incident_date=self.today - datetime.timedelta(days=days_ago),
+            issued_date=self.today,
+            points=1,
+            reason='0',
+            assigned_by=self.supervisor.employee_id,
+            exemption=exemption,
+        )
+        attendance.save()
+
+        return attendance
+
+    @staticmethod
+    def sick_days(employee):
+        employee.refresh_from_db()
+
+        return employee.paid_sick, employee.unpaid_sick
+
+    def cleanup(self, **options):
+        output = StringIO()
+        call_command('attendance_cleanup', stdout=output, **options)
+
+        return output.getvalue()
+
+    def test_cleanup(self):
+        """Test that records older than a year and all records of an Employee with a clean slate are deleted"""
+        year_old = self.assign_attendance(self.employee, 400)
+        recent = self.assign_attendance(self.employee, 10)
+        self.assign_attendance(self.clean_slate, 400)
+        self.assign_attendance(self.clean_slate, 200)
+
+        output = self.cleanup()
+
+        self.assertIn('Deleted 3 records.', output)
+        self.assertIn('Refreshed the points ledgers in', output)
+        self.assertFalse(Attendance.objects.filter(pk=year_old.pk).exists())
+        self.assertEqual(list(Attendance.objects.values_list('pk', flat=True)), [recent.pk])
+
+    def test_sick_days_given_back(self):
+        """Test that every deleted sick day is given back to the Employee that used it"""
+        self.assign_attendance(self.employee, 400, exemption='1')
+        self.assign_attendance(self.employee, 10, exemption='1')
+        self.assign_attendance(self.clean_slate, 300, exemption='1')
+        self.assign_attendance(self.clean_slate, 250, exemption='2')
+        self.assign_attendance(self.clean_slate, 200, exemption='2')
+        paid_sick, unpaid_sick = self.sick_days(self.employee)
+        clean_slate_paid_sick, clean_slate_unpaid_sick = self.sick_days(self.clean_slate)
+
+        self.cleanup()
+
+        self.assertEqual(self.sick_days(self.employee), (paid_sick + 1, unpaid_sick))
+        self.assertEqual(self.sick_days(self.clean_slate), (clean_slate_paid_sick + 1, clean_slate_unpaid_sick + 2))
+
+    def test_ledger_refreshed(self):
+        """Test that the ledgers of the Employees only count what is left"""
+        self.assign_attendance(self.employee, 400)
+        self.assign_attendance(self.employee, 10)
+        self.assign_attendance(self.clean_slate, 200)
+
+        self.cleanup()
+
+        self.assertEqual(PointsLedger.objects.get(employee=self.employee).attendance_points, 1)
+        self.assertEqual(PointsLedger.objects.get(employee=self.clean_slate).attendance_points, 0)
+
+    def test_counseling_deleted(self):
+        """Test that the counseling of a deleted record goes with it"""
+        attendance = self.assign_attendance(self.clean_slate, 200)
+        Counseling.objects.create(employee=self.clean_slate, attendance=attendance, assigned_by=1, action_type='0',
+                                  issued_date=self.today, conduct='Test', conversation='Test')
+
+        self.cleanup()
+
+        self.assertFalse(Counseling.objects.filter(attendance=attendance.pk).exists())
+
+    def test_bundles_deleted(self):
+        """Test that the stored bundles of the Employees that lost records are deleted and no others"""
+        for employee in [self.employee, self.clean_slate]:
+            attendance = self.assign_attendance(employee, 200 if employee == self.clean_slate else 10)
+            get_history_bundle(employee.pk, 'attendance', 'version',
+                               lambda: merge_documents([attendance.document])).close()
+
+        # The bundles are deleted once the cleanup commits, which a TestCase never does
+        with mock.patch('employees.management.commands.attendance_cleanup.transaction.on_commit',
+                        side_effect=lambda function: function()):
+            self.cleanup()
+
+        self.assertEqual(len(default_storage.listdir(f'history_bundles/{self.employee.pk}')[1]), 1)
+        self.assertEqual(default_storage.listdir(f'history_bundles/{self.clean_slate.pk}')[1], [])
+
+    def test_dry_run(self):
+        """Test that a dry run reports what would be deleted without changing anything"""
+        self.assign_attendance(self.employee, 400, exemption='1')
+        self.assign_attendance(self.employee, 10)
+        self.assign_attendance(self.clean_slate, 200, exemption='2')
+        sick_days = self.sick_days(self.clean_slate)
+
+        output = self.cleanup(dry_run=True)
+
+        self.assertIn('Would delete 2 records of 2 employees, 1 older than a year and 1 more', output)
+        self.assertIn('Would give back 1 paid and 1 unpaid sick days.', output)
+        self.assertEqual(Attendance.objects.count(), 3)
+        self.assertEqual(self.sick_days(self.clean_slate), sick_days)
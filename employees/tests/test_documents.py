@@ -0,0 +1,208 @@
+import datetime
+import os
+from unittest import mock
+
+from PyPDF2 import PdfFileReader
+from django.core.files.storage import default_storage
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from employees.documents import delete_history_bundles, get_history_bundle, merge_documents, open_document, \
+    open_documents
+from employees.models import Attendance, Employee, ensure_document, render_document
+from employees.tests.mixins import TemporaryMediaMixin
+from employees.tests.stub_storage import StubStorageServer
+from main.tasks import create_document
+
+
+class DocumentTestMixin(TemporaryMediaMixin):
+    def setUp(self):
+        """Create an Employee that receives the records and a supervisor that assigns them"""
+        self.supervisor = Employee.objects.create_user(
+            username='test.supervisor',
+            password='test',
+            first_name='Test',
+            last_name='Supervisor',
+            employee_id=1,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+        self.employee = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=2,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+
+    def assign_attendance(self):
+        attendance = Attendance(
+            employee=self.employee,
+            incident_date=datetime.date.today(),
+            issued_date=datetime.date.today(),
+            points=1,
+            reason='0',
+            assigned_by=self.supervisor.employee_id,
+            exemption='',
+        )
+        attendance.save()
+
+        return attendance
+
+
+class TestSynchronousDocuments(DocumentTestMixin, TestCase):
+    def test_document_rendered_in_place(self):
+        """Test that without the celery worker the document is ready as soon as the record is saved"""
+        attendance = self.assign_attendance()
+
+        self.assertEqual(attendance.document_status, 'ready')
+        self.assertTrue(attendance.document)
+        self.assertEqual(Attendance.objects.get(id=attendance.id).document_status, 'ready')
+
+    def test_render_is_repeatable(self):
+        """Test that rendering a record again just replaces its document"""
+        attendance = self.assign_attendance()
+
+        create_document('Attendance', attendance.id)
+        create_document('Attendance', attendance.id)
+
+        attendance.refresh_from_db()
+        self.assertEqual(attendance.document_status, 'ready')
+        self.assertTrue(attendance.document.storage.exists(attendance.document.name))
+
+    def test_deleted_record_not_rendered(self):
+        """Test that a render queued for a record that has since been deleted does nothing"""
+        self.assertIsNone(render_document(Attendance, 1234))
+
+    def test_failed_render(self):
+        """Test that a render that raises leaves the record marked as failed"""
+        attendance = self.assign_attendance()
+
+        with mock.patch.object(Attendance, 'create_document', side_effect=OSError):
+            with self.assertRaises(OSError):
+                render_document(Attendance, attendance.id)
+
+        self.assertEqual(Attendance.objects.get(id=attendance.id).document_status, 'failed')
+
+    def test_ensure_document_renders_pending(self):
+        """Test that a document that isn't ready yet is rendered when it is needed"""
+        attendance = self.assign_attendance()
+        Attendance.objects.filter(id=attendance.id).update(document_status='pending', document='')
+
+        attendance = ensure_document(Attendance.objects.get(id=attendance.id))
+
+        self.assertEqual(attendance.document_status, 'ready')
+        self.assertTrue(attendance.document)
+
+
+@override_settings(RENDER_DOCUMENTS_ASYNC=True)
+class TestAsynchronousDocuments(DocumentTestMixin, TransactionTestCase):
+    @mock.patch('employees.signals.create_document.delay')
+    def test_render_queued_after_commit(self, delay):
+        """Test that saving a record only queues the render and leaves the document pending"""
+        attendance = self.assign_attendance()
+
+        self.assertEqual(attendance.document_status, 'pending')
+        self.assertFalse(attendance.document)
+        delay.assert_called_once_with('Attendance', attendance.id)
+
+    @mock.patch('employees.signals.create_document.delay')
+    def test_edit_marks_document_pending(self, delay):
+        """Test that editing a record with a rendered document queues it to be rendered again"""
+        attendance = self.assign_attendance()
+        create_document('Attendance', attendance.id)
+
+        attendance.refresh_from_db()
+        attendance.reason = '3'
+        attendance.save(update_fields=['reason'])
+
+        self.assertEqual(Attendance.objects.get(id=attendance.id).document_status, 'pending')
+        self.assertEqual(delay.call_count, 2)
+
+
+class TestOpenDocument(DocumentTestMixin, TestCase):
+    def test_read_from_storage(self):
+        """Test that a stored document is read through the storage backend without any HTTP request"""
+        attendance = self.assign_attendance()
+
+        with StubStorageServer(latency=0) as stub:
+            with self.settings(MEDIA_URL=stub.url('media/')):
+                with open_document(attendance.document) as document:
+                    contents = document.read()
+
+        self.assertEqual(stub.request_count, 0)
+        self.assertTrue(contents.startswith(b'%PDF'))
+
+    def test_download_fallback(self):
+        """Test that a document the storage backend can't open is downloaded from its url instead"""
+        attendance = self.assign_attendance()
+        os.remove(attendance.document.path)
+
+        with StubStorageServer(latency=0) as stub:
+            with self.settings(MEDIA_URL=stub.url('media/')):
+                with open_document(attendance.document) as document:
+                    text = PdfFileReader(document).getPage(0).extractText()
+
+        self.assertEqual(stub.request_count, 1)
+        self.assertIn('/media/attendance_forms/', text)
+
+    @override_settings(DOCUMENT_SPOOL_MAX_SIZE=1024)
+    def test_merge_spools_to_disk(self):
+        """Test that a merged PDF larger than DOCUMENT_SPOOL_MAX_SIZE is moved out of memory"""
+        documents = [self.assign_attendance().document for _ in range(3)]
+
+        merged = merge_documents(documents)
+
+        self.assertTrue(merged._rolled)
+        self.assertEqual(PdfFileReader(merged).getNumPages(), 3)
+
+
+class TestHistoryBundles(DocumentTestMixin, TestCase):
+    def test_bundle_stored_and_deleted(self):
+        """Test that a bundle is stored once per version and that deleting an Employee's bundles removes it"""
+        attendance = self.assign_attendance()
+        build = mock.Mock(side_effect=lambda: merge_documents([attendance.document]))
+
+        get_history_bundle(self.employee.pk, 'attendance', 'version', build).close()
+        get_history_bundle(self.employee.pk, 'attendance', 'version', build).close()
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(len(default_storage.listdir(f'history_bundles/{self.employee.pk}')[1]), 1)
+
+        delete_history_bundles(self.employee.pk)
+
+        self.assertEqual(default_storage.listdir(f'history_bundles/{self.employee.pk}')[1], [])
+
+    def test_bundles_deleted_with_employee(self):
+        """Test that the stored bundles of an Employee are deleted along with them"""
+        attendance = self.assign_attendance()
+        employee_pk = self.employee.pk
+        get_history_bundle(employee_pk, 'attendance', 'version',
+                           lambda: merge_documents([attendance.document])).close()
+
+        # The bundles are deleted once the Employee's deletion commits, which a TestCase never does
+        with mock.patch('employees.signals.transaction.on_commit', side_effect=lambda function: function()):
+            self.employee.delete()
+
+        self.assertEqual(default_storage.listdir(f'history_bundles/{employee_pk}')[1], [])
+
+
+class TestOpenDocuments(TestCase):
+    def test_documents_in_order(self):
+        """Test that the documents come back in the order they were given"""
+        with StubStorageServer(latency=0) as stub:
+            with open_documents(stub.field_files(f'{number}.pdf' for number in range(10))) as documents:
+                texts = [PdfFileReader(document).getPage(0).extractText() for document in documents]
+
+        self.assertEqual(len(texts), 10)
+        for number, text in enumerate(texts):
+            self.assertIn(f'/{number}.pdf', text)
+
+    def test_opens_concurrently(self):
+        """Test that the documents are opened several at a time but never more than the worker pool allows"""
+        with StubStorageServer(latency=0.2) as stub:
+            with open_documents(stub.field_files(f'{number}.pdf' for number in range(16)), max_workers=8):
+                pass
+
+        self.assertEqual(stub.request_count, 16)
+        self.assertGreater(stub.peak_in_flight, 1)
+        self.assertLessEqual(stub.peak_in_flight, 8)
@@ -0,0 +1,50 @@
+import datetime
+
+from PyPDF2 import PdfFileReader
+from django.test import TestCase
+
+from employees.helper_functions import combine_attendance_documents
+from employees.models import Attendance, Employee
+from employees.tests.mixins import TemporaryMediaMixin
+
+
+class TestCombineAttendanceDocuments(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        """Create an Employee with three attendance records for different reasons"""
+        self.employee = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=1,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+        self.attendance_ids = []
+        for reason in ['0', '3', '4']:
+            attendance = Attendance(
+                employee=self.employee,
+                incident_date=datetime.date.today(),
+                issued_date=datetime.date.today(),
+                points=0,
+                reason=reason,
+                assigned_by=self.employee.employee_id,
+                exemption='',
+            )
+            attendance.save()
+            self.attendance_ids.append(attendance.id)
+
+    def test_combined_in_requested_order(self):
+        """Test that the documents are combined in the order the attendance ids were given"""
+        attendance_ids = list(reversed(self.attendance_ids))
+
+        combined = combine_attendance_documents(attendance_ids)
+        combined.seek(0)
+        pdf = PdfFileReader(combined)
+
+        expected = []
+        for attendance_id in attendance_ids:
+            with Attendance.objects.get(id=attendance_id).document.open('rb') as document:
+                expected.append(PdfFileReader(document).getPage(0).extractText())
+
+        self.assertEqual(len(set(expected)), 3)
+        self.assertEqual([pdf.getPage(number).extractText() for number in range(pdf.getNumPages())], expected)
@@ -0,0 +1,114 @@
+import datetime
+import re
+
+from django.db import connection
+from django.db.models import OuterRef
+from django.test import TestCase
+
+from employees.models import Attendance, Counseling, DayOff, Employee, PointsLedger, SafetyPoint, TimeOffRequest
+from operations.dashboard import without_recent_attendance
+from operations.pagination import KeysetPaginator
+
+# A full read of a table shows up as 'Seq Scan on <table>' on PostgreSQL and 'SCAN <table>' on SQLite
+SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)'),
+}
+
+
+class TestQueryPlans(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        """Seed a few hundred records for every indexed model, bulk_create skips the signals and documents"""
+        Employee.objects.bulk_create([
+            Employee(username=f'employee.{number}', first_name='Employee', last_name=str(number), employee_id=number,
+                     is_active=number % 10 != 0)
+            for number in range(1, 101)
+        ])
+        cls.employee = Employee.objects.get(employee_id=1)
+        employees = list(Employee.objects.all())
+        dates = [datetime.date.today() - datetime.timedelta(days=days) for days in range(0, 400, 50)]
+
+        PointsLedger.objects.bulk_create([PointsLedger(employee=employee) for employee in employees])
+        Attendance.objects.bulk_create([
+            Attendance(employee=employee, incident_date=date, points=1, reason='0', assigned_by='1',
+                       is_active=date.day % 2 == 0)
+            for employee in employees for date in dates
+        ])
+        Counseling.objects.bulk_create([
+            Counseling(employee=employee, issued_date=date, action_type='0', assigned_by=1)
+            for employee in employees for date in dates
+        ])
+        SafetyPoint.objects.bulk_create([
+            SafetyPoint(employee=employee, incident_date=date, points=1, reason='0', assigned_by=1)
+            for employee in employees for date in dates
+        ])
+        TimeOffRequest.objects.bulk_create([
+            TimeOffRequest(employee=employee, request_date=date, time_off_type='0')
+            for employee in employees for date in dates
+        ])
+        DayOff.objects.bulk_create([
+            DayOff(time_off_request=time_off_request, requested_date=time_off_request.request_date)
+            for time_off_request in TimeOffRequest.objects.all()
+        ])
+
+    def setUp(self):
+        # The planner would rather scan a table this small, this makes it take an index whenever one can be used
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assert_no_sequential_scan(self, queryset, allowed=()):
+        """Fails when the plan of the queryset reads a whole table other than the allowed ones"""
+        if connection.vendor not in SCAN_PATTERNS:
+            self.skipTest(f'No plan check for {connection.vendor}')
+
+        plan = queryset.explain()
+        scanned = set(SCAN_PATTERNS[connection.vendor].findall(plan)) - set(allowed)
+
+        self.assertFalse(scanned, f'Sequential scan of {", ".join(sorted(scanned))}:\n{plan}')
+
+    def date_range(self, days=30):
+        return datetime.date.today() - datetime.timedelta(days=days), datetime.date.today()
+
+    def test_report_queries(self):
+        """Test that the reports find the active records of a date range through an index"""
+        start, end = self.date_range()
+        attendance = Attendance.objects.filter(is_active=True, employee__is_active=True, incident_date__gte=start,
+                                               incident_date__lte=end)
+        reports = {
+            'attendance': attendance,
+            'attendance page': KeysetPaginator(attendance, '-incident_date').queryset.order_by('-keyset_value')[:26],
+            'counseling': Counseling.objects.filter(is_active=True, employee__is_active=True, issued_date__gte=start,
+                                                    issued_date__lte=end),
+            'time off': TimeOffRequest.objects.filter(is_active=True, employee__is_active=True,
+                                                      dayoff__requested_date__gte=start,
+                                                      dayoff__requested_date__lte=end),
+            'days off': DayOff.objects.filter(is_active=True, requested_date__gte=start, requested_date__lte=end),
+        }
+
+        for report, queryset in reports.items():
+            with self.subTest(report=report):
+                self.assert_no_sequential_scan(queryset)
+
+    def test_dashboard_queries(self):
+        """Test that the dashboard looks up each Employee's recent attendance through an index, the employees
+        themselves are all listed so they are read in full"""
+        self.assert_no_sequential_scan(without_recent_attendance(), allowed=['employees_employee'])
+
+    def test_signal_queries(self):
+        """Test that the per Employee lookups of the signals and the points ledger use an index"""
+        queries = {
+            'attendance history': Attendance.objects.filter(employee=self.employee, is_active=True,
+                                                            incident_date__lte=datetime.date.today()),
+            'attendance points': PointsLedger.objects.filter(employee_id=self.employee.pk).values(
+                total=PointsLedger.attendance_points_total(OuterRef('pk'))),
+            'safety points': PointsLedger.objects.filter(employee_id=self.employee.pk).values(
+                total=PointsLedger.safety_points_total(OuterRef('pk'))),
+            'counseling': Counseling.objects.filter(employee=self.employee, is_active=True),
+            'time off': TimeOffRequest.objects.filter(employee=self.employee, is_active=True).order_by('-request_date'),
+        }
+
+        for query, queryset in queries.items():
+            with self.subTest(query=query):
+                self.assert_no_sequential_scan(queryset)
@@ -0,0 +1,197 @@
+import datetime
+
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from notifications.models import Notification
+
+from employees.forms import NotificationSettings
+from employees.models import Employee, Hold, TimeOffRequest
+from employees.notifications import get_recipients, get_unread_count, notify_group
+
+
+@mock.patch('employees.notifications.send_emails.delay')
+@mock.patch('employees.notifications.transaction.on_commit', side_effect=lambda function: function())
+class TestNotifyGroup(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        """Create a group of thirty supervisors, one doesn't want emails and one has no email address"""
+        Employee.objects.bulk_create([
+            Employee(username=f'supervisor.{number}', first_name='Supervisor', last_name=str(number),
+                     employee_id=number, email=f'supervisor.{number}@example.com' if number != 30 else '',
+                     email_add_hold=number != 29)
+            for number in range(1, 31)
+        ])
+        cls.group = Group.objects.get_or_create(name='email_add_hold')[0]
+        cls.group.user_set.add(*Employee.objects.all())
+        cls.employee = Employee.objects.create(username='test.user', first_name='Test', last_name='User',
+                                               employee_id=100)
+
+    def setUp(self):
+        """Start from an empty recipient cache"""
+        cache.clear()
+
+    def test_fan_out(self, on_commit, send_emails):
+        """Test that a group of thirty costs a handful of queries and one email task"""
+        with CaptureQueriesContext(connection) as queries:
+            notifications = notify_group(self.employee, 'Test User has been placed on hold', 'email_add_hold',
+                                         employee_id=self.employee.employee_id)
+
+        self.assertEqual(len(notifications), 30)
+        self.assertLessEqual(len(queries), 8)
+        send_emails.assert_called_once()
+
+        subject, plain_message, to, html_message = send_emails.call_args[0]
+        self.assertEqual(len(to), 28)
+        self.assertNotIn('supervisor.29@example.com', to)
+        self.assertIn(reverse('employee-account', args=[self.employee.employee_id]), html_message)
+
+    def test_urls(self, on_commit, send_emails):
+        """Test that every notification links to the page of the Employee with its own id in the link"""
+        notify_group(self.employee, 'Test', 'email_add_hold', employee_id=self.employee.employee_id)
+
+        for notification in Notification.objects.all():
+            self.assertEqual(notification.data['url'],
+                             reverse('employee-account', args=[self.employee.employee_id, notification.id]))
+            self.assertEqual(notification.data['type'], 'email_add_hold')
+            self.assertEqual(notification.emailed, notification.recipient.employee_id < 29)
+
+    def test_time_off_urls(self, on_commit, send_emails):
+        """Test that time off request notifications link to the time off report of the request"""
+        time_off = TimeOffRequest.objects.create(employee=self.employee, request_date=datetime.date.today(),
+                                                 time_off_type='0', status='1')
+
+        Group.objects.create(name='email_new_time_off').user_set.add(Employee.objects.get(employee_id=1))
+
+        notification = notify_group(time_off, 'Test', 'email_new_time_off', sender_id=time_off.id,
+                                    employee_id=self.employee.employee_id)[0]
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.data['url'],
+                         f"{reverse('operations-time-off-reports', args=[notification.id])}?id={time_off.id}")
+
+    def test_hold_notification(self, on_commit, send_emails):
+        """Test that placing an Employee on hold notifies the group without the supervisor that placed the hold"""
+        Hold.objects.create(employee=self.employee, reason='Training', hold_date=datetime.date.today(),
+                            assigned_by=1)
+
+        self.assertEqual(Notification.objects.count(), 29)
+        self.assertFalse(Notification.objects.filter(recipient__employee_id=1).exists())
+        send_emails.assert_called_once()
+
+    def test_recipients_cached(self, on_commit, send_emails):
+        """Test that a second event of the same type finds its recipients without a query"""
+        notify_group(self.employee, 'Test', 'email_add_hold', employee_id=self.employee.employee_id)
+
+        with self.assertNumQueries(0):
+            recipients = get_recipients('email_add_hold')
+
+        self.assertEqual(len(recipients), 30)
+
+    def test_recipients_follow_groups(self, on_commit, send_emails):
+        """Test that joining or leaving the group of a notification type changes its cached recipients"""
+        get_recipients('email_add_hold')
+
+        self.group.user_set.add(self.employee)
+        self.assertEqual(len(get_recipients('email_add_hold')), 31)
+
+        self.employee.groups.remove(self.group)
+        self.assertEqual(len(get_recipients('email_add_hold')), 30)
+
+    def test_recipients_follow_preferences(self, on_commit, send_emails):
+        """Test that turning an email off through the notification settings is picked up by the cached recipients
+        while other changes to the Employee leave the cache alone"""
+        supervisor = Employee.objects.get(employee_id=1)
+        get_recipients('email_add_hold')
+
+        supervisor.paid_sick += 1
+        supervisor.save()
+
+        with self.assertNumQueries(0):
+            get_recipients('email_add_hold')
+
+        form = NotificationSettings(data={'email_add_hold': False}, instance=supervisor)
+        self.assertTrue(form.is_valid())
+        form.save()
+
+        recipient = next(recipient for recipient in get_recipients('email_add_hold') if recipient.employee_id == 1)
+        self.assertFalse(recipient.wants_email)
+
+
+@mock.patch('employees.notifications.send_emails.delay')
+class TestUnreadCount(TestCase):
+    def setUp(self):
+        """Create a Django user in the group of a notification type and start from an empty cache"""
+        cache.clear()
+        self.user = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=000000,
+            is_superuser=True,
+        )
+        Group.objects.get_or_create(name='email_add_hold')[0].user_set.add(self.user)
+        self.client.force_login(self.user)
+
+    def notify(self):
+        notify_group(self.user, 'Test User has been placed on hold', 'email_add_hold',
+                     employee_id=self.user.employee_id)
+
+    def unread_count(self):
+        return self.client.get(reverse('employee-unread-notification-count')).json()['unread_count']
+
+    def test_count_cached(self, send_emails):
+        """Test that the count is only counted once until it changes"""
+        self.notify()
+        self.assertEqual(self.unread_count(), 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user), 1)
+
+    def test_count_follows_changes(self, send_emails):
+        """Test that new notifications, opening one and marking all as read are picked up by the cached count"""
+        self.assertEqual(self.unread_count(), 0)
+
+        self.notify()
+        self.notify()
+        self.assertEqual(self.unread_count(), 2)
+
+        Notification.objects.filter(recipient=self.user).first().mark_as_read()
+        self.assertEqual(self.unread_count(), 1)
+
+        resp = self.client.get(reverse('employee-mark-all-notifications-read'))
+        self.assertEqual(resp.json()['unread_count'], 0)
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_badge(self, send_emails):
+        """Test that pages render the count into the badge instead of polling the notification list"""
+        self.notify()
+
+        resp = self.client.get(reverse('main-home'))
+
+        self.assertContains(resp, '<span class="badge badge-danger" id="notification_badge">1</span>', html=True)
+        self.assertNotContains(resp, 'notify.js')
+
+    def test_stream_disabled(self, send_emails):
+        """Test that the event stream is off unless it is turned on"""
+        resp = self.client.get(reverse('employee-unread-notification-stream'))
+
+        self.assertEqual(resp.status_code, 404)
+
+    @override_settings(NOTIFICATION_STREAM=True, NOTIFICATION_STREAM_DURATION=0)
+    def test_stream(self, send_emails):
+        """Test that the event stream sends the count"""
+        self.notify()
+
+        resp = self.client.get(reverse('employee-unread-notification-stream'))
+        events = b''.join(resp.streaming_content).decode()
+
+        self.assertEqual(resp['Content-Type'], 'text/event-stream')
+        self.assertIn('retry: ', events)
+        self.assertIn('event: unread_count\ndata: 1\n\n', events)
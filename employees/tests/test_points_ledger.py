@@ -0,0 +1,107 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from employees.models import Attendance, Employee, PointsLedger, SafetyPoint
+from employees.tests.mixins import TemporaryMediaMixin
+
+
+class TestPointsLedger(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        """Create an Employee that receives the records and a supervisor that assigns them"""
+        self.supervisor = Employee.objects.create_user(
+            username='test.supervisor',
+            password='test',
+            first_name='Test',
+            last_name='Supervisor',
+            employee_id=1,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+        self.employee = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=2,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+
+    def assign_attendance(self, reason='0', points=1):
+        attendance = Attendance(
+            employee=self.employee,
+            incident_date=datetime.date.today(),
+            issued_date=datetime.date.today(),
+            points=points,
+            reason=reason,
+            assigned_by=self.supervisor.employee_id,
+            exemption='',
+        )
+        attendance.save()
+
+        return attendance
+
+    def test_ledger_created_with_employee(self):
+        """Test that every new Employee starts with an empty ledger"""
+        ledger = PointsLedger.objects.get(employee=self.employee)
+
+        self.assertEqual(ledger.attendance_points, 0)
+        self.assertEqual(ledger.safety_points, 0)
+
+    def test_attendance_updates_ledger(self):
+        """Test that assigning, deactivating and deleting Attendance keeps the ledger current"""
+        first = self.assign_attendance(reason='0', points=1)
+        self.assign_attendance(reason='2', points=1.5)
+
+        self.assertEqual(self.employee.get_total_attendance_points(), Decimal('2.5'))
+
+        first.is_active = False
+        first.save(update_fields=['is_active', 'document'])
+
+        self.assertEqual(self.employee.get_total_attendance_points(), Decimal('1.5'))
+
+        Attendance.objects.filter(employee=self.employee, is_active=True).get().delete()
+
+        self.assertEqual(self.employee.get_total_attendance_points(), 0)
+
+    def test_edited_record_excluded(self):
+        """Test that the points of an Attendance being edited are left out of the total its new points are added to"""
+        self.assign_attendance(reason='3', points=4)
+        self.assign_attendance(reason='0', points=1)
+        edited = self.assign_attendance(reason='0', points=1)
+
+        self.assertEqual(self.employee.get_total_attendance_points(exclude=edited), 5)
+
+        # 5 points without the edited record and 1.5 for its new reason stay below a written warning, counting the
+        # record twice would reach one
+        self.assertEqual(self.employee.attendance_counseling_required('2', '', edited.id)[0], 0)
+
+    @mock.patch.object(SafetyPoint, 'create_document')
+    def test_safety_point_updates_ledger(self, create_document):
+        """Test that assigning a Safety Point keeps the ledger current"""
+        SafetyPoint(
+            employee=self.employee,
+            incident_date=datetime.date.today(),
+            issued_date=datetime.date.today(),
+            points=2,
+            reason='0',
+            assigned_by=self.supervisor.employee_id,
+        ).save()
+
+        self.assertEqual(self.employee.get_total_safety_points(), 2)
+
+    def test_rebuild_points_ledger_reports_and_fixes_drift(self):
+        """Test that the rebuild command finds a drifted and a missing ledger and fixes both"""
+        self.assign_attendance(reason='0', points=1)
+        PointsLedger.objects.filter(employee=self.employee).update(attendance_points=7)
+        PointsLedger.objects.filter(employee=self.supervisor).delete()
+
+        out = StringIO()
+        call_command('rebuild_points_ledger', stdout=out)
+
+        self.assertIn('1 missing and 1 drifted ledgers rebuilt.', out.getvalue())
+        self.assertEqual(PointsLedger.objects.get(employee=self.employee).attendance_points, 1)
+        self.assertTrue(PointsLedger.objects.filter(employee=self.supervisor).exists())
@@ -0,0 +1,140 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase
+
+from employees.models import Counseling, DayOff, Employee, PointsLedger, SafetyPoint, TimeOffRequest
+from employees.retention import POLICIES, apply_policy
+from employees.tests.mixins import TemporaryMediaMixin
+
+
+class TestRetention(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        """Create an Employee that receives the records and a supervisor that assigns them"""
+        self.supervisor = Employee.objects.create_user(
+            username='test.supervisor',
+            password='test',
+            first_name='Test',
+            last_name='Supervisor',
+            employee_id=1,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+        self.employee = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=2,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+        self.today = datetime.date.today()
+
+    def days_ago(self, days):
+        return self.today - datetime.timedelta(days=days)
+
+    def create_counseling(self, days_ago, **kwargs):
+        return Counseling.objects.create(employee=self.employee, assigned_by=1, action_type='0', conduct='Test',
+                                         conversation='Test', issued_date=self.days_ago(days_ago), **kwargs)
+
+    def create_safety_point(self, days_ago):
+        safety_point = SafetyPoint(
+            employee=self.employee,
+            incident_date=self.days_ago(days_ago),
+            issued_date=self.today,
+            points=2,
+            reason='0',
+            assigned_by=self.supervisor.employee_id,
+        )
+        with mock.patch.object(SafetyPoint, 'create_document'):
+            safety_point.save()
+
+        return safety_point
+
+    @staticmethod
+    def attach_document(record, name, content):
+        name = default_storage.save(name, ContentFile(content))
+        type(record).objects.filter(pk=record.pk).update(document=name)
+
+        return name
+
+    @staticmethod
+    def apply_policy(policy, **kwargs):
+        # The files of a chunk are deleted once it commits, which a TestCase never does
+        with mock.patch('employees.retention.transaction.on_commit', side_effect=lambda function: function()):
+            return apply_policy(POLICIES[policy], **kwargs)
+
+    def test_counseling_cutoff(self):
+        """Test that only counseling older than six months is deleted"""
+        self.create_counseling(183)
+        kept = self.create_counseling(182)
+
+        output = StringIO()
+        call_command('counseling_cleanup', stdout=output)
+
+        self.assertIn('Deleted 1 counselings in 1 chunks', output.getvalue())
+        self.assertEqual(list(Counseling.objects.values_list('pk', flat=True)), [kept.pk])
+
+    def test_chunks(self):
+        """Test that the expired records are deleted a bounded number at a time without skipping any"""
+        for days_ago in [200, 190, 10, 300, 250]:
+            self.create_counseling(days_ago)
+
+        report = self.apply_policy('counseling', chunk_size=2)
+
+        self.assertEqual(report.chunks, 2)
+        self.assertEqual(report.rows[Counseling], 4)
+        self.assertEqual(Counseling.objects.count(), 1)
+
+    def test_safety_point_cascade(self):
+        """Test that the counseling of an expired Safety Point goes with it and the ledger is refreshed"""
+        safety_point = self.create_safety_point(600)
+        self.create_safety_point(10)
+        self.create_counseling(10, safety_point=safety_point)
+
+        report = self.apply_policy('safety_point')
+
+        self.assertEqual(report.rows[SafetyPoint], 1)
+        self.assertEqual(report.rows[Counseling], 1)
+        self.assertFalse(Counseling.objects.exists())
+        self.assertEqual(PointsLedger.objects.get(employee=self.employee).safety_points, 2)
+
+    def test_time_off_cascade(self):
+        """Test that the days off of an expired Time Off Request go with it"""
+        time_off_request = TimeOffRequest.objects.create(employee=self.employee, request_date=self.days_ago(200),
+                                                         time_off_type='0')
+        DayOff.objects.create(requested_date=self.days_ago(190), time_off_request=time_off_request)
+
+        report = self.apply_policy('time_off')
+
+        self.assertEqual(report.rows[TimeOffRequest], 1)
+        self.assertEqual(report.rows[DayOff], 1)
+        self.assertFalse(DayOff.objects.exists())
+
+    def test_files_reclaimed(self):
+        """Test that the documents of deleted records are removed and counted unless a kept record still uses them"""
+        name = self.attach_document(self.create_counseling(200), 'counseling_forms/old.pdf', b'x' * 100)
+        shared = self.attach_document(self.create_counseling(200), 'counseling_forms/shared.pdf', b'x' * 50)
+        Counseling.objects.filter(pk=self.create_counseling(10).pk).update(document=shared)
+
+        report = self.apply_policy('counseling')
+
+        self.assertEqual((report.files, report.bytes), (1, 100))
+        self.assertFalse(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(shared))
+
+    def test_bundles_deleted(self):
+        """Test that the stored history bundles are deleted with the records that are part of them and kept otherwise"""
+        self.create_counseling(200)
+        TimeOffRequest.objects.create(employee=self.employee, request_date=self.days_ago(200), time_off_type='0')
+        folder = f'history_bundles/{self.employee.pk}'
+        default_storage.save(f'{folder}/counseling-test.pdf', ContentFile(b'x'))
+
+        self.apply_policy('time_off')
+        self.assertEqual(default_storage.listdir(folder)[1], ['counseling-test.pdf'])
+
+        self.apply_policy('counseling')
+        self.assertEqual(default_storage.listdir(folder)[1], [])
@@ -0,0 +1,58 @@
+from django.test import TestCase
+
+from employees.models import Employee
+from employees.search import filter_by_name, find_employees, normalize_search_name
+
+
+class TestEmployeeSearch(TestCase):
+    def create_employee(self, employee_id, first_name, last_name):
+        return Employee.objects.create_user(
+            username=f'test.user{employee_id}',
+            password='test',
+            first_name=first_name,
+            last_name=last_name,
+            employee_id=employee_id,
+        )
+
+    def test_normalize_search_name(self):
+        """Test that names are lower cased and stripped of accents, punctuation and extra whitespace"""
+        self.assertEqual(normalize_search_name("  José   O'Neil-Smith "), 'jose oneilsmith')
+        self.assertEqual(normalize_search_name(None), '')
+
+    def test_search_name_follows_name(self):
+        """Test that search_name is kept in step with the name, also when only the name fields are saved"""
+        employee = self.create_employee(1, 'Test', 'User')
+        self.assertEqual(Employee.objects.get(pk=employee.pk).search_name, 'test user')
+
+        employee.last_name = 'Müller'
+        employee.save(update_fields=['last_name'])
+        self.assertEqual(Employee.objects.get(pk=employee.pk).search_name, 'test muller')
+
+    def test_filter_by_name(self):
+        """Test that every word of the search has to be part of the name, in any order"""
+        self.create_employee(1, 'Maria', 'Lopez')
+        self.create_employee(2, 'Mario', 'Lopez')
+
+        names = filter_by_name(Employee.objects.all(), 'lopez MARIA').values_list('first_name', flat=True)
+
+        self.assertEqual(list(names), ['Maria'])
+
+    def test_find_employees_ranked(self):
+        """Test that names starting with the search come before names with a word starting with it, which come before
+        any other match"""
+        self.create_employee(1, 'Joanna', 'Brown')
+        self.create_employee(2, 'Joe', 'Annex')
+        self.create_employee(3, 'Anne', 'Smith')
+        self.create_employee(4, 'Bob', 'Smith')
+
+        names = [employee.get_full_name() for employee in find_employees(Employee.objects.all(), 'ann')]
+
+        self.assertEqual(names, ['Anne Smith', 'Joe Annex', 'Joanna Brown'])
+
+    def test_find_employees_limited(self):
+        """Test that no more than the limit is returned and an empty search returns nothing"""
+        for employee_id in range(1, 6):
+            self.create_employee(employee_id, 'Test', f'User{employee_id}')
+
+        self.assertEqual(len(find_employees(Employee.objects.all(), 'test', limit=3)), 3)
+        self.assertEqual(len(find_employees(Employee.objects.all(), ' ')), 0)
@@ -0,0 +1,38 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from employees.models import Attendance, DayOff, Employee, Hold, PointsLedger, Settlement, TimeOffRequest
+from employees.tests.mixins import TemporaryMediaMixin
+
+
+class TestSeedBenchmarkData(TemporaryMediaMixin, TestCase):
+    def seed(self, **options):
+        call_command('seed_benchmark_data', stdout=StringIO(), **options)
+
+    def test_seed(self):
+        """Test that every model gets the requested volume and the points ledgers match the records"""
+        self.seed(employees=100, attendance=3, time_off=2)
+
+        self.assertEqual(Employee.objects.count(), 100)
+        self.assertEqual(Employee.objects.filter(is_active=False).count(), 10)
+        self.assertEqual(Attendance.objects.count(), 98 * 3)
+        self.assertEqual(TimeOffRequest.objects.count(), 98 * 2)
+        self.assertGreaterEqual(DayOff.objects.count(), 98 * 2)
+        self.assertEqual(Hold.objects.count(), 4)
+        self.assertEqual(Settlement.objects.count(), 1)
+        self.assertFalse(Attendance.objects.exclude(document_status='ready').exists())
+        self.assertEqual(PointsLedger.objects.count(), 100)
+
+        output = StringIO()
+        call_command('rebuild_points_ledger', dry_run=True, stdout=output)
+        self.assertIn('0 missing and 0 drifted', output.getvalue())
+
+    def test_seed_twice(self):
+        """Test that running the command again adds new employees after the existing ones"""
+        self.seed(employees=20)
+        self.seed(employees=20)
+
+        self.assertEqual(list(Employee.objects.order_by('employee_id').values_list('employee_id', flat=True)),
+                         list(range(1, 41)))
@@ -0,0 +1,160 @@
+import datetime
+import io
+import os
+import shutil
+from unittest import mock
+
+from PyPDF2 import PdfFileReader
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from employees.models import Attendance, Employee
+from employees.tests.mixins import TemporaryMediaMixin
+
+
+class TestExportAttendanceHistory(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        """Create an authorized Django user for testing purposes and an Employee to export, starting without any
+        stored history bundles"""
+        cache.clear()
+        shutil.rmtree(os.path.join(self.media_root, 'history_bundles'), ignore_errors=True)
+
+        self.user = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=000000
+        )
+        permission = Permission.objects.get(codename='can_export_attendance_history')
+        self.user.user_permissions.add(permission)
+        self.client.force_login(self.user)
+
+        self.employee = Employee.objects.create_user(
+            username='test.driver',
+            password='test',
+            first_name='Test',
+            last_name='Driver',
+            employee_id=1,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+
+    def assign_attendance(self, reason='0'):
+        return Attendance.objects.create(employee=self.employee, incident_date=datetime.date.today(),
+                                         issued_date=datetime.date.today(), points=0, reason=reason,
+                                         assigned_by=self.user.employee_id, exemption='')
+
+    def export(self):
+        resp = self.client.get(reverse('employee-export-attendance-history', args=[self.employee.employee_id]))
+        self.assertEqual(resp.status_code, 200)
+
+        return PdfFileReader(io.BytesIO(b''.join(resp.streaming_content)))
+
+    def test_export_streamed(self):
+        """Test that the attendance history is streamed as one PDF with a summary page and every document"""
+        for reason in ['0', '3', '4']:
+            self.assign_attendance(reason)
+
+        resp = self.client.get(reverse('employee-export-attendance-history', args=[self.employee.employee_id]))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertIn('Test Driver Attendance History.pdf', resp['Content-Disposition'])
+
+        pdf = PdfFileReader(io.BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(pdf.getNumPages(), 4)
+
+    def test_export_without_records(self):
+        """Test that the user is sent back to the account page when there is nothing to export"""
+        url = reverse('employee-export-attendance-history', args=[self.employee.employee_id])
+        resp = self.client.get(url)
+
+        self.assertRedirects(resp, reverse('employee-account', args=[self.employee.employee_id]),
+                             fetch_redirect_response=False)
+
+    def test_repeat_export_served_from_bundle(self):
+        """Test that exporting an unchanged history again reads the stored bundle instead of merging it again"""
+        self.assign_attendance()
+
+        with mock.patch.object(Employee, 'merge_attendance_history_document',
+                               autospec=True, side_effect=Employee.merge_attendance_history_document) as merge:
+            first = self.export()
+            second = self.export()
+
+        self.assertEqual(merge.call_count, 1)
+        self.assertEqual(first.getNumPages(), second.getNumPages())
+
+    def test_changed_history_merged_again(self):
+        """Test that adding, editing or removing a record makes the next export merge the history again"""
+        attendance = self.assign_attendance()
+        self.assertEqual(self.export().getNumPages(), 2)
+
+        self.assign_attendance('3')
+        self.assertEqual(self.export().getNumPages(), 3)
+
+        attendance.is_active = False
+        attendance.save(update_fields=['is_active', 'document'])
+        self.assertEqual(self.export().getNumPages(), 2)
+
+        with mock.patch.object(Employee, 'merge_attendance_history_document',
+                               autospec=True, side_effect=Employee.merge_attendance_history_document) as merge:
+            latest = Attendance.objects.get(employee=self.employee, is_active=True)
+            latest.reason = '4'
+            latest.save(update_fields=['reason'])
+            self.export()
+
+        self.assertEqual(merge.call_count, 1)
+
+
+class TestAccountView(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        """Create an Employee looking at their own account"""
+        self.user = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=000000,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+        self.client.force_login(self.user)
+
+    def assign_attendance(self, assigned_by):
+        supervisor = Employee.objects.create_user(
+            username=f'test.supervisor{assigned_by}',
+            password='test',
+            first_name='Test',
+            last_name=f'Supervisor{assigned_by}',
+            employee_id=assigned_by,
+        )
+
+        return Attendance.objects.create(employee=self.user, incident_date=datetime.date.today(),
+                                         issued_date=datetime.date.today(), points=0, reason='1',
+                                         assigned_by=supervisor.employee_id, exemption='')
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse('employee-account', args=[self.user.employee_id]))
+
+        self.assertEqual(resp.status_code, 200)
+
+        return len(queries)
+
+    def test_assignees_resolved_once(self):
+        """Test that the account page joins the assignees into the queries of the records so it runs the same number
+        of queries no matter how many records there are"""
+        self.assign_attendance(1)
+        # The first visit also caches the unread notification count of the navigation bar
+        self.count_queries()
+        one_record = self.count_queries()
+
+        for assigned_by in range(2, 6):
+            self.assign_attendance(assigned_by)
+
+        self.assertEqual(self.count_queries(), one_record)
+        self.assertContains(self.client.get(reverse('employee-account', args=[self.user.employee_id])),
+                            'Test Supervisor5')
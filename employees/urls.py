@@ -27,6 +27,9 @@ urlpatterns = [
     path('view-employee-settlement/<int:settlement_id>/', employee_views.view_settlement, name='employee-view-settlement'),
     path('request-time-off/<int:employee_id>/', employee_views.time_off_request, name='employee-time-off-request'),
     path('notification-settings/', employee_views.notification_settings, name='employee-notification-settings'),
+    path('notifications/unread-count/', employee_views.unread_notification_count, name='employee-unread-notification-count'),
+    path('notifications/unread-stream/', employee_views.unread_notification_stream, name='employee-unread-notification-stream'),
+    path('notifications/mark-all-as-read/', employee_views.mark_all_notifications_read, name='employee-mark-all-notifications-read'),
     path('export-attendance-history/<int:employee_id>/', employee_views.export_attendance_history, name='employee-export-attendance-history'),
     path('export-counseling-history/<int:employee_id>/', employee_views.export_counseling_history, name='employee-export-counseling-history'),
     path('export-safety-point-history/<int:employee_id>/', employee_views.export_safety_point_history, name='employee-export-safety-point-history'),
@@ -1,24 +1,31 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse, JsonResponse
+from django.conf import settings
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from notifications.models import Notification
 from django.urls import reverse
+from django.views.decorators.cache import never_cache
 
 from .forms import *
-from .models import Employee, SafetyPoint, TimeOffRequest
+from .models import Employee, SafetyPoint, TimeOffRequest, ensure_document
+from .notifications import get_unread_count, invalidate_unread_counts, unread_count_events
 
 
 @login_required
 def account(request, employee_id, download=None, download_id=None, notification_id=None):
     if employee_id == request.user.employee_id or request.user.has_perm('employees.can_view_all_accounts'):
         employee = Employee.objects.get(employee_id=employee_id)
-        attendance = Attendance.objects.filter(employee=employee, is_active=True).order_by('-incident_date')
-        counseling = Counseling.objects.filter(employee=employee, is_active=True).order_by('-issued_date')
-        safety_point = SafetyPoint.objects.filter(employee=employee, is_active=True).order_by('-incident_date')
+        attendance = Attendance.objects.filter(employee=employee, is_active=True).select_related('assignee')\
+            .order_by('-incident_date')
+        counseling = Counseling.objects.filter(employee=employee, is_active=True)\
+            .select_related('assignee', 'override_employee').order_by('-issued_date')
+        safety_point = SafetyPoint.objects.filter(employee=employee, is_active=True).select_related('assignee')\
+            .order_by('-incident_date')
         time_off = TimeOffRequest.objects.filter(employee=employee, is_active=True).order_by('-request_date')
-        settlements = Settlement.objects.filter(employee=employee, is_active=True).order_by('-created_date')
+        settlements = Settlement.objects.filter(employee=employee, is_active=True).select_related('assignee')\
+            .order_by('-created_date')
 
         if download == 'Attendance':
             download_object = attendance.get(id=download_id)
@@ -30,9 +37,9 @@ def account(request, employee_id, download=None, download_id=None, notification_
             download_object = None
 
         if download_object:
-            download_urls = [request.build_absolute_uri(download_object.document.url)]
+            download_urls = [request.build_absolute_uri(ensure_document(download_object).document.url)]
             try:
-                download_urls.append(request.build_absolute_uri(download_object.counseling.document.url))
+                download_urls.append(request.build_absolute_uri(ensure_document(download_object.counseling).document.url))
             except (Counseling.DoesNotExist, AttributeError):
                 pass
         else:
@@ -522,12 +529,13 @@ def view_settlement(request, settlement_id):
     if request.method == 'POST':
         s_form = ViewSettlement(instance=settlement, data=request.POST, files=request.FILES)
         if s_form.is_valid():
-            update_fields = ['details', 'assigned_by', 'created_date']
+            update_fields = ['details', 'assigned_by', 'assignee', 'created_date']
             settlement_object = s_form.save(commit=False)
 
             if request.FILES:
                 update_fields.append('document')
                 settlement.uploaded = True
+                settlement.document_status = 'ready'
                 settlement.save()
 
             settlement_object.save(update_fields=update_fields)
@@ -600,6 +608,34 @@ def notification_settings(request):
         return render(request, 'employees/notification_settings.html', {'form': form})
 
 
+@never_cache
+@login_required
+def unread_notification_count(request):
+    return JsonResponse({'unread_count': get_unread_count(request.user)})
+
+
+@never_cache
+@login_required
+def unread_notification_stream(request):
+    if not settings.NOTIFICATION_STREAM:
+        raise Http404
+
+    response = StreamingHttpResponse(unread_count_events(request.user), content_type='text/event-stream')
+    # Keeps nginx from holding the events back until its buffer fills up
+    response['X-Accel-Buffering'] = 'no'
+
+    return response
+
+
+@login_required
+def mark_all_notifications_read(request):
+    # The queryset update skips the signals that drop the cached unread count
+    request.user.notifications.mark_all_as_read()
+    invalidate_unread_counts([request.user.pk])
+
+    return JsonResponse({'unread_count': 0})
+
+
 @login_required
 @permission_required('employees.can_export_attendance_history', raise_exception=True)
 def export_attendance_history(request, employee_id):
@@ -608,8 +644,8 @@ def export_attendance_history(request, employee_id):
     try:
         filename = f'{employee.first_name} {employee.last_name} Attendance History.pdf'
 
-        response = HttpResponse(employee.create_attendance_history_document(), content_type='application/force-download')
-        response['Content-Disposition'] = f'attachment;filename="{filename}"'
+        response = FileResponse(employee.create_attendance_history_document(), as_attachment=True, filename=filename,
+                                content_type='application/force-download')
 
         return response
     except:
@@ -628,8 +664,8 @@ def export_counseling_history(request, employee_id):
 
         counseling_history = employee.create_counseling_history_document()
 
-        response = HttpResponse(counseling_history, content_type='application/force-download')
-        response['Content-Disposition'] = f'attachment;filename="{filename}"'
+        response = FileResponse(counseling_history, as_attachment=True, filename=filename,
+                                content_type='application/force-download')
 
         return response
     except:
@@ -648,8 +684,8 @@ def export_safety_point_history(request, employee_id):
 
         safety_point_history = employee.create_safety_point_history_document()
 
-        response = HttpResponse(safety_point_history, content_type='application/force-download')
-        response['Content-Disposition'] = f'attachment;filename="{filename}"'
+        response = FileResponse(safety_point_history, as_attachment=True, filename=filename,
+                                content_type='application/force-download')
 
         return response
     except:
@@ -665,8 +701,8 @@ def export_profile(request, employee_id):
 
     filename = f'{employee.first_name} {employee.last_name} Profile History.pdf'
 
-    response = HttpResponse(employee.create_profile_history_document(), content_type='application/force-download')
-    response['Content-Disposition'] = f'attachment;filename="{filename}"'
+    response = FileResponse(employee.create_profile_history_document(), as_attachment=True, filename=filename,
+                            content_type='application/force-download')
 
     return response
     # except:
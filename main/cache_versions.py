@@ -0,0 +1,25 @@
+"""
+Versioned cache entries
+
+Cache entries built from the database are stored under a key that includes a version kept in the cache on its own.
+Rather than deleting an entry when what it was built from changes the version is bumped, so an entry built from the old
+state is simply never read again and expires on its own.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+
+def bump_version(*keys):
+    """Moves each of the version keys to its next version, one that was never bumped before starts at 1"""
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+
+def invalidate_version(*keys):
+    """Bumps the version keys right away and again once the surrounding transaction commits, so an entry rebuilt from
+    the uncommitted state in the meantime ends up under a version that is never read again"""
+    bump_version(*keys)
+    transaction.on_commit(lambda: bump_version(*keys))
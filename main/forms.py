@@ -1,10 +1,8 @@
-from io import BytesIO
-
 from django import forms
 from crispy_forms.helper import FormHelper
-from openpyxl import load_workbook
 
 from employees.models import Company, Employee
+from .spreadsheets import AttendanceRow, DriverRow, SafetyPointRow, check_headers
 import os
 from zipfile import ZipFile
 
@@ -63,26 +61,11 @@ class DriverImportForm(forms.Form):
         else:
             with ZipFile(self.files['driver_file_import'], 'r') as zipfile:
                 try:
-                    driver_info = zipfile.read('drivers/drivers.xlsx')
-
-                    wb = load_workbook(filename=BytesIO(driver_info))
-
-                    try:
-                        sheet = wb['data']
+                    with zipfile.open('drivers/drivers.xlsx') as driver_info:
+                        error = check_headers(driver_info, DriverRow)
 
-                        correct_headers = ['last_name', 'first_name', 'employee_id', 'position', 'hire_date',
-                                           'application_date', 'classroom_date', 'company', 'is_partime',
-                                           'primary_phone', 'secondary_phone', 'SS']
-                        headers = []
-                        for col in sheet.iter_cols():
-                            headers.append(col[0].value)
-
-                        if headers != correct_headers:
-                            self.add_error(field_name, 'Headers are incorrect,'
-                                                       ' look at documentation for more information')
-
-                    except KeyError:
-                        self.add_error(field_name, 'No sheet named "data"')
+                    if error:
+                        self.add_error(field_name, error)
                 except KeyError:
                     self.add_error(field_name, 'No excel file named "drivers.xlsx"')
 
@@ -100,22 +83,10 @@ class AttendanceImportForm(forms.Form):
         if file_extension != '.xlsx':
             self.add_error(field_name, f'File must be a excel file')
         else:
-            wb = load_workbook(filename=BytesIO(self.files['attendance_file_import'].read()))
-
-            try:
-                sheet = wb['data']
+            error = check_headers(self.files[field_name], AttendanceRow)
 
-                correct_headers = ['employee_id', 'incident_date', 'reason', 'exemption', 'assigned_by']
-                headers = []
-                for col in sheet.iter_cols():
-                    headers.append(col[0].value)
-
-                if headers != correct_headers:
-                    self.add_error(field_name, 'Headers are incorrect,'
-                                               ' look at documentation for more information')
-
-            except KeyError:
-                self.add_error(field_name, 'No sheet named "data"')
+            if error:
+                self.add_error(field_name, error)
 
 
 class SafetyPointImportForm(forms.Form):
@@ -131,19 +102,7 @@ class SafetyPointImportForm(forms.Form):
         if file_extension != '.xlsx':
             self.add_error(field_name, f'File must be a excel file')
         else:
-            wb = load_workbook(filename=BytesIO(self.files['safety_point_file_import'].read()))
-
-            try:
-                sheet = wb['data']
-
-                correct_headers = ['employee_id', 'incident_date', 'issued_date', 'reason', 'assigned_by']
-                headers = []
-                for col in sheet.iter_cols():
-                    headers.append(col[0].value)
-
-                if headers != correct_headers:
-                    self.add_error(field_name, 'Headers are incorrect,'
-                                               ' look at documentation for more information')
+            error = check_headers(self.files[field_name], SafetyPointRow)
 
-            except KeyError:
-                self.add_error(field_name, 'No sheet named "data"')
+            if error:
+                self.add_error(field_name, error)
@@ -0,0 +1,169 @@
+import datetime
+
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Max, OuterRef
+
+from employees.documents import invalidate_history_bundles
+from employees.models import Attendance, Counseling, Employee, PointsLedger
+from employees.signals import queue_document
+from operations.dashboard import PANELS, invalidate_panels
+
+ATTENDANCE_POINTS = {
+    '0': Decimal('1'),
+    '1': Decimal('0'),
+    '2': Decimal('1.5'),
+    '3': Decimal('4'),
+    '4': Decimal('1'),
+    '5': Decimal('1'),
+    '6': Decimal('.5'),
+    '7': Decimal('1'),
+    '8': Decimal('.5'),
+}
+
+EXEMPTIONS = [exemption for exemption, name in Attendance.EXEMPTION_CHOICES]
+
+
+def parse_attendance_row(values):
+    """
+    This function validates one spreadsheet row of employee_id, incident_date, reason, exemption and assigned_by
+
+    :param values: Tuple of the cell values of the row
+    :return: Dictionary of the parsed values
+    :raises ValueError: With a message explaining what is wrong with the row
+    """
+    employee_id, incident_date, reason, exemption, assigned_by = (tuple(values) + (None,) * 5)[:5]
+
+    try:
+        employee_id = int(employee_id)
+    except (TypeError, ValueError):
+        raise ValueError(f'Employee ID "{employee_id}" is not a number')
+
+    try:
+        incident_date = datetime.datetime.strptime(str(incident_date), '%Y%m%d').date()
+    except ValueError:
+        raise ValueError(f'Incident date "{incident_date}" is not formatted as YYYYMMDD')
+
+    reason = str(reason)
+    if reason not in ATTENDANCE_POINTS:
+        raise ValueError(f'Reason "{reason}" is not a valid reason code')
+
+    exemption = '' if exemption is None or exemption == '' else str(exemption)
+    if exemption not in EXEMPTIONS:
+        raise ValueError(f'Exemption "{exemption}" is not a valid exemption code')
+
+    try:
+        assigned_by = int(assigned_by)
+    except (TypeError, ValueError):
+        raise ValueError(f'Assigned by "{assigned_by}" is not an employee ID')
+
+    return {
+        'employee_id': employee_id,
+        'incident_date': incident_date,
+        'reason': reason,
+        'exemption': exemption,
+        'assigned_by': assigned_by,
+        'points': Decimal('0') if exemption else ATTENDANCE_POINTS[reason],
+    }
+
+
+def import_attendance_rows(rows, first_row=2):
+    """
+    This function imports attendance from spreadsheet rows in one transaction. Every row is validated and every
+    employee looked up before anything is written, invalid rows are skipped and reported while the rest are inserted
+    with a handful of bulk queries. What the Attendance signals would do for every row is done afterwards once per
+    import: sick days and points ledgers are updated in bulk, counseling is evaluated by replaying each employee's new
+    records in order and documents are queued for rendering
+
+    :param rows: Iterable of tuples of cell values, employee_id, incident_date, reason, exemption and assigned_by
+    :param first_row: The spreadsheet row number of the first row, used in the error report
+    :return: Dictionary with the number of imported rows and a list of errors with their row number
+    """
+    errors = []
+    parsed_rows = []
+
+    for row_number, values in enumerate(rows, start=first_row):
+        if all(value is None for value in values):
+            continue
+
+        try:
+            parsed_rows.append((row_number, parse_attendance_row(values)))
+        except ValueError as e:
+            errors.append({'row': row_number, 'error': str(e)})
+
+    with transaction.atomic():
+        employees = Employee.objects.select_for_update().in_bulk(
+            {row['employee_id'] for row_number, row in parsed_rows}, field_name='employee_id')
+
+        # bulk_create skips the signal that follows assigned_by with the assignee relation
+        assignees = dict(Employee.objects.filter(
+            employee_id__in={row['assigned_by'] for row_number, row in parsed_rows}).values_list('employee_id', 'pk'))
+
+        new_attendance = []
+        sick_day_employees = {}
+        for row_number, row in parsed_rows:
+            employee = employees.get(row['employee_id'])
+
+            if employee is None:
+                errors.append({'row': row_number, 'error': f'No employee with the ID {row["employee_id"]}'})
+                continue
+
+            if row['exemption'] == '1':
+                employee.paid_sick -= 1
+                sick_day_employees[employee.pk] = employee
+            elif row['exemption'] == '2':
+                employee.unpaid_sick -= 1
+                sick_day_employees[employee.pk] = employee
+
+            new_attendance.append(Attendance(
+                employee=employee,
+                incident_date=row['incident_date'],
+                reason=row['reason'],
+                exemption=row['exemption'],
+                assigned_by=row['assigned_by'],
+                assignee_id=assignees.get(row['assigned_by']),
+                points=row['points'],
+                uploaded=True,
+            ))
+
+        employee_pks = {attendance.employee_id for attendance in new_attendance}
+        totals = dict(Employee.objects.filter(pk__in=employee_pks).values_list(
+            'pk', PointsLedger.attendance_points_total(OuterRef('pk'))))
+        written = set(Counseling.objects.filter(employee__in=employee_pks, is_active=True, action_type='2')
+                      .exclude(attendance=None).values_list('employee_id', flat=True))
+        newest_id = Attendance.objects.aggregate(newest=Max('id'))['newest'] or 0
+
+        Employee.objects.bulk_update(sick_day_employees.values(), ['paid_sick', 'unpaid_sick'], batch_size=500)
+        Attendance.objects.bulk_create(new_attendance, batch_size=500)
+
+        # Only PostgreSQL hands back the ids of bulk inserted rows, other databases read them back in insert order
+        if new_attendance and new_attendance[0].pk is None:
+            created = Attendance.objects.filter(id__gt=newest_id, employee__in=employee_pks).order_by('id')
+            for attendance, created_id in zip(new_attendance, created.values_list('id', flat=True)):
+                attendance.pk = created_id
+
+        PointsLedger.refresh_many_attendance_points(employee_pks)
+
+        for attendance in new_attendance:
+            employee = attendance.employee
+            totals[employee.pk] += attendance.points
+
+            if attendance.points == 0:
+                continue
+
+            today = datetime.datetime.today()
+            if employee.pk in written and totals[employee.pk] >= 10:
+                employee.attendance_removal([2, None, today], attendance, attendance.assigned_by)
+            elif employee.pk not in written and totals[employee.pk] >= 7:
+                employee.attendance_written([1, None, today], attendance, attendance.assigned_by)
+                written.add(employee.pk)
+
+        for attendance in new_attendance:
+            queue_document(attendance)
+
+        invalidate_history_bundles(*employee_pks)
+        invalidate_panels(PANELS)
+
+    errors.sort(key=lambda error: error['row'])
+
+    return {'imported': len(new_attendance), 'errors': errors}
@@ -0,0 +1,85 @@
+"""
+Email delivery
+
+send_messages() sends a batch of emails over one SMTP connection instead of opening a connection and going through
+the handshake for every email. A message that fails with a temporary error is tried again, on a new connection when
+the old one was lost, and the result of every recipient is handed back.
+"""
+import contextlib
+import logging
+import smtplib
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+
+
+def is_temporary(error):
+    """SMTP answers in the 400s and lost connections are worth another try, answers in the 500s are final"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, message in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+
+    return isinstance(error, OSError)
+
+
+def build_messages(subject, plain_message, recipient_list, html_message):
+    """One message for every address so no recipient sees the others"""
+    messages = []
+    for to in recipient_list:
+        message = EmailMultiAlternatives(subject=subject, body=plain_message, to=[to])
+        message.attach_alternative(html_message, 'text/html')
+        messages.append(message)
+
+    return messages
+
+
+def send_messages(messages, attempts=None):
+    """
+    Sends the messages over one connection of the email backend, every message is tried up to the given number of
+    times as long as it fails with a temporary error
+
+    :param messages: List of EmailMessages
+    :param attempts: Tries per message, settings.EMAIL_SEND_ATTEMPTS by default
+    :return: Dictionary of every recipient address with 'sent' or the error its message failed with
+    """
+    attempts = attempts or settings.EMAIL_SEND_ATTEMPTS
+    connection = get_connection()
+    results = {}
+
+    try:
+        for message in messages:
+            message.connection = connection
+
+            for attempt in range(1, attempts + 1):
+                try:
+                    connection.open()
+                    message.send()
+                    result = 'sent'
+                    break
+                except OSError as e:
+                    result = f'{type(e).__name__}: {e}'
+
+                    # A refused message leaves the connection usable, anything else starts over on a new one
+                    if not isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                        with contextlib.suppress(OSError):
+                            connection.close()
+
+                    if not is_temporary(e) or attempt == attempts:
+                        break
+
+                    time.sleep(settings.EMAIL_RETRY_DELAY * attempt)
+
+            for address in message.recipients():
+                results[address] = result
+    finally:
+        with contextlib.suppress(OSError):
+            connection.close()
+
+    failed = {address: result for address, result in results.items() if result != 'sent'}
+    for address, result in failed.items():
+        logging.warning(f'Email to {address} could not be sent: {result}')
+    logging.info(f'Sent {len(results) - len(failed)} of {len(results)} emails')
+
+    return results
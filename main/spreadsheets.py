@@ -0,0 +1,70 @@
+from collections import namedtuple
+from contextlib import contextmanager
+
+from openpyxl import load_workbook
+
+# Every import spreadsheet keeps its records in a sheet with this name
+SHEET_NAME = 'data'
+
+DriverRow = namedtuple('DriverRow', ['last_name', 'first_name', 'employee_id', 'position', 'hire_date',
+                                     'application_date', 'classroom_date', 'company', 'is_partime', 'primary_phone',
+                                     'secondary_phone', 'SS'])
+AttendanceRow = namedtuple('AttendanceRow', ['employee_id', 'incident_date', 'reason', 'exemption', 'assigned_by'])
+SafetyPointRow = namedtuple('SafetyPointRow', ['employee_id', 'incident_date', 'issued_date', 'reason',
+                                               'assigned_by'])
+
+
+@contextmanager
+def open_sheet(file):
+    """
+    This context manager opens the data sheet of a workbook in openpyxl's read only mode, which streams the rows from
+    the file as they are iterated instead of loading every cell up front. The workbook is closed when the block is left
+
+    :param file: Path or file object of the workbook
+    :return: The read only worksheet
+    :raises KeyError: If the workbook has no sheet named "data"
+    """
+    wb = load_workbook(filename=file, read_only=True, data_only=True)
+
+    try:
+        yield wb[SHEET_NAME]
+    finally:
+        wb.close()
+
+
+def check_headers(file, row_type):
+    """
+    This function checks the header row of an import spreadsheet against the fields of the row type, only the first
+    row of the sheet is read
+
+    :param file: Path or file object of the workbook
+    :param row_type: The namedtuple the rows of the sheet are read into
+    :return: A message explaining what is wrong with the spreadsheet or None if nothing is
+    """
+    try:
+        with open_sheet(file) as sheet:
+            headers = list(next(sheet.iter_rows(max_row=1, values_only=True), ()))
+    except KeyError:
+        return f'No sheet named "{SHEET_NAME}"'
+
+    while headers and headers[-1] is None:
+        headers.pop()
+
+    if headers != list(row_type._fields):
+        return 'Headers are incorrect, look at documentation for more information'
+
+
+def read_rows(file, row_type):
+    """
+    This generator streams the rows below the header row of an import spreadsheet one at a time, so memory use stays
+    the same no matter how long the sheet is. Rows shorter than the row type are padded with None
+
+    :param file: Path or file object of the workbook
+    :param row_type: The namedtuple the rows of the sheet are read into
+    :return: Generator of row_type records in sheet order
+    """
+    width = len(row_type._fields)
+
+    with open_sheet(file) as sheet:
+        for values in sheet.iter_rows(min_row=2, max_col=width, values_only=True):
+            yield row_type(*(tuple(values) + (None,) * width)[:width])
@@ -0,0 +1,44 @@
+/* Autocompletes employee names from the roster, which is downloaded once per page and filtered in the browser instead
+   of asking the server on every key press. The browser revalidates the roster with its ETag so it is only sent again
+   after an employee changed. */
+let rosterRequest = null;
+
+function loadRoster(url) {
+    if (rosterRequest === null) {
+        rosterRequest = $.ajax({url: url, dataType: 'json'});
+    }
+
+    return rosterRequest;
+}
+
+function normalizeSearch(value) {
+    return value.normalize('NFKD').replace(/[\u0300-\u036f'.\-]/g, '').toLowerCase().split(/[^a-z0-9]+/)
+        .filter(function (word) { return word !== ''; });
+}
+
+function rosterAutoComplete(fields, url, limit) {
+    limit = limit || 20;
+
+    fields.autoComplete({
+        resolver: 'custom',
+        events: {
+            search: function (query, callback) {
+                let words = normalizeSearch(query);
+
+                loadRoster(url).done(function (roster) {
+                    let matches = [];
+
+                    for (let i = 0; i < roster.length && matches.length < limit; i++) {
+                        let name = normalizeSearch(roster[i]).join(' ');
+
+                        if (words.every(function (word) { return name.indexOf(word) !== -1; })) {
+                            matches.push(roster[i]);
+                        }
+                    }
+
+                    callback(matches);
+                });
+            }
+        }
+    });
+}
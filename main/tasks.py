@@ -1,46 +1,56 @@
 import datetime
+import logging
 import os
 
 from io import BytesIO
 from zipfile import ZipFile
 
 from celery import shared_task
-from django.core.mail import send_mail
+from django.apps import apps
 from django.core.management import call_command
-from openpyxl import load_workbook
 
-from employees.models import Company, Employee, Attendance, SafetyPoint
+from employees.models import Company, Employee, SafetyPoint, render_document
+from .mail import build_messages, send_messages
+from .spreadsheets import SHEET_NAME, AttendanceRow, DriverRow, SafetyPointRow, read_rows
 
 
 @shared_task
 def send_email(subject, plain_message, to, html_message):
-    send_mail(subject=subject, from_email=None, message=plain_message, recipient_list=[to], html_message=html_message)
+    return send_messages(build_messages(subject, plain_message, [to], html_message))
+
+
+@shared_task
+def send_emails(subject, plain_message, recipient_list, html_message):
+    """Sends the same email to every address over one SMTP connection, each recipient gets their own message so no one
+    sees the others. The delivery result of every address is kept as the result of the task"""
+    return send_messages(build_messages(subject, plain_message, recipient_list, html_message))
+
+
+@shared_task
+def create_document(model_name, pk):
+    render_document(apps.get_model('employees', model_name), pk)
 
 
 @shared_task
 def import_drivers(path):
+    counter = 0
     with ZipFile(path) as zipfile:
         try:
-            driver_info = zipfile.read('drivers/drivers.xlsx')
-
-            wb = load_workbook(filename=BytesIO(driver_info))
-            try:
-                sheet = wb['data']
-                counter = 0
-                for row in sheet.iter_rows(min_row=2):
+            with zipfile.open('drivers/drivers.xlsx') as driver_info:
+                for row in read_rows(driver_info, DriverRow):
                     try:
-                        last_name = f'{row[0].value.lower()[0].upper()}{row[0].value.lower()[1:]}'
-                        first_name = f'{row[1].value.lower()[0].upper()}{row[1].value.lower()[1:]}'
-                        employee_id = row[2].value
-                        position = row[3].value.lower()
-                        hire_date = datetime.datetime.strptime(str(row[4].value), '%Y%m%d')
-                        application_date = datetime.datetime.strptime(str(row[5].value), '%Y%m%d')
-                        classroom_date = datetime.datetime.strptime(str(row[6].value), '%Y%m%d')
-                        company_name = row[7].value
-                        is_part_time = True if row[8].value == 'TRUE' else False
-                        primary_phone = row[9].value
-                        secondary_phone = row[10].value
-                        ss_number = row[11].value
+                        last_name = f'{row.last_name.lower()[0].upper()}{row.last_name.lower()[1:]}'
+                        first_name = f'{row.first_name.lower()[0].upper()}{row.first_name.lower()[1:]}'
+                        employee_id = row.employee_id
+                        position = row.position.lower()
+                        hire_date = datetime.datetime.strptime(str(row.hire_date), '%Y%m%d')
+                        application_date = datetime.datetime.strptime(str(row.application_date), '%Y%m%d')
+                        classroom_date = datetime.datetime.strptime(str(row.classroom_date), '%Y%m%d')
+                        company_name = row.company
+                        is_part_time = True if row.is_partime == 'TRUE' else False
+                        primary_phone = row.primary_phone
+                        secondary_phone = row.secondary_phone
+                        ss_number = row.SS
 
                         company = Company.objects.get(display_name=company_name)
 
@@ -74,8 +84,6 @@ def import_drivers(path):
                         counter += 1
                     except:
                         pass
-            except KeyError:
-                pass
         except KeyError:
             pass
     try:
@@ -88,97 +96,56 @@ def import_drivers(path):
 
 @shared_task
 def import_attendance(path):
-    with open(path, 'rb') as f:
-        wb = load_workbook(filename=f)
-
-        try:
-            sheet = wb['data']
-
-        except KeyError:
-            pass
-        for row in sheet.iter_rows(min_row=2):
-            points = {
-                '0': 1,
-                '1': 0,
-                '2': 1.5,
-                '3': 4,
-                '4': 1,
-                '5': 1,
-                '6': .5,
-                '7': 1,
-                '8': .5,
-            }
-
-            try:
-                employee = Employee.objects.get(employee_id=int(row[0].value))
-                incident_date = datetime.datetime.strptime(str(row[1].value), '%Y%m%d')
-                reason = str(row[2].value)
-                exemption = str(row[3].value) if row[3].value else ''
-                assigned_by = int(row[4].value)
-                point = 0 if exemption else points[reason]
-
-                if exemption == '1':
-                    employee.paid_sick -= 1
-                if exemption == '2':
-                    employee.unpaid_sick -= 1
+    # The import engine queues documents through employees.signals, which imports this module
+    from .importers import import_attendance_rows
 
-                employee.save()
+    try:
+        report = import_attendance_rows(read_rows(path, AttendanceRow))
+    except KeyError:
+        report = {'imported': 0, 'errors': [{'row': 1, 'error': f'No sheet named "{SHEET_NAME}"'}]}
 
-                new_attendance = Attendance(
-                    employee=employee,
-                    incident_date=incident_date,
-                    reason=reason,
-                    exemption=exemption,
-                    assigned_by=assigned_by,
-                    points=point,
-                    uploaded=True
-                )
+    for error in report['errors']:
+        logging.warning(f'Attendance import skipped row {error["row"]}: {error["error"]}')
 
-                new_attendance.save()
-            except Employee.DoesNotExist:
-                pass
     try:
         os.remove(path)
     except FileNotFoundError:
         pass
 
+    return report
+
 
 @shared_task
 def import_safety_points(path):
-    with open(path, 'rb') as f:
-        wb = load_workbook(filename=f)
-
-        try:
-            sheet = wb['data']
-
-        except KeyError:
-            pass
+    points = {
+        '0': 1,
+        '1': 1,
+        '2': 1,
+        '3': 2,
+        '4': 2,
+        '5': 2,
+        '6': 2,
+        '7': 3,
+        '8': 4,
+        '9': 6,
+        '10': 6,
+        '11': 6,
+        '12': 6,
+        '13': 6,
+        '14': 6,
+    }
 
-        for row in sheet.iter_rows(min_row=2):
-            points = {
-                '0': 1,
-                '1': 1,
-                '2': 1,
-                '3': 2,
-                '4': 2,
-                '5': 2,
-                '6': 2,
-                '7': 3,
-                '8': 4,
-                '9': 6,
-                '10': 6,
-                '11': 6,
-                '12': 6,
-                '13': 6,
-                '14': 6,
-            }
+    try:
+        for row in read_rows(path, SafetyPointRow):
+            if all(value is None for value in row):
+                continue
 
             try:
-                employee = Employee.objects.get(employee_id=int(row[0].value))
-                incident_date = datetime.datetime.strptime(str(row[1].value), '%Y%m%d')
-                issued_date = datetime.datetime.strptime(str(row[2].value), '%Y%m%d')
-                reason = str(row[3].value)
-                assigned_by = int(row[4].value)
+                employee = Employee.objects.get(employee_id=int(row.employee_id))
+                incident_date = datetime.datetime.strptime(str(row.incident_date), '%Y%m%d')
+                issued_date = datetime.datetime.strptime(str(row.issued_date), '%Y%m%d')
+                reason = str(row.reason)
+                assigned_by = int(row.assigned_by)
 
                 new_safety_point = SafetyPoint(
                     employee=employee,
@@ -192,6 +159,8 @@ def import_safety_points(path):
                 new_safety_point.save()
             except Employee.DoesNotExist:
                 pass
+    except KeyError:
+        pass
     try:
         os.remove(path)
     except FileNotFoundError:
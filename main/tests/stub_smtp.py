@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import socket
+import threading
+
+from aiosmtpd.controller import Controller
+
+# aiosmtpd logs every command of every session
+logging.getLogger('mail.log').setLevel(logging.WARNING)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+
+        return sock.getsockname()[1]
+
+
+class StubSMTPServer:
+    """A local stand in for the mail server that keeps every message it accepts. Each new connection waits the given
+    handshake latency before it is greeted and addresses in refuse are turned away with a temporary error the given
+    number of times, meant to be used as a context manager"""
+
+    def __init__(self, handshake_latency=0.0, refuse=None):
+        self.handshake_latency = handshake_latency
+        self.refuse = dict(refuse or {})
+        self.connection_count = 0
+        self.messages = []
+        self.lock = threading.Lock()
+        self.controller = Controller(self.create_handler(), hostname='127.0.0.1', port=free_port())
+
+    def create_handler(self):
+        stub = self
+
+        class Handler:
+            async def handle_EHLO(self, server, session, envelope, hostname, responses):
+                with stub.lock:
+                    stub.connection_count += 1
+
+                await asyncio.sleep(stub.handshake_latency)
+                session.host_name = hostname
+
+                return responses
+
+            async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+                with stub.lock:
+                    if stub.refuse.get(address):
+                        stub.refuse[address] -= 1
+
+                        return '451 4.3.0 Try again later'
+
+                envelope.rcpt_tos.append(address)
+
+                return '250 OK'
+
+            async def handle_DATA(self, server, session, envelope):
+                with stub.lock:
+                    stub.messages.append((envelope.rcpt_tos, envelope.content))
+
+                return '250 Message accepted for delivery'
+
+        return Handler()
+
+    def settings(self):
+        """The email settings that send mail through this server"""
+        return {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': self.controller.hostname,
+            'EMAIL_PORT': self.controller.port,
+            'EMAIL_HOST_USER': '',
+            'EMAIL_HOST_PASSWORD': '',
+            'EMAIL_USE_TLS': False,
+        }
+
+    def __enter__(self):
+        self.controller.start()
+
+        return self
+
+    def __exit__(self, *args):
+        self.controller.stop()
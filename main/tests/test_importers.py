@@ -0,0 +1,107 @@
+import datetime
+import os
+from decimal import Decimal
+
+from django.test import TestCase
+from openpyxl import Workbook
+
+from employees.models import Attendance, Counseling, Employee, PointsLedger
+from employees.tests.mixins import TemporaryMediaMixin
+from main.importers import import_attendance_rows
+from main.tasks import import_attendance
+
+
+class TestImportAttendanceRows(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        """Create a supervisor that assigns the imported attendance and an Employee that receives it"""
+        self.supervisor = Employee.objects.create_user(
+            username='test.supervisor',
+            password='test',
+            first_name='Test',
+            last_name='Supervisor',
+            employee_id=1,
+            hire_date=datetime.date(2015, 1, 1),
+        )
+        self.employee = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=2,
+            hire_date=datetime.date(2015, 1, 1),
+            paid_sick=3,
+            unpaid_sick=3,
+        )
+        self.incident_date = datetime.date.today().strftime('%Y%m%d')
+
+    def row(self, reason='0', exemption=None, employee_id=2):
+        return employee_id, self.incident_date, reason, exemption, 1
+
+    def test_imports_valid_rows(self):
+        """Test that every valid row is imported with its points and the ledger is brought up to date"""
+        report = import_attendance_rows([self.row('0'), self.row('2'), self.row('0', exemption='1')])
+
+        self.assertEqual(report, {'imported': 3, 'errors': []})
+        self.assertEqual(sorted(Attendance.objects.filter(employee=self.employee).values_list('points', flat=True)),
+                         [Decimal('0'), Decimal('1'), Decimal('1.5')])
+        self.assertEqual(PointsLedger.objects.get(employee=self.employee).attendance_points, Decimal('2.5'))
+
+    def test_reports_invalid_rows(self):
+        """Test that invalid rows and unknown employees are reported by row number and the rest is still imported"""
+        rows = [
+            self.row('0'),
+            (2, 'yesterday', '0', None, 1),
+            self.row('9'),
+            self.row('0', exemption='8'),
+            self.row('0', employee_id=99),
+            (None, None, None, None, None),
+            ('abc', self.incident_date, '0', None, 1),
+        ]
+        report = import_attendance_rows(rows)
+
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual([error['row'] for error in report['errors']], [3, 4, 5, 6, 8])
+        self.assertEqual(Attendance.objects.filter(employee=self.employee).count(), 1)
+
+    def test_sick_days_used(self):
+        """Test that sick exemptions take a sick day from the Employee for every row"""
+        import_attendance_rows([self.row('0', exemption='1'), self.row('0', exemption='1'),
+                                self.row('0', exemption='2')])
+        self.employee.refresh_from_db()
+
+        self.assertEqual(self.employee.paid_sick, 1)
+        self.assertEqual(self.employee.unpaid_sick, 2)
+
+    def test_counseling_evaluated_in_order(self):
+        """Test that a written warning is attached to the row that reaches 7 points and a removal from service to the
+        row that reaches 10"""
+        import_attendance_rows([self.row('3'), self.row('2'), self.row('0'), self.row('0'), self.row('0'),
+                                self.row('0'), self.row('0')])
+        attendance = list(Attendance.objects.filter(employee=self.employee).order_by('id'))
+
+        self.assertEqual(Counseling.objects.get(action_type='2').attendance, attendance[3])
+        self.assertEqual(Counseling.objects.get(action_type='6').attendance, attendance[6])
+
+    def test_documents_rendered(self):
+        """Test that the imported attendance has its documents rendered after the import"""
+        import_attendance_rows([self.row('0'), self.row('6')])
+
+        for attendance in Attendance.objects.filter(employee=self.employee):
+            self.assertEqual(attendance.document_status, 'ready')
+            self.assertTrue(attendance.document)
+
+    def test_import_task(self):
+        """Test that the import task streams the rows of the uploaded workbook into the import and removes it"""
+        wb = Workbook()
+        wb.active.title = 'data'
+        wb.active.append(['employee_id', 'incident_date', 'reason', 'exemption', 'assigned_by'])
+        wb.active.append([2, int(self.incident_date), 0, None, 1])
+        wb.active.append([99, int(self.incident_date), 0, None, 1])
+        path = f'{self.media_root}/attendance.xlsx'
+        wb.save(path)
+
+        report = import_attendance(path)
+
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(report['errors'], [{'row': 3, 'error': 'No employee with the ID 99'}])
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,66 @@
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from DivisionManagementSystem.instrumentation import QueryBudgetExceeded, track_queries
+from employees.models import Employee
+from main.tasks import create_document
+
+LOGGER = 'DivisionManagementSystem.instrumentation'
+
+
+class TestQueryInstrumentation(TestCase):
+    def setUp(self):
+        """Create a Django user for testing purposes"""
+        self.user = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=000000
+        )
+        self.client.force_login(self.user)
+
+    def test_track_queries(self):
+        """Test that every statement is counted and only the slowest ones are kept, without their parameters"""
+        with track_queries(slowest=2) as stats:
+            for employee_id in range(3):
+                Employee.objects.filter(employee_id=employee_id).exists()
+
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(len(stats.slowest), 2)
+        self.assertGreaterEqual(stats.slowest[0]['ms'], stats.slowest[1]['ms'])
+        self.assertIn('%s', stats.slowest[0]['sql'])
+
+    def test_server_timing_and_log(self):
+        """Test that a request reports its queries in the Server-Timing header and a JSON log line"""
+        with self.assertLogs(LOGGER, 'INFO') as logs:
+            resp = self.client.get(reverse('operations-employee-roster'))
+
+        line = json.loads(logs.records[-1].getMessage())
+
+        self.assertEqual(line['name'], 'operations-employee-roster')
+        self.assertEqual(line['status'], 200)
+        self.assertEqual(resp['Server-Timing'], f'db;dur={line["db_ms"]};desc="{line["queries"]} queries"')
+
+    @override_settings(SQL_QUERY_BUDGETS={'operations-employee-roster': 1})
+    def test_budget_raises_in_tests(self):
+        """Test that going over a budget fails the request while the test runner is running"""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('operations-employee-roster'))
+
+    @override_settings(SQL_QUERY_BUDGETS={'operations-employee-roster': 1}, SQL_QUERY_BUDGETS_RAISE=False)
+    def test_budget_warns_in_production(self):
+        """Test that going over a budget outside of the tests only logs a warning"""
+        with self.assertLogs(LOGGER, 'WARNING') as logs:
+            resp = self.client.get(reverse('operations-employee-roster'))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('operations-employee-roster ran', logs.output[0])
+
+    @override_settings(SQL_QUERY_BUDGETS={'main.tasks.create_document': 0})
+    def test_task_budget(self):
+        """Test that celery tasks are held to the budget of their name"""
+        with self.assertRaises(QueryBudgetExceeded):
+            create_document('Attendance', 0)
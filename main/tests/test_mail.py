@@ -0,0 +1,79 @@
+import importlib.util
+import smtplib
+from unittest import skipUnless
+
+from django.core import mail
+from django.test import SimpleTestCase, override_settings
+
+from main.mail import build_messages, is_temporary, send_messages
+from main.tasks import send_emails
+
+RECIPIENTS = [f'supervisor.{number}@example.com' for number in range(12)]
+
+# The stub mail server is a dev package, the image the CI runs the tests in only has the default ones
+HAS_AIOSMTPD = importlib.util.find_spec('aiosmtpd') is not None
+
+if HAS_AIOSMTPD:
+    from main.tests.stub_smtp import StubSMTPServer
+
+
+@override_settings(EMAIL_RETRY_DELAY=0, EMAIL_SEND_ATTEMPTS=3)
+class TestSendMessages(SimpleTestCase):
+    def send(self, stub, recipients=RECIPIENTS):
+        with self.settings(**stub.settings()):
+            return send_emails('New Notification', 'Plain', recipients, '<p>Html</p>')
+
+    @skipUnless(HAS_AIOSMTPD, 'aiosmtpd is not installed')
+    def test_one_connection(self):
+        """Test that a batch goes over a single connection with one message per recipient"""
+        with StubSMTPServer() as stub:
+            results = self.send(stub)
+
+        self.assertEqual(stub.connection_count, 1)
+        self.assertEqual([rcpt_tos for rcpt_tos, content in stub.messages], [[to] for to in RECIPIENTS])
+        self.assertEqual(set(results.values()), {'sent'})
+
+    @skipUnless(HAS_AIOSMTPD, 'aiosmtpd is not installed')
+    def test_temporary_error_retried(self):
+        """Test that a recipient turned away for now is tried again without holding up the others"""
+        with StubSMTPServer(refuse={RECIPIENTS[0]: 2}) as stub:
+            results = self.send(stub)
+
+        self.assertEqual(results[RECIPIENTS[0]], 'sent')
+        self.assertEqual(len(stub.messages), len(RECIPIENTS))
+        self.assertEqual(stub.connection_count, 1)
+
+    @skipUnless(HAS_AIOSMTPD, 'aiosmtpd is not installed')
+    def test_gives_up(self):
+        """Test that a recipient that keeps failing is reported after the last try and the rest still go out"""
+        with StubSMTPServer(refuse={RECIPIENTS[0]: 5}) as stub:
+            results = self.send(stub)
+
+        self.assertIn('SMTPRecipientsRefused', results[RECIPIENTS[0]])
+        self.assertEqual(stub.refuse[RECIPIENTS[0]], 2)
+        self.assertEqual(len(stub.messages), len(RECIPIENTS) - 1)
+
+    @skipUnless(HAS_AIOSMTPD, 'aiosmtpd is not installed')
+    def test_server_down(self):
+        """Test that a mail server that can't be reached fails every message instead of the task"""
+        stub = StubSMTPServer()
+
+        with self.settings(**stub.settings()):
+            results = send_messages(build_messages('Subject', 'Plain', RECIPIENTS[:2], '<p>Html</p>'))
+
+        self.assertEqual(len(results), 2)
+        self.assertNotIn('sent', results.values())
+
+    def test_is_temporary(self):
+        """Test that only answers in the 400s and lost connections are tried again"""
+        self.assertTrue(is_temporary(smtplib.SMTPRecipientsRefused({'a@example.com': (451, b'Later')})))
+        self.assertFalse(is_temporary(smtplib.SMTPRecipientsRefused({'a@example.com': (550, b'No such user')})))
+        self.assertFalse(is_temporary(smtplib.SMTPDataError(554, b'Rejected')))
+        self.assertTrue(is_temporary(smtplib.SMTPServerDisconnected()))
+
+    def test_html_alternative(self):
+        """Test that every message carries the plain text and the html version"""
+        send_emails('New Notification', 'Plain', RECIPIENTS[:2], '<p>Html</p>')
+
+        self.assertEqual([message.to for message in mail.outbox], [[to] for to in RECIPIENTS[:2]])
+        self.assertEqual(mail.outbox[0].alternatives, [('<p>Html</p>', 'text/html')])
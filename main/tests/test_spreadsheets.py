@@ -0,0 +1,60 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from openpyxl import Workbook
+
+from main.forms import AttendanceImportForm
+from main.spreadsheets import AttendanceRow, check_headers, read_rows
+
+
+def create_workbook(rows, sheet_name='data'):
+    wb = Workbook()
+    wb.active.title = sheet_name
+
+    for row in rows:
+        wb.active.append(row)
+
+    file = BytesIO()
+    wb.save(file)
+    file.seek(0)
+
+    return file
+
+
+class TestSpreadsheets(SimpleTestCase):
+    headers = ['employee_id', 'incident_date', 'reason', 'exemption', 'assigned_by']
+
+    def test_check_headers(self):
+        """Test that a sheet with the expected headers passes"""
+        self.assertIsNone(check_headers(create_workbook([self.headers]), AttendanceRow))
+
+    def test_check_headers_incorrect(self):
+        """Test that headers in the wrong order are reported"""
+        file = create_workbook([list(reversed(self.headers))])
+
+        self.assertEqual(check_headers(file, AttendanceRow),
+                         'Headers are incorrect, look at documentation for more information')
+
+    def test_check_headers_no_sheet(self):
+        """Test that a workbook without a data sheet is reported"""
+        file = create_workbook([self.headers], sheet_name='Sheet1')
+
+        self.assertEqual(check_headers(file, AttendanceRow), 'No sheet named "data"')
+
+    def test_read_rows(self):
+        """Test that the rows below the headers are read into records in order and short rows are padded"""
+        file = create_workbook([self.headers, [1, 20200101, '0', None, 2], [3, 20200102, '6']])
+
+        self.assertEqual(list(read_rows(file, AttendanceRow)), [
+            AttendanceRow(employee_id=1, incident_date=20200101, reason='0', exemption=None, assigned_by=2),
+            AttendanceRow(employee_id=3, incident_date=20200102, reason='6', exemption=None, assigned_by=None),
+        ])
+
+    def test_import_form_checks_headers(self):
+        """Test that the attendance import form rejects a spreadsheet with the wrong headers"""
+        valid = SimpleUploadedFile('attendance.xlsx', create_workbook([self.headers]).read())
+        invalid = SimpleUploadedFile('attendance.xlsx', create_workbook([self.headers[:-1]]).read())
+
+        self.assertTrue(AttendanceImportForm(data={}, files={'attendance_file_import': valid}).is_valid())
+        self.assertFalse(AttendanceImportForm(data={}, files={'attendance_file_import': invalid}).is_valid())
@@ -7,8 +7,6 @@ from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.forms import AuthenticationForm
 from django.core.paginator import Paginator
-from django.db.models import CharField, Value as V
-from django.db.models.functions import Concat
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse
@@ -16,6 +14,7 @@ from django.urls import reverse
 from employees.helper_functions import create_phone_list, create_seniority_list, create_driver_list, create_custom_list,\
     create_safety_meeting_attendance
 from employees.models import Employee
+from employees.search import filter_by_name
 from .forms import DriverFilterForm, DriverImportForm, AttendanceImportForm, SafetyPointImportForm
 from .tasks import import_drivers, import_attendance, import_safety_points
 
@@ -83,9 +82,7 @@ def employee_info(request):
             employees = employees.filter(employee_id__exact=search)
 
         except ValueError:
-            employees = Employee.objects.annotate(
-                full_name=Concat('first_name', V(' '), 'last_name', output_field=CharField())).filter(
-                full_name__icontains=search, is_active=True)
+            employees = filter_by_name(Employee.objects.filter(is_active=True), search)
 
     if company_name:
         employees = employees.filter(company__display_name__exact=company_name)
@@ -180,9 +177,7 @@ def export_custom_list(request):
             employees = employees.filter(employee_id__exact=search)
 
         except ValueError:
-            employees = Employee.objects.annotate(
-                full_name=Concat('first_name', V(' '), 'last_name', output_field=CharField())).filter(
-                full_name__icontains=search, is_active=True).order_by(sort_by)
+            employees = filter_by_name(Employee.objects.filter(is_active=True), search).order_by(sort_by)
 
     if company_name:
         employees = employees.filter(company__display_name__exact=company_name)
@@ -0,0 +1,118 @@
+import datetime
+
+from django.core.cache import cache
+from django.db.models import F, Exists, OuterRef
+from django.utils import timezone
+
+from employees.models import Employee, Attendance, Counseling, Settlement
+from main.cache_versions import invalidate_version
+
+
+def employee_rows(queryset, prefix=''):
+    """Evaluates a queryset into the plain employee_id/full_name rows the home page panels display"""
+    rows = queryset.values_list(f'{prefix}employee_id', f'{prefix}first_name', f'{prefix}last_name')
+
+    return [{'employee_id': employee_id, 'full_name': f'{first_name} {last_name}'}
+            for employee_id, first_name, last_name in rows]
+
+
+def active_employees():
+    return Employee.objects.filter(is_active=True).order_by('last_name')
+
+
+def at_10_attendance():
+    return employee_rows(active_employees().filter(points_ledger__attendance_points__gte=10))
+
+
+def all_settlements():
+    settlements = Settlement.objects.filter(is_active=True).order_by('-created_date')[:10]
+
+    return employee_rows(settlements, prefix='employee__')
+
+
+def last_final():
+    return employee_rows(active_employees().filter(counseling__action_type='4'))
+
+
+def no_sick_days():
+    employees = active_employees().annotate(sick_days=F('unpaid_sick') + F('paid_sick')).filter(sick_days__lte=0)
+
+    return employee_rows(employees)
+
+
+def recent_terms():
+    return employee_rows(Employee.objects.filter(is_active=False).order_by('-termination_date')[:5])
+
+
+def without_recent_attendance():
+    recent_attendance = Attendance.objects.filter(employee=OuterRef('pk'),
+                                                  incident_date__gte=timezone.now() - datetime.timedelta(days=180))
+
+    return active_employees().filter(~Exists(recent_attendance))
+
+
+def no_attendance_6_months():
+    return employee_rows(without_recent_attendance())
+
+
+def recent_hires():
+    return employee_rows(active_employees().filter(hire_date__gte=timezone.now() - datetime.timedelta(days=30)))
+
+
+PANELS = {
+    'at_10_attendance': at_10_attendance,
+    'all_settlements': all_settlements,
+    'last_final': last_final,
+    'no_sick_days': no_sick_days,
+    'recent_terms': recent_terms,
+    'no_attendance_6_months': no_attendance_6_months,
+    'recent_hires': recent_hires,
+}
+
+# Which panels have to be rebuilt when a row of each model changes, every panel shows employee names
+PANEL_DEPENDENCIES = {
+    Attendance: ['at_10_attendance', 'no_attendance_6_months'],
+    Counseling: ['last_final'],
+    Settlement: ['all_settlements'],
+    Employee: list(PANELS),
+}
+
+# Cached panels are only kept around long enough to roll over to the next day's key
+PANEL_TIMEOUT = 60 * 60 * 25
+
+
+def version_key(panel):
+    return f'operations:dashboard:{panel}:version'
+
+
+def panel_key(panel, version):
+    # The date is part of the key so the panels with a rolling window (hires, attendance in 6 months) are rebuilt
+    # every day without having to expire them early
+    return f'operations:dashboard:{panel}:{version}:{timezone.localdate().isoformat()}'
+
+
+def get_dashboard_snapshot():
+    """Returns the home page panels, only running the queries of the panels that were invalidated since they were
+    last cached. Every panel is stored under its current version so a panel built while a change is being saved
+    ends up under a version nobody reads anymore instead of being served stale."""
+    versions = cache.get_many([version_key(panel) for panel in PANELS])
+    keys = {panel: panel_key(panel, versions.get(version_key(panel), 0)) for panel in PANELS}
+
+    cached = cache.get_many(keys.values())
+    snapshot = {}
+    missing = {}
+    for panel, build in PANELS.items():
+        if keys[panel] in cached:
+            snapshot[panel] = cached[keys[panel]]
+        else:
+            snapshot[panel] = missing[keys[panel]] = build()
+
+    if missing:
+        cache.set_many(missing, timeout=PANEL_TIMEOUT)
+
+    return snapshot
+
+
+def invalidate_panels(panels):
+    """Moves the given panels to a new version, see main.cache_versions"""
+    invalidate_version(*[version_key(panel) for panel in panels])
@@ -0,0 +1,159 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+REPORT_PAGE_SIZE = 25
+
+# Totals are only counted when asked for and then reused for a while, so they can be slightly behind
+REPORT_TOTAL_TIMEOUT = 60 * 5
+
+
+def encode_cursor(direction, value, pk, sort_by):
+    data = json.dumps([direction, value, pk, sort_by], cls=DjangoJSONEncoder, separators=(',', ':'))
+
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns the direction, sort value, primary key and sort of a cursor or None if it can't be read"""
+    try:
+        direction, value, pk, sort_by = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError, binascii.Error):
+        return None
+
+    return (direction, value, pk, sort_by) if direction in ('next', 'previous') else None
+
+
+def get_cached_total(queryset):
+    """Counts the rows of the queryset, reusing the count of the same query for REPORT_TOTAL_TIMEOUT seconds"""
+    key = f'operations:report_total:{hashlib.sha256(str(queryset.query).encode()).hexdigest()}'
+
+    return cache.get_or_set(key, queryset.count, timeout=REPORT_TOTAL_TIMEOUT)
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator. It can be iterated like a Django Page and tells the template which cursors lead
+    to the pages around it, there are no page numbers since nothing is counted"""
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor, previous_cursor, total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset on its sort key and primary key instead of with OFFSET, so every page is a range scan that
+    starts where the page before it ended no matter how deep it is, and no COUNT is needed to render the links.
+    Rows without a sort value come last in both directions
+
+    :param queryset: The filtered queryset to paginate
+    :param sort_by: A field or annotation to sort on, with a leading '-' for descending, or None for newest first
+    :param per_page: Rows on a page
+    """
+
+    def __init__(self, queryset, sort_by=None, per_page=REPORT_PAGE_SIZE):
+        self.sort_by = sort_by or None
+        self.descending = self.sort_by.startswith('-') if self.sort_by else True
+        self.key = self.sort_by.lstrip('-') if self.sort_by else None
+        self.per_page = per_page
+
+        self.queryset = queryset.annotate(keyset_value=F(self.key)) if self.key else queryset
+
+    def ordering(self, reverse=False):
+        descending = self.descending != reverse
+        pk = '-pk' if descending else 'pk'
+
+        if not self.key:
+            return [pk]
+
+        # Rows without a value come last going forward so they come first going back
+        nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+        value = F('keyset_value').desc(**nulls) if descending else F('keyset_value').asc(**nulls)
+
+        return [value, pk]
+
+    def after(self, value, pk):
+        """Rows that come after the given row in the sort order"""
+        op = 'lt' if self.descending else 'gt'
+
+        if not self.key:
+            return Q(**{f'pk__{op}': pk})
+        if value is None:
+            return Q(keyset_value__isnull=True, **{f'pk__{op}': pk})
+
+        return Q(**{f'keyset_value__{op}': value}) | Q(keyset_value=value, **{f'pk__{op}': pk}) | \
+            Q(keyset_value__isnull=True)
+
+    def before(self, value, pk):
+        """Rows that come before the given row in the sort order"""
+        op = 'gt' if self.descending else 'lt'
+
+        if not self.key:
+            return Q(**{f'pk__{op}': pk})
+        if value is None:
+            return Q(keyset_value__isnull=False) | Q(keyset_value__isnull=True, **{f'pk__{op}': pk})
+
+        return Q(**{f'keyset_value__{op}': value}) | Q(keyset_value=value, **{f'pk__{op}': pk})
+
+    def cursor(self, direction, row):
+        return encode_cursor(direction, getattr(row, 'keyset_value', None) if self.key else None, row.pk,
+                             self.sort_by)
+
+    def get_page(self, cursor=None, with_total=False):
+        """
+        Returns the page the cursor points to, the first page when there is no cursor or it was made for another sort
+
+        :param cursor: The next_cursor or previous_cursor of another page
+        :param with_total: Whether to count the rows of every page, the count is cached for a few minutes
+        :return: KeysetPage
+        """
+        position = decode_cursor(cursor) if cursor else None
+        if position and position[3] != self.sort_by:
+            position = None
+
+        if position and position[0] == 'previous':
+            queryset = self.queryset.filter(self.before(position[1], position[2])).order_by(*self.ordering(True))
+        elif position:
+            queryset = self.queryset.filter(self.after(position[1], position[2])).order_by(*self.ordering())
+        else:
+            queryset = self.queryset.order_by(*self.ordering())
+
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if position and position[0] == 'previous':
+            rows.reverse()
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = position is not None, more
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.cursor('next', rows[-1]) if rows and has_next else None,
+            previous_cursor=self.cursor('previous', rows[0]) if rows and has_previous else None,
+            total=get_cached_total(self.queryset) if with_total else None,
+        )
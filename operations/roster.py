@@ -0,0 +1,43 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+
+from employees.models import Employee
+from main.cache_versions import invalidate_version
+
+ROSTER_VERSION_KEY = 'operations:roster:version'
+
+# A roster is only rebuilt after an Employee changes, a day without changes still drops it from the cache
+ROSTER_TIMEOUT = 60 * 60 * 24
+
+
+def roster_key(version):
+    return f'operations:roster:{version}'
+
+
+def build_roster():
+    """Returns the active employees as the 'last, first | id' entries the autocomplete fields expect"""
+    employees = Employee.objects.filter(is_active=True).order_by('last_name', 'first_name')\
+        .values_list('last_name', 'first_name', 'employee_id')
+
+    return [f'{last_name}, {first_name} | {employee_id}' for last_name, first_name, employee_id in employees]
+
+
+def get_roster():
+    """Returns the JSON encoded roster with its ETag, a hash of the body, building it only when it isn't cached for the
+    current version yet"""
+    version = cache.get(ROSTER_VERSION_KEY, 0)
+    roster = cache.get(roster_key(version))
+
+    if roster is None:
+        body = json.dumps(build_roster(), separators=(',', ':'))
+        roster = {'body': body, 'etag': hashlib.sha256(body.encode()).hexdigest()[:32]}
+        cache.set(roster_key(version), roster, timeout=ROSTER_TIMEOUT)
+
+    return roster
+
+
+def invalidate_roster():
+    """Moves the roster to a new version, see main.cache_versions"""
+    invalidate_version(ROSTER_VERSION_KEY)
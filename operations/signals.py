@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from employees.models import Attendance, Counseling, Employee, Settlement, DOCUMENT_FIELDS
+from .dashboard import PANEL_DEPENDENCIES, invalidate_panels
+from .roster import invalidate_roster
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=Counseling)
+@receiver(post_delete, sender=Counseling)
+@receiver(post_save, sender=Settlement)
+@receiver(post_delete, sender=Settlement)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_dashboard(sender, update_fields=None, **kwargs):
+    # Attaching a rendered document or logging in doesn't change anything shown on the home page
+    if update_fields in (DOCUMENT_FIELDS, frozenset(['last_login'])):
+        return
+
+    invalidate_panels(PANEL_DEPENDENCIES[sender])
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_employee_roster(sender, update_fields=None, **kwargs):
+    if update_fields != frozenset(['last_login']):
+        invalidate_roster()
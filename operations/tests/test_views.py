@@ -0,0 +1,331 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from employees.models import Attendance, Employee, PointsLedger
+
+
+class TestOperationsHome(TestCase):
+    def setUp(self):
+        """Create an authorized Django user for testing purposes and start from an empty dashboard cache"""
+        cache.clear()
+        self.user = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=000000
+        )
+        permission = Permission.objects.get(codename='can_view_operations_home')
+        self.user.user_permissions.add(permission)
+
+    def create_employees(self, amount):
+        """Bulk create active employees where every tenth one is at 10 points, has no sick days and had a recent
+        attendance record"""
+        Employee.objects.bulk_create([
+            Employee(
+                username=f'employee.{number}',
+                first_name='Employee',
+                last_name=str(number),
+                employee_id=number,
+                paid_sick=0,
+                unpaid_sick=0 if number % 10 == 0 else 2,
+                hire_date=datetime.date.today() - datetime.timedelta(days=number),
+            ) for number in range(1, amount + 1)
+        ])
+        employees = Employee.objects.filter(username__startswith='employee.')
+
+        PointsLedger.objects.bulk_create([
+            PointsLedger(employee=employee, attendance_points=10 if employee.employee_id % 10 == 0 else 0)
+            for employee in employees
+        ])
+        Attendance.objects.bulk_create([
+            Attendance(employee=employee, incident_date=datetime.date.today(), points=1, reason='0',
+                       assigned_by=self.user.employee_id)
+            for employee in employees if employee.employee_id % 10 == 0
+        ])
+
+    def get_home(self, queries):
+        with self.assertNumQueries(queries):
+            resp = self.client.get(reverse('operations-home'))
+
+        self.assertEqual(resp.status_code, 200)
+
+        return resp
+
+    def assert_query_budget(self, amount):
+        self.create_employees(amount)
+        self.client.force_login(self.user)
+
+        with self.assertNumQueries(12):
+            resp = self.client.get(reverse('operations-home'))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context['at_10_attendance']), amount // 10)
+        self.assertEqual(len(resp.context['no_sick_days']), amount // 10)
+        self.assertEqual(len(resp.context['no_attendance_6_months']), amount - amount // 10 + 1)
+
+    def test_redirect_when_logged_out(self):
+        """Test that the user is redirected to the log in page when not logged in"""
+        url = reverse('operations-home')
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 302)
+
+    def test_query_budget_10_employees(self):
+        """Test that the home page runs a fixed number of queries with 10 employees"""
+        self.assert_query_budget(10)
+
+    def test_query_budget_1000_employees(self):
+        """Test that the home page runs the same number of queries with 1,000 employees"""
+        self.assert_query_budget(1000)
+
+    def test_query_budget_5000_employees(self):
+        """Test that the home page runs the same number of queries with 5,000 employees"""
+        self.assert_query_budget(5000)
+
+    def test_panels_served_from_cache(self):
+        """Test that a second visit doesn't run any of the panel queries"""
+        self.create_employees(10)
+        self.client.force_login(self.user)
+
+        first = self.get_home(12)
+        second = self.get_home(4)
+
+        for panel in ['at_10_attendance', 'no_sick_days', 'no_attendance_6_months', 'recent_hires']:
+            self.assertEqual(first.context[panel], second.context[panel])
+
+    @mock.patch.object(Attendance, 'create_document')
+    def test_attendance_invalidates_its_panels(self, create_document):
+        """Test that a new attendance record only rebuilds the panels that depend on attendance"""
+        self.create_employees(10)
+        self.client.force_login(self.user)
+        self.get_home(12)
+
+        employee = Employee.objects.get(employee_id=1)
+        for _ in range(2):
+            Attendance.objects.create(employee=employee, incident_date=datetime.date.today(), points=5, reason='0',
+                                      assigned_by=self.user.employee_id, exemption='')
+
+        resp = self.get_home(6)
+        at_10_ids = [row['employee_id'] for row in resp.context['at_10_attendance']]
+        no_attendance_ids = [row['employee_id'] for row in resp.context['no_attendance_6_months']]
+
+        self.assertIn(1, at_10_ids)
+        self.assertNotIn(1, no_attendance_ids)
+
+    def test_employee_invalidates_all_panels(self):
+        """Test that changing an employee rebuilds every panel and logging in doesn't rebuild any"""
+        self.create_employees(10)
+        self.client.force_login(self.user)
+        self.get_home(12)
+
+        employee = Employee.objects.get(employee_id=10)
+        employee.first_name = 'Renamed'
+        employee.save()
+        employee.save(update_fields=['last_login'])
+
+        resp = self.get_home(11)
+        self.assertIn({'employee_id': 10, 'full_name': 'Renamed 10'}, resp.context['at_10_attendance'])
+
+    def test_ledger_rebuild_invalidates_its_panel(self):
+        """Test that rebuilding the points ledgers only rebuilds the panel that reads them"""
+        self.create_employees(10)
+        self.client.force_login(self.user)
+        self.get_home(12)
+
+        # The employees at 10 points only have a single point of attendance, the rebuild brings their ledgers back
+        # in line with it
+        call_command('rebuild_points_ledger', stdout=StringIO())
+
+        resp = self.get_home(5)
+        self.assertEqual(resp.context['at_10_attendance'], [])
+
+
+class TestEmployeeRoster(TestCase):
+    def setUp(self):
+        """Create a Django user for testing purposes and start from an empty roster cache"""
+        cache.clear()
+        self.user = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=000000
+        )
+        self.client.force_login(self.user)
+
+    def get_roster(self, **headers):
+        return self.client.get(reverse('operations-employee-roster'), **headers)
+
+    def test_roster(self):
+        """Test that the roster lists the active employees in the autocomplete format with an ETag"""
+        Employee.objects.create_user(username='inactive.user', password='test', first_name='Inactive',
+                                     last_name='User', employee_id=1, is_active=False)
+        resp = self.get_roster()
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), ['User, Test | 0'])
+        self.assertTrue(resp.has_header('ETag'))
+        self.assertIn('no-cache', resp['Cache-Control'])
+
+    def test_roster_not_modified(self):
+        """Test that asking again with the ETag is answered with a 304 without querying for the employees"""
+        etag = self.get_roster()['ETag']
+
+        with self.assertNumQueries(2):
+            resp = self.get_roster(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resp.status_code, 304)
+
+    def test_employee_change_invalidates_roster(self):
+        """Test that saving an Employee changes the roster while logging in does not"""
+        etag = self.get_roster()['ETag']
+
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(self.get_roster(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.user.first_name = 'Changed'
+        self.user.save()
+        resp = self.get_roster(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), ['User, Changed | 0'])
+
+
+class TestTerminationReports(TestCase):
+    def setUp(self):
+        """Create an authorized Django user and 60 terminated employees that share last names and partly have no hire
+        date"""
+        cache.clear()
+        self.user = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=000000
+        )
+        permission = Permission.objects.get(codename='can_view_termination_reports')
+        self.user.user_permissions.add(permission)
+        self.client.force_login(self.user)
+
+        Employee.objects.bulk_create([
+            Employee(
+                username=f'employee.{number}',
+                first_name='Employee',
+                last_name=f'Name{number % 4}',
+                employee_id=number,
+                is_active=False,
+                termination_date=datetime.date.today(),
+                hire_date=None if number % 3 == 0 else datetime.date(2020, 1, 1) + datetime.timedelta(days=number % 7),
+            ) for number in range(1, 61)
+        ])
+
+    def get_report(self, **params):
+        resp = self.client.get(reverse('operations-termination-reports'), params)
+
+        self.assertEqual(resp.status_code, 200)
+
+        return resp.context['page_obj']
+
+    def walk(self, sort_by):
+        """Follows the next links to the last page and the previous links back, returning the employee IDs of both"""
+        pages = [self.get_report(sort_by=sort_by)]
+        while pages[-1].has_next():
+            pages.append(self.get_report(sort_by=sort_by, cursor=pages[-1].next_cursor))
+
+        backwards = [pages[-1]]
+        while backwards[-1].has_previous():
+            backwards.append(self.get_report(sort_by=sort_by, cursor=backwards[-1].previous_cursor))
+
+        return [[employee.employee_id for employee in page] for page in pages], \
+            [[employee.employee_id for employee in page] for page in reversed(backwards)]
+
+    def test_pages_follow_every_sort(self):
+        """Test that paging through each sort visits every employee once in the sort order, in both directions"""
+        orderings = {
+            '': ['-pk'],
+            'last_name': ['last_name', 'pk'],
+            'hire_date': [F('hire_date').asc(nulls_last=True), 'pk'],
+            '-termination_date': ['-termination_date', '-pk'],
+        }
+
+        for sort_by, ordering in orderings.items():
+            with self.subTest(sort_by=sort_by):
+                forwards, backwards = self.walk(sort_by)
+                expected = list(Employee.objects.filter(is_active=False).order_by(*ordering)
+                                .values_list('employee_id', flat=True))
+
+                self.assertEqual([len(page) for page in forwards], [25, 25, 10])
+                self.assertEqual(sum(forwards, []), expected)
+                self.assertEqual(backwards, forwards)
+
+    def test_no_count_unless_asked(self):
+        """Test that a page is not counted until the total is asked for and the count is then reused"""
+        # The first page also caches the unread notification count of the navigation bar
+        self.get_report()
+
+        with CaptureQueriesContext(connection) as uncounted:
+            self.assertIsNone(self.get_report().total)
+        with CaptureQueriesContext(connection) as counted:
+            self.assertEqual(self.get_report(total=1).total, 60)
+        with CaptureQueriesContext(connection) as cached:
+            self.assertEqual(self.get_report(total=1).total, 60)
+
+        self.assertFalse(any('COUNT(*)' in query['sql'] and 'employees_employee' in query['sql']
+                             for query in uncounted.captured_queries))
+        self.assertEqual(len(counted), len(uncounted) + 1)
+        self.assertEqual(len(cached), len(uncounted))
+
+    def test_unreadable_cursor(self):
+        """Test that a broken cursor or one made for another sort starts over at the first page"""
+        first = [employee.pk for employee in self.get_report()]
+        cursor = self.get_report(sort_by='last_name').next_cursor
+
+        self.assertEqual([employee.pk for employee in self.get_report(cursor='not-a-cursor')], first)
+        self.assertEqual([employee.pk for employee in self.get_report(cursor=cursor)], first)
+
+
+class TestAttendanceReports(TestCase):
+    def setUp(self):
+        """Create an authorized Django user for testing purposes"""
+        self.user = Employee.objects.create_user(
+            username='test.user',
+            password='test',
+            first_name='Test',
+            last_name='User',
+            employee_id=000000
+        )
+        permission = Permission.objects.get(codename='can_view_attendance_reports')
+        self.user.user_permissions.add(permission)
+        self.client.force_login(self.user)
+
+    @mock.patch.object(Attendance, 'create_document')
+    def test_total_points_sort(self, create_document):
+        """Test that records are sorted on the total of their own employee, also when employees share a name"""
+        points = {1: [1], 2: [2, 2], 3: [3]}
+        for employee_id, records in points.items():
+            employee = Employee.objects.create_user(
+                username=f'employee.{employee_id}',
+                password='test',
+                first_name='Other' if employee_id == 3 else 'Same',
+                last_name='Name',
+                employee_id=employee_id,
+            )
+            for point in records:
+                Attendance.objects.create(employee=employee, incident_date=datetime.date.today(), points=point,
+                                          reason='0', assigned_by=self.user.employee_id, exemption='')
+
+        resp = self.client.get(reverse('operations-attendance-reports'), {'sort_by': '-total_points'})
+        rows = [(record.employee.employee_id, record.total_points) for record in resp.context['page_obj']]
+
+        self.assertEqual([row[0] for row in rows], [2, 2, 3, 1])
+        self.assertEqual([row[1] for row in rows], [4, 4, 3, 1])
@@ -7,6 +7,7 @@ urlpatterns = [
     path('add-employee/', operations_views.add_employee, name='operations-add-employee'),
     path('bulk-assign-attendance/', operations_views.bulk_assign_attendance, name='operations-bulk-assign-attendance'),
     path('bulk-assign-attendance/search-employees/', operations_views.search_employees, name='operations-search-employees'),
+    path('employee-roster/', operations_views.employee_roster, name='operations-employee-roster'),
     path('attendance-reports/', operations_views.attendance_reports, name='operations-attendance-reports'),
     path('counseling-reports/', operations_views.counseling_reports, name='operations-counseling-reports'),
     path('time-off-reports/', operations_views.time_off_reports, name='operations-time-off-reports'),
@@ -6,17 +6,24 @@ import uuid
 from django.contrib import messages
 from django.contrib.auth import settings
 from django.contrib.auth.decorators import login_required, permission_required
-from django.core.paginator import Paginator
-from django.db.models import Sum, Q, OuterRef, Subquery, CharField, Value as V
-from django.db.models.functions import Concat
-from django.http import JsonResponse
+from django.db.models import DecimalField, Value as V
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
 from notifications.models import Notification
 
 from employees.helper_functions import combine_attendance_documents
-from employees.models import Employee, Attendance, Hold, Counseling, TimeOffRequest, DayOff, Settlement
+from employees.models import Employee, Attendance, Hold, Counseling, TimeOffRequest, DayOff, Settlement, \
+    ensure_document
+from employees.search import filter_by_name, find_employees
+from .dashboard import get_dashboard_snapshot
+from .pagination import KeysetPaginator
+from .roster import get_roster
 from .forms import EmployeeCreationForm, AttendanceFilterForm, CounselingFilterForm, BulkAssignAttendance, \
     MakeTimeOffRequest, TimeOffFilterForm, FilterForm
 
@@ -44,31 +51,14 @@ def home(request, attendance_ids=None):
             download_urls.append(object_url)
         elif attendance_ids_list and len(attendance_ids_list) == 1:
             attendance_object = Attendance.objects.get(id=attendance_ids_list[0])
-            download_urls.append(request.build_absolute_uri(attendance_object.document.url))
+            download_urls.append(request.build_absolute_uri(ensure_document(attendance_object).document.url))
             try:
-                download_urls.append(request.build_absolute_uri(attendance_object.counseling.document.url))
+                download_urls.append(request.build_absolute_uri(ensure_document(attendance_object.counseling).document.url))
             except Counseling.DoesNotExist:
                 pass
 
-    all_employees = Employee.objects.filter(is_active=True).order_by('last_name')
-    at_10_attendance = [employee for employee in all_employees if employee.get_total_attendance_points() >= 10]
-    all_settlements = Settlement.objects.filter(is_active=True).order_by('-created_date')[:10]
-    last_final = all_employees.filter(counseling__action_type='4')
-    no_sick_days = [employee for employee in all_employees if (employee.unpaid_sick + employee.paid_sick) <= 0]
-    recent_terms = Employee.objects.filter(is_active=False).order_by('-termination_date')[:5]
-    no_attendance_6_months = [employee for employee in all_employees if not employee.has_attendance_in_6_months()]
-    recent_hires = all_employees.filter(hire_date__gte=timezone.now() - datetime.timedelta(days=30))
-
-    data = {
-        'download_urls': download_urls,
-        'at_10_attendance': at_10_attendance,
-        'all_settlements': all_settlements,
-        'last_final': last_final,
-        'no_sick_days': no_sick_days,
-        'recent_terms': recent_terms,
-        'no_attendance_6_months': no_attendance_6_months,
-        'recent_hires': recent_hires,
-    }
+    data = get_dashboard_snapshot()
+    data['download_urls'] = download_urls
 
     return render(request, 'operations/home.html', data)
 
@@ -104,15 +94,26 @@ def bulk_assign_attendance(request):
 def search_employees(request):
     search = request.GET.get('q')
 
-    employees = Employee.objects.annotate(
-                full_name=Concat('first_name', V(' '), 'last_name', output_field=CharField())).filter(
-                full_name__icontains=search, is_active=True)
+    employees = find_employees(Employee.objects.filter(is_active=True), search)
 
     employee_names = [f'{employee.last_name}, {employee.first_name} | {employee.employee_id}' for employee in employees]
 
     return JsonResponse(employee_names, safe=False)
 
 
+@login_required
+@condition(etag_func=lambda request: get_roster()['etag'])
+def employee_roster(request):
+    roster = get_roster()
+    response = HttpResponse(roster['body'], content_type='application/json')
+    response['ETag'] = quote_etag(roster['etag'])
+
+    # Browsers keep the roster but check it is still current on every load, which is a 304 until an Employee changes
+    patch_cache_control(response, private=True, no_cache=True)
+
+    return response
+
+
 @login_required
 @permission_required('employees.can_view_attendance_reports', raise_exception=True)
 def attendance_reports(request):
@@ -144,18 +145,14 @@ def attendance_reports(request):
             attendance_records = attendance_records.filter(employee__employee_id=search)
 
         except ValueError:
-            attendance_records = Attendance.objects.annotate(
-                full_name=Concat('employee__first_name', V(' '), 'employee__last_name', output_field=CharField())).filter(
-                full_name__icontains=search, is_active=True, employee__is_active=True)
+            attendance_records = filter_by_name(Attendance.objects.filter(is_active=True, employee__is_active=True),
+                                                search, prefix='employee__')
 
     if sort_by == '-total_points':
-        records = attendance_records.annotate(full_name=Concat('employee__first_name', V(' '), 'employee__last_name', output_field=CharField())).values('full_name').annotate(total_points=Sum('points'))
-
-        attendance_records = attendance_records.annotate(total_points=Subquery(records.filter(Q(full_name__icontains=OuterRef('employee__first_name')) & Q(full_name__icontains=OuterRef('employee__last_name'))).values('total_points')[:1]))
-
-        attendance_records = attendance_records.order_by('-total_points')
-    elif sort_by:
-        attendance_records = attendance_records.order_by(sort_by)
+        # The ledger already holds every Employee's active attendance total, so it is a join on its primary key
+        attendance_records = attendance_records.annotate(total_points=Coalesce(
+            'employee__points_ledger__attendance_points', V(0),
+            output_field=DecimalField(max_digits=5, decimal_places=1)))
 
     if reasons:
         attendance_records = attendance_records.filter(reason__exact=reasons)
@@ -174,9 +171,9 @@ def attendance_reports(request):
         'search': search
     }, sort_choices=sort_choices)
 
-    page = request.GET.get('page')
-    paginator = Paginator(attendance_records, 25)
-    page_obj = paginator.get_page(page)
+    paginator = KeysetPaginator(attendance_records.select_related('assignee'),
+                                sort_by if sort_by in dict(sort_choices) else None)
+    page_obj = paginator.get_page(request.GET.get('cursor'), with_total=bool(request.GET.get('total')))
 
     data = {
         'page_obj': page_obj,
@@ -217,12 +214,9 @@ def counseling_reports(request):
             counseling_records = counseling_records.filter(employee__employee_id=search)
 
         except ValueError:
-            counseling_records = Counseling.objects.annotate(
-                full_name=Concat('employee__first_name', V(' '), 'employee__last_name', output_field=CharField())).\
-                filter(full_name__icontains=search, employee__is_active=True, is_active=True)
+            counseling_records = filter_by_name(Counseling.objects.filter(employee__is_active=True, is_active=True),
+                                                search, prefix='employee__')
 
-    if sort_by:
-        counseling_records = counseling_records.order_by(sort_by)
 
     if action_type:
         counseling_records = counseling_records.filter(action_type__exact=action_type)
@@ -241,9 +235,9 @@ def counseling_reports(request):
         'search': search
     })
 
-    page = request.GET.get('page')
-    paginator = Paginator(counseling_records, 25)
-    page_obj = paginator.get_page(page)
+    paginator = KeysetPaginator(counseling_records.select_related('assignee'),
+                                sort_by if sort_by in dict(sort_choices) else None)
+    page_obj = paginator.get_page(request.GET.get('cursor'), with_total=bool(request.GET.get('total')))
 
     data = {
         'page_obj': page_obj,
@@ -273,7 +267,7 @@ def view_hold_list(request):
         ('reason', 'Reason'),
     ]
 
-    employee_holds = Hold.objects.filter(employee__is_active=True).order_by('-id')
+    employee_holds = Hold.objects.filter(employee__is_active=True)
     if search:
         try:
             search = int(search)
@@ -281,14 +275,10 @@ def view_hold_list(request):
             employee_holds = employee_holds.filter(employee_id__exact=search)
 
         except ValueError:
-            employee_holds = Hold.objects.annotate(
-                full_name=Concat('employee__first_name', V(' '), 'employee__last_name', output_field=CharField())).filter(
-                full_name__icontains=search)
+            employee_holds = filter_by_name(Hold.objects.all(), search, prefix='employee__')
 
     if company:
         employee_holds = employee_holds.filter(employee__company__display_name__exact=company)
-    if sort_by:
-        employee_holds = employee_holds.order_by(sort_by)
 
     f_form = FilterForm(sort_choices=sort_choices, data={
         'company': company,
@@ -296,9 +286,9 @@ def view_hold_list(request):
         'sort_by': sort_by
     })
 
-    page = request.GET.get('page')
-    paginator = Paginator(employee_holds, 25)
-    page_obj = paginator.get_page(page)
+    paginator = KeysetPaginator(employee_holds.select_related('assignee'),
+                                sort_by if sort_by in dict(sort_choices) else None)
+    page_obj = paginator.get_page(request.GET.get('cursor'), with_total=bool(request.GET.get('total')))
 
     data = {
         'page_obj': page_obj,
@@ -394,10 +384,9 @@ def time_off_reports(request, notification_id=None):
                 time_off_records = time_off_records.filter(employee__employee_id=search)
 
             except ValueError:
-                time_off_records = TimeOffRequest.objects.annotate(
-                    full_name=Concat('employee__first_name', V(' '), 'employee__last_name',
-                                     output_field=CharField())).filter(full_name__icontains=search, is_active=True,
-                                                                       employee__is_active=True)
+                time_off_records = filter_by_name(
+                    TimeOffRequest.objects.filter(is_active=True, employee__is_active=True), search,
+                    prefix='employee__')
 
         if time_off_type:
             time_off_records = time_off_records.filter(time_off_type__exact=time_off_type)
@@ -411,9 +400,6 @@ def time_off_reports(request, notification_id=None):
         if start_date and end_date:
             time_off_records = time_off_records.filter(dayoff__requested_date__gte=start_date, dayoff__requested_date__lte=end_date)
 
-        if sort_by:
-            time_off_records = time_off_records.order_by(sort_by)
-
     f_form = TimeOffFilterForm(sort_choices=sort_choices, data={
         'sort_by': sort_by,
         'status': status,
@@ -423,9 +409,9 @@ def time_off_reports(request, notification_id=None):
         'search': search
     })
 
-    page = request.GET.get('page')
-    paginator = Paginator(time_off_records, 25)
-    page_obj = paginator.get_page(page)
+    paginator = KeysetPaginator(time_off_records,
+                                sort_by if sort_by in dict(sort_choices) else None)
+    page_obj = paginator.get_page(request.GET.get('cursor'), with_total=bool(request.GET.get('total')))
 
     data = {
         'page_obj': page_obj,
@@ -502,16 +488,12 @@ def termination_reports(request):
             termed_drivers = termed_drivers.filter(employee_id__exact=search)
 
         except ValueError:
-            termed_drivers = Employee.objects.annotate(
-                full_name=Concat('first_name', V(' '), 'last_name', output_field=CharField())).filter(
-                full_name__icontains=search, is_active=False)
+            termed_drivers = filter_by_name(Employee.objects.filter(is_active=False), search)
 
     if company:
         termed_drivers = termed_drivers.filter(company__display_name__exact=company)
     if start_date and end_date:
         termed_drivers = termed_drivers.filter(termination_date__gte=start_date, termination_date__lte=end_date)
-    if sort_by:
-        termed_drivers = termed_drivers.order_by(sort_by)
 
     f_form = FilterForm(sort_choices=sort_choices, data={
         'company': company,
@@ -520,9 +502,9 @@ def termination_reports(request):
         'sort_by': sort_by
     })
 
-    page = request.GET.get('page')
-    paginator = Paginator(termed_drivers, 25)
-    page_obj = paginator.get_page(page)
+    paginator = KeysetPaginator(termed_drivers,
+                                sort_by if sort_by in dict(sort_choices) else None)
+    page_obj = paginator.get_page(request.GET.get('cursor'), with_total=bool(request.GET.get('total')))
 
     data = {
         'page_obj': page_obj,